@@ -0,0 +1,79 @@
+"""
+Benchmark hydrate dòng DB -> Book (không cần DB: dòng giả lập đúng kiểu mysql-connector trả về)
+
+    python -m app.benchmarks.bench_hydration [số dòng]
+
+So sánh:
+- dict:  cursor(dictionary=True) + _row_to_book (gọi 2 lần/dòng như list comprehension cũ)
+- tuple: cursor() + loader theo vị trí cột, tính một lần cho mỗi truy vấn
+"""
+from app.models import book_model
+from app.repositories.book_repository import BookRepository
+from datetime import date
+from decimal import Decimal
+import gc
+import sys
+import time
+import tracemalloc
+
+COLUMNS = ('book_id', 'book_code', 'book_name', 'book_type', 'price', 'quantity', 'publisher',
+           'import_date', 'condition_status', 'tax', 'image', 'description')
+
+
+def make_rows(count: int):
+    rows = []
+    for i in range(1, count + 1):
+        textbook = i % 2 == 0
+        rows.append((
+            i, f'B{i:06d}', f'Sách số {i}', 'Sách giáo khoa' if textbook else 'Sách tham khảo',
+            Decimal('25000.00') + i % 100, i % 50, f'NXB {i % 20}', date(2024, 1 + i % 12, 1 + i % 28),
+            ('Cũ' if i % 3 == 0 else 'Mới') if textbook else None, Decimal('0.00') if textbook else Decimal('1500.00'),
+            None, 'Mô tả ngắn'
+        ))
+    return rows
+
+
+def hydrate_dict(dict_rows):
+    repo = BookRepository()
+    started = time.perf_counter()
+    books = [repo._row_to_book(row) for row in dict_rows if repo._row_to_book(row)]
+    return books, time.perf_counter() - started
+
+
+def hydrate_tuple(rows):
+    loader = getattr(book_model, 'book_row_loader', None)
+    if loader is None:
+        return None, 0.0
+    started = time.perf_counter()
+    load = loader(COLUMNS)
+    books = [book for book in map(load, rows) if book is not None]
+    return books, time.perf_counter() - started
+
+
+def measure(name, hydrate, rows):
+    gc.collect()
+    tracemalloc.start()
+    books, elapsed = hydrate(rows)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if books is None:
+        print(f"{name:<6} (không có)")
+        return
+    # Đo lại thời gian không bật tracemalloc
+    gc.collect()
+    _, elapsed = hydrate(rows)
+    count = len(books)
+    print(f"{name:<6} {count:>8} dòng  {elapsed * 1e6 / count:8.2f} µs/dòng  "
+          f"{current / count:8.1f} B/dòng (giữ lại)  {peak / count:8.1f} B/dòng (đỉnh)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rows = make_rows(count)
+    print(f"Book __slots__: {'__slots__' in vars(book_model.TextBook)}")
+    measure('dict', hydrate_dict, [dict(zip(COLUMNS, row)) for row in rows])
+    measure('tuple', hydrate_tuple, rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark các đường nóng repository/service/presenter trên catalog giả lập (SQLite file riêng làm DB)
+
+    python -m app.benchmarks.bench_suite [--sizes 1000,100000,1000000] [--textbook-ratio 0.5]
+        [--publishers 50] [--skew 1.0] [--seed 42] [--min-time 2] [--no-memory]
+        [--save baseline.json] [--compare baseline.json] [--threshold 0.10]
+
+Mỗi trường hợp báo: số lần chạy, throughput (dòng/giây), độ trễ p50/p95/p99 và bộ nhớ đỉnh (tracemalloc, đo riêng).
+--save ghi kết quả ra JSON (kèm commit git); --compare so với file đã lưu và thoát mã 1 nếu p50
+hoặc bộ nhớ đỉnh tệ hơn quá --threshold. DB: BENCH_SQLITE_PATH (mặc định file trong thư mục tạm) -
+bảng books bị xóa và nạp lại cho từng kích thước nên không bao giờ trỏ vào DB thật.
+"""
+import os
+import tempfile
+
+# Luôn chạy trên SQLite riêng - phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ['DB_SQLITE_PATH'] = os.getenv('BENCH_SQLITE_PATH',
+                                         os.path.join(tempfile.gettempdir(), 'libraryx_bench.db'))
+
+from app.benchmarks.catalog import CatalogSpec, NAME_WORDS, seed_catalog
+from app.benchmarks.report import compare, load_results, percentile, save_results
+from app.config.migrations import migrate
+from app.models.book_model import Book
+from app.presenters.book_presenter import BookPresenter
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.services.book_service import BookService
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[], object]
+    rows: Callable[[object], int]   # số dòng xử lý trong một lần chạy (tính throughput)
+
+
+def measure(case: Case, min_time: float, min_runs: int, max_runs: int, track_memory: bool) -> dict:
+    """Chạy lặp tới khi đủ min_time giây và min_runs lần; bộ nhớ đỉnh đo bằng một lần chạy riêng"""
+    case.run()  # warm-up (cache statement, index tìm kiếm...)
+    gc.collect()
+    latencies, rows = [], 0
+    started = time.perf_counter()
+    while len(latencies) < max_runs and (len(latencies) < min_runs or time.perf_counter() - started < min_time):
+        begin = time.perf_counter()
+        result = case.run()
+        latencies.append(time.perf_counter() - begin)
+        rows += case.rows(result)
+        del result
+    total = sum(latencies)
+    latencies.sort()
+    stats = {
+        'runs': len(latencies),
+        'rows_per_run': rows // len(latencies),
+        'throughput_rows_per_s': rows / total if total else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1e3,
+        'p95_ms': percentile(latencies, 95) * 1e3,
+        'p99_ms': percentile(latencies, 99) * 1e3,
+        'peak_memory_bytes': None,
+    }
+    if track_memory:
+        gc.collect()
+        tracemalloc.start()
+        result = case.run()
+        stats['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del result
+    return stats
+
+
+def build_cases(size: int) -> List[Case]:
+    repository = SQLiteBookRepository()
+    service = BookService(repository)
+    books: List[Book] = repository.find_all()
+    # Một từ cố định để mọi lần chạy (và lần đo bộ nhớ) trả về cùng số dòng
+    term = NAME_WORDS[0]
+    return [
+        Case('repository.find_all', repository.find_all, len),
+        Case('repository.search_by_name', lambda: repository.search_by_name(term), len),
+        Case('service.get_statistics', service.get_statistics, lambda _: size),
+        Case('presenter.present_books_list', lambda: BookPresenter.present_books_list(books),
+             lambda result: result['books_count']),
+        Case('book.to_dict', lambda: [book.to_dict() for book in books], len),
+    ]
+
+
+def run_suite(specs: List[CatalogSpec], min_time: float, min_runs: int, max_runs: int,
+              track_memory: bool) -> Dict[str, Dict[str, dict]]:
+    migrate()
+    results = {}
+    for spec in specs:
+        started = time.perf_counter()
+        seed_catalog(spec)
+        print(f"\n== {spec.size:,} sách (nạp {time.perf_counter() - started:.1f}s)")
+        print(f"{'trường hợp':<30} {'lần':>5} {'dòng/s':>12} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'đỉnh MB':>9}")
+        results[str(spec.size)] = {}
+        for case in build_cases(spec.size):
+            stats = measure(case, min_time, min_runs, max_runs, track_memory)
+            results[str(spec.size)][case.name] = stats
+            peak = stats['peak_memory_bytes']
+            print(f"{case.name:<30} {stats['runs']:>5} {stats['throughput_rows_per_s']:>12,.0f} "
+                  f"{stats['p50_ms']:>10.2f} {stats['p95_ms']:>10.2f} {stats['p99_ms']:>10.2f} "
+                  f"{peak / 2 ** 20 if peak is not None else float('nan'):>9.1f}")
+    return results
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark repository/service/presenter")
+    parser.add_argument('--sizes', default='1000,100000,1000000')
+    parser.add_argument('--textbook-ratio', type=float, default=0.5)
+    parser.add_argument('--publishers', type=int, default=50)
+    parser.add_argument('--skew', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--min-time', type=float, default=2.0, help="giây chạy tối thiểu mỗi trường hợp")
+    parser.add_argument('--min-runs', type=int, default=5)
+    parser.add_argument('--max-runs', type=int, default=1000)
+    parser.add_argument('--no-memory', action='store_true', help="bỏ đo bộ nhớ đỉnh (tracemalloc)")
+    parser.add_argument('--save', help="ghi kết quả ra file JSON")
+    parser.add_argument('--compare', help="so với file JSON đã lưu")
+    parser.add_argument('--threshold', type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    specs = [CatalogSpec(int(size), args.textbook_ratio, args.publishers, args.skew, args.seed)
+             for size in args.sizes.split(',') if size.strip()]
+    print(f"DB: {os.environ['DB_SQLITE_PATH']}")
+    results = run_suite(specs, args.min_time, args.min_runs, args.max_runs, not args.no_memory)
+
+    if args.save:
+        save_results(args.save, results, catalogs=[spec.to_dict() for spec in specs])
+        print(f"\nĐã lưu baseline: {args.save}")
+
+    if args.compare:
+        regressions = compare(results, load_results(args.compare), args.threshold,
+                              (('p50_ms', True), ('peak_memory_bytes', True)))
+        if regressions:
+            print(f"\n{len(regressions)} hồi quy vượt {args.threshold:.0%}:")
+            for item in regressions:
+                print(f"  {item}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,88 @@
+"""
+Sinh catalog sách giả lập cho benchmark: kích thước, tỉ lệ loại sách và độ lệch nhà xuất bản cấu hình được
+
+Nhà xuất bản theo phân phối Zipf (NXB thứ k có trọng số 1/k^skew): skew=0 chia đều,
+skew ~1 giống thực tế - vài NXB lớn chiếm phần lớn catalog, làm lệch kích thước các nhóm theo publisher.
+Cùng seed cho cùng catalog nên kết quả giữa các commit so sánh được.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import accumulate
+from typing import Iterator
+import random
+
+# Từ ghép tên sách - search_by_name tìm theo các từ này
+NAME_WORDS = ('Toán', 'Ngữ văn', 'Tiếng Anh', 'Vật lý', 'Hóa học', 'Sinh học', 'Lịch sử', 'Địa lý',
+              'Tin học', 'Âm nhạc', 'Mỹ thuật', 'Kinh tế', 'Triết học', 'Tâm lý', 'Lập trình')
+NAME_SUFFIXES = ('cơ bản', 'nâng cao', 'tập 1', 'tập 2', 'bài tập', 'chuyên đề', 'tham khảo', 'ôn thi')
+
+
+@dataclass(frozen=True)
+class CatalogSpec:
+    size: int = 1000
+    textbook_ratio: float = 0.5   # tỉ lệ sách giáo khoa
+    publishers: int = 50
+    publisher_skew: float = 1.0   # số mũ Zipf
+    seed: int = 42
+
+    def to_dict(self) -> dict:
+        return {
+            'size': self.size,
+            'textbook_ratio': self.textbook_ratio,
+            'publishers': self.publishers,
+            'publisher_skew': self.publisher_skew,
+            'seed': self.seed,
+        }
+
+
+def publisher_name(rank: int) -> str:
+    return f'NXB {rank:03d}'
+
+
+def generate_rows(spec: CatalogSpec) -> Iterator[tuple]:
+    """Dòng sách theo thứ tự BookRepository.WRITE_COLUMNS"""
+    rng = random.Random(spec.seed)
+    publishers = [publisher_name(rank) for rank in range(1, spec.publishers + 1)]
+    cum_weights = list(accumulate(1 / rank ** spec.publisher_skew for rank in range(1, spec.publishers + 1)))
+    start = date(2015, 1, 1)
+    for i in range(1, spec.size + 1):
+        textbook = rng.random() < spec.textbook_ratio
+        name = f'{rng.choice(NAME_WORDS)} {rng.choice(NAME_SUFFIXES)} {i}'
+        publisher = rng.choices(publishers, cum_weights=cum_weights)[0]
+        price = Decimal(rng.randrange(10_000, 500_000, 500))
+        yield (
+            f'B{i:07d}', name, 'Sách giáo khoa' if textbook else 'Sách tham khảo',
+            start + timedelta(days=rng.randrange(3650)), price, rng.randrange(0, 200), publisher,
+            ('Cũ' if rng.random() < 0.3 else 'Mới') if textbook else None,
+            Decimal(0) if textbook else (price * Decimal('0.05')).quantize(Decimal('0.01')),
+            None, f'Mô tả {name}' if rng.random() < 0.8 else None
+        )
+
+
+def seed_catalog(spec: CatalogSpec, chunk_size: int = 10_000) -> int:
+    """Xóa bảng books rồi nạp catalog giả lập (executemany theo lô). Chỉ dùng trên DB benchmark riêng."""
+    # Import khi dùng: load_test import module này trước khi chọn DB (DB_BACKEND/DB_SQLITE_PATH trong main())
+    from app.config.db_config import get_pool
+    from app.models.catalog_model import CatalogModel
+    from app.repositories.book_repository import BookRepository
+
+    repository = BookRepository()
+    insert_sql = repository._insert_sql()
+    inserted = 0
+    with get_pool().acquire() as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM books")
+        chunk = []
+        for row in generate_rows(spec):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                cursor.executemany(insert_sql, chunk)
+                inserted += len(chunk)
+                chunk = []
+        if chunk:
+            cursor.executemany(insert_sql, chunk)
+            inserted += len(chunk)
+        CatalogModel.bump_version(cursor)
+        conn.commit()
+    return inserted
+
@@ -0,0 +1,380 @@
+"""
+Load test: phát lại hỗn hợp request thực tế vào Flask app và đo mỗi endpoint chịu được bao nhiêu request/giây
+
+    python -m app.benchmarks.load_test [--transport inprocess|http] [--url http://host:port]
+        [--mix browse=30,search=20,detail=30,invoice=5,borrow=5,login=10] [--concurrency 1,8,32]
+        [--duration 20] [--books 10000] [--users 200] [--seed 42]
+        [--save load.json] [--compare load.json] [--threshold 0.10] [--seed-only]
+
+DB: SQLite riêng (LOAD_SQLITE_PATH, mặc định file trong thư mục tạm) đứng thay MySQL - nạp catalog giả lập,
+tài khoản/người dùng và tồn kho lớn để hóa đơn/mượn sách không hết hàng giữa chừng.
+- inprocess: mỗi worker một Flask test client, không qua mạng (đo chi phí của app);
+- http: worker gửi HTTP thật (keep-alive) tới server werkzeug chạy trong process trên cổng ngẫu nhiên,
+  hoặc tới --url (app chạy sẵn với DB_BACKEND=sqlite DB_SQLITE_PATH=<LOAD_SQLITE_PATH>, nạp trước bằng --seed-only).
+
+Mỗi mức concurrency báo theo thao tác: số request, throughput, p50/p95/p99 và tỉ lệ lỗi (exception hoặc status >= 400).
+--save/--compare như bench_suite: thoát mã 1 nếu p95, tỉ lệ lỗi tăng hoặc throughput giảm quá --threshold.
+"""
+from app.benchmarks.catalog import CatalogSpec, NAME_WORDS, seed_catalog
+from app.benchmarks.report import compare, load_results, percentile, save_results
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+DEFAULT_MIX = 'browse=30,search=20,detail=30,invoice=5,borrow=5,login=10'
+
+USER_PASSWORD = 'loadtest'
+
+
+@dataclass(frozen=True)
+class Context:
+    """Dữ liệu thật trong DB để request sinh ra trỏ vào sách/người dùng tồn tại"""
+    book_ids: Tuple[int, int]      # [min, max]
+    user_ids: Tuple[int, int]
+    usernames: Tuple[str, ...]
+
+
+# Thao tác: (rng, context) -> (method, path, body JSON hoặc None)
+Operation = Callable[[random.Random, Context], Tuple[str, str, Optional[dict]]]
+
+
+def _browse(rng: random.Random, ctx: Context):
+    path = f"/api/books?limit=20&sort={rng.choice(('newest', 'name'))}"
+    if rng.random() < 0.3:
+        path += f"&type={quote(rng.choice(('Sách giáo khoa', 'Sách tham khảo')))}"
+    return 'GET', path, None
+
+
+def _search(rng: random.Random, ctx: Context):
+    return 'GET', f"/api/books?q={quote(rng.choice(NAME_WORDS))}&limit=20", None
+
+
+def _detail(rng: random.Random, ctx: Context):
+    return 'GET', f"/api/books/{rng.randint(*ctx.book_ids)}", None
+
+
+def _invoice(rng: random.Random, ctx: Context):
+    details = [{'book_id': rng.randint(*ctx.book_ids), 'quantity': rng.randint(1, 3)} for _ in range(rng.randint(1, 3))]
+    invoice = {'user_id': rng.randint(*ctx.user_ids), 'invoice_code': 'L' + uuid.uuid4().hex[:18]}
+    return 'POST', '/api/invoices', {'invoice': invoice, 'details': details}
+
+
+def _borrow(rng: random.Random, ctx: Context):
+    return 'POST', '/api/borrow', {
+        'user_id': rng.randint(*ctx.user_ids), 'book_id': rng.randint(*ctx.book_ids), 'quantity': 1,
+        'borrow_date': date.today().isoformat(),
+    }
+
+
+def _login(rng: random.Random, ctx: Context):
+    return 'POST', '/api/accounts/login', {'username': rng.choice(ctx.usernames), 'password': USER_PASSWORD}
+
+
+OPERATIONS: Dict[str, Operation] = {
+    'browse': _browse,
+    'search': _search,
+    'detail': _detail,
+    'invoice': _invoice,
+    'borrow': _borrow,
+    'login': _login,
+}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'browse=30,search=20' -> {'browse': 30.0, 'search': 20.0}"""
+    mix = {}
+    for item in text.split(','):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Thao tác không hợp lệ: {name} (có: {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Mix rỗng")
+    return mix
+
+
+def use_load_db():
+    """
+    Luôn chạy trên SQLite riêng (LOAD_SQLITE_PATH) - gọi trước khi import app.config.db_config
+    (module này chỉ import DB trong hàm nên import nó, vd khi pytest quét thư mục, không đổi DB của process)
+    """
+    if 'app.config.db_config' in sys.modules and os.getenv('DB_BACKEND') != 'sqlite':
+        raise RuntimeError("app.config.db_config đã được import với DB khác - chạy load test trong process riêng")
+    os.environ['DB_BACKEND'] = 'sqlite'
+    os.environ['DB_SQLITE_PATH'] = os.getenv('LOAD_SQLITE_PATH',
+                                             os.path.join(tempfile.gettempdir(), 'libraryx_load.db'))
+
+
+def seed(books: int, users: int, seed_value: int):
+    """Nạp lại DB load test: catalog, tài khoản load_user_N (mật khẩu USER_PASSWORD) và người dùng tương ứng"""
+    from app.config.db_config import get_pool
+    from app.config.migrations import migrate
+    from app.models.catalog_model import CatalogModel
+
+    migrate()
+    with get_pool().acquire() as conn, conn.cursor() as cursor:
+        for table in ('invoice_details', 'invoices', 'borrow_books', 'users', 'accounts'):
+            cursor.execute(f"DELETE FROM {table}")
+        conn.commit()
+    seed_catalog(CatalogSpec(books, seed=seed_value))
+    with get_pool().acquire() as conn, conn.cursor() as cursor:
+        # Tồn kho lớn: hóa đơn/mượn sách trong lúc chạy không gặp hết hàng (409)
+        cursor.execute("UPDATE books SET quantity = 1000000")
+        CatalogModel.bump_version(cursor)
+        for i in range(1, users + 1):
+            cursor.execute("INSERT INTO accounts (username, password, role) VALUES (%s, %s, %s)",
+                           (f'load_user_{i}', USER_PASSWORD, 'user'))
+            cursor.execute("INSERT INTO users (account_id, full_name, email) VALUES (%s, %s, %s)",
+                           (cursor.lastrowid, f'Load User {i}', f'load_user_{i}@example.com'))
+        conn.commit()
+
+
+def load_context() -> Context:
+    from app.config.db_config import get_pool
+
+    with get_pool().acquire() as conn, conn.cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT MIN(book_id) AS low, MAX(book_id) AS high FROM books")
+        books = cursor.fetchone()
+        cursor.execute("SELECT MIN(user_id) AS low, MAX(user_id) AS high FROM users")
+        users = cursor.fetchone()
+        cursor.execute("SELECT username FROM accounts WHERE username LIKE 'load_user_%'")
+        usernames = tuple(row['username'] for row in cursor.fetchall())
+    if books['low'] is None or users['low'] is None or not usernames:
+        raise RuntimeError("DB load test rỗng - chạy với --seed-only hoặc bỏ --no-seed")
+    return Context((books['low'], books['high']), (users['low'], users['high']), usernames)
+
+
+def create_app():
+    """App thật (main.create_app): mọi blueprint, unit of work, metrics... như khi triển khai"""
+    from app.main import create_app
+
+    return create_app()
+
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method: str, path: str, body: Optional[dict]) -> int:
+        response = self.client.open(path, method=method, json=body)
+        response.get_data()
+        response.close()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class HttpClient:
+    """Một connection keep-alive mỗi worker (http.client tự mở lại nếu server đóng)"""
+
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        self.prefix = parts.path.rstrip('/')
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+
+    def request(self, method: str, path: str, body: Optional[dict]) -> int:
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.conn.request(method, self.prefix + path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            raise
+        if response.getheader('Connection', '').lower() == 'close':
+            self.conn.close()
+        return response.status
+
+    def close(self):
+        self.conn.close()
+
+
+class Recorder:
+    """Độ trễ và số lỗi theo thao tác của một worker (gộp lại khi kết thúc, không cần lock)"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+
+    def add(self, name: str, elapsed: float, status: Optional[int]):
+        self.latencies.setdefault(name, []).append(elapsed)
+        key = str(status) if status is not None else 'exception'
+        counts = self.statuses.setdefault(name, {})
+        counts[key] = counts.get(key, 0) + 1
+        if status is None or status >= 400:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def run_level(make_client: Callable[[], object], mix: Dict[str, float], ctx: Context, concurrency: int,
+              duration: float, seed_value: int) -> Dict[str, dict]:
+    """Chạy concurrency worker trong duration giây; trả về {thao tác: thống kê} kèm dòng 'total'"""
+    names, weights = list(mix), list(mix.values())
+    recorders = [Recorder() for _ in range(concurrency)]
+    start = threading.Barrier(concurrency + 1)
+    deadline = [0.0]
+
+    def worker(index: int):
+        rng = random.Random(seed_value * 1000 + index)
+        client = make_client()
+        recorder = recorders[index]
+        start.wait()
+        try:
+            while time.perf_counter() < deadline[0]:
+                name = rng.choices(names, weights)[0]
+                method, path, body = OPERATIONS[name](rng, ctx)
+                begin = time.perf_counter()
+                try:
+                    status = client.request(method, path, body)
+                except Exception:
+                    status = None
+                recorder.add(name, time.perf_counter() - begin, status)
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    deadline[0] = time.perf_counter() + duration
+    started = time.perf_counter()
+    start.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    merged = Recorder()
+    for recorder in recorders:
+        for name, latencies in recorder.latencies.items():
+            merged.latencies.setdefault(name, []).extend(latencies)
+            merged.errors[name] = merged.errors.get(name, 0) + recorder.errors.get(name, 0)
+            counts = merged.statuses.setdefault(name, {})
+            for status, count in recorder.statuses[name].items():
+                counts[status] = counts.get(status, 0) + count
+    merged.latencies['total'] = [value for name in names for value in merged.latencies.get(name, [])]
+    merged.errors['total'] = sum(merged.errors.get(name, 0) for name in names)
+    return {name: _stats(merged.latencies[name], merged.errors.get(name, 0), merged.statuses.get(name, {}), elapsed)
+            for name in names + ['total'] if merged.latencies.get(name)}
+
+
+def _stats(latencies: List[float], errors: int, statuses: Dict[str, int], elapsed: float) -> dict:
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1e3,
+        'p95_ms': percentile(latencies, 95) * 1e3,
+        'p99_ms': percentile(latencies, 99) * 1e3,
+        'error_rate': errors / len(latencies),
+        'statuses': statuses,
+    }
+
+
+def serve_local(app):
+    """Server werkzeug đa luồng trên cổng ngẫu nhiên, chạy nền trong process; trả về (url, server)"""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'   # keep-alive
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, name='load-test-server', daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Load test Flask app với hỗn hợp request thực tế")
+    parser.add_argument('--transport', choices=('inprocess', 'http'), default='inprocess')
+    parser.add_argument('--url', help="gửi tới app đang chạy thay vì server trong process (cần --transport http)")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="trọng số thao tác, vd browse=30,search=20")
+    parser.add_argument('--concurrency', default='1,8,32', help="các mức worker đồng thời")
+    parser.add_argument('--duration', type=float, default=20.0, help="giây chạy mỗi mức concurrency")
+    parser.add_argument('--books', type=int, default=10_000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-seed', action='store_true', help="dùng DB đã nạp sẵn")
+    parser.add_argument('--seed-only', action='store_true', help="chỉ nạp DB rồi thoát")
+    parser.add_argument('--save', help="ghi kết quả ra file JSON")
+    parser.add_argument('--compare', help="so với file JSON đã lưu")
+    parser.add_argument('--threshold', type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    use_load_db()
+    mix = parse_mix(args.mix)
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+    print(f"DB: {os.environ['DB_SQLITE_PATH']}")
+    if not args.no_seed:
+        started = time.perf_counter()
+        seed(args.books, args.users, args.seed)
+        print(f"Đã nạp {args.books:,} sách, {args.users:,} người dùng ({time.perf_counter() - started:.1f}s)")
+        if args.seed_only:
+            return 0
+    ctx = load_context()
+
+    server = None
+    if args.transport == 'inprocess':
+        app = create_app()
+        make_client = lambda: InProcessClient(app)
+    else:
+        url = args.url
+        if url is None:
+            url, server = serve_local(create_app())
+        make_client = lambda: HttpClient(url)
+        print(f"Gửi tới {url}")
+
+    results = {}
+    try:
+        for level in levels:
+            stats = run_level(make_client, mix, ctx, level, args.duration, args.seed)
+            results[str(level)] = stats
+            print(f"\n== concurrency {level} ({args.transport}, {args.duration:g}s)")
+            print(f"{'thao tác':<10} {'request':>8} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'lỗi':>7}")
+            for name, item in stats.items():
+                print(f"{name:<10} {item['requests']:>8} {item['throughput_rps']:>10,.1f} {item['p50_ms']:>9.2f} "
+                      f"{item['p95_ms']:>9.2f} {item['p99_ms']:>9.2f} {item['error_rate']:>7.1%}")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    if args.save:
+        save_results(args.save, results, transport=args.transport, mix=mix, duration=args.duration,
+                     books=args.books, users=args.users)
+        print(f"\nĐã lưu kết quả: {args.save}")
+
+    if args.compare:
+        baseline = load_results(args.compare)
+        if baseline['meta'].get('transport') != args.transport:
+            print(f"\nLưu ý: baseline chạy với transport {baseline['meta'].get('transport')}, lần này {args.transport}")
+        regressions = compare(results, baseline, args.threshold,
+                              (('p95_ms', True), ('throughput_rps', False), ('error_rate', True)))
+        if regressions:
+            print(f"\n{len(regressions)} hồi quy vượt {args.threshold:.0%}:")
+            for item in regressions:
+                print(f"  {item}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
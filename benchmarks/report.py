@@ -0,0 +1,81 @@
+"""
+Phần dùng chung của các benchmark: percentile, lưu kết quả kèm commit git và so với baseline đã lưu
+
+Kết quả có dạng {nhóm: {trường hợp: {metric: giá trị}}} (nhóm = kích thước catalog, mức concurrency...)
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import json
+import math
+import os
+import platform
+import subprocess
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """Percentile kiểu nearest-rank trên mẫu đã sắp xếp"""
+    if not samples:
+        return 0.0
+    rank = max(1, min(len(samples), math.ceil(p / 100 * len(samples))))
+    return samples[rank - 1]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(path: str, results: Dict[str, Dict[str, dict]], **meta):
+    """Ghi kết quả ra JSON, meta kèm commit, thời điểm, phiên bản Python và platform"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'meta': {
+                'commit': git_commit(),
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                **meta,
+            },
+            'results': results,
+        }, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(results: Dict[str, Dict[str, dict]], baseline: dict, threshold: float,
+            metrics: Tuple[Tuple[str, bool], ...]) -> List[str]:
+    """
+    So với baseline: trả về danh sách hồi quy
+    metrics: (tên metric, True nếu tăng là tệ hơn / False nếu giảm là tệ hơn)
+    """
+    regressions = []
+    print(f"\n== So với baseline {baseline['meta'].get('commit') or ''} ({baseline['meta'].get('created_at')})")
+    for group, cases in results.items():
+        for name, stats in cases.items():
+            base = baseline['results'].get(group, {}).get(name)
+            if base is None:
+                continue
+            for metric, higher_is_worse in metrics:
+                old, new = base.get(metric), stats.get(metric)
+                if old is None or new is None:
+                    continue
+                if old == 0:
+                    # Baseline bằng 0 (vd: không có lỗi): chỉ báo khi xuất hiện giá trị tệ hơn
+                    if not (higher_is_worse and new > 0):
+                        continue
+                    change = float('inf')
+                else:
+                    change = new / old - 1
+                worse = change if higher_is_worse else -change
+                flag = ''
+                if worse > threshold:
+                    flag = '  <-- hồi quy'
+                    regressions.append(f"{group} {name} {metric} {change:+.1%}")
+                print(f"{group:>8} {name:<30} {metric:<22} {old:>14,.2f} -> {new:>14,.2f} {change:+8.1%}{flag}")
+    return regressions
@@ -1,10 +1,16 @@
-import mysql.connector
-from mysql.connector import pooling
+from app.config.sqlite_backend import connect_sqlite
 from dotenv import load_dotenv
+from collections import deque
+from contextvars import ContextVar
 import os
+import threading
+import time
 
 load_dotenv()
 
+# Backend lưu trữ: 'mysql' (mặc định) hoặc 'sqlite' (chạy in-process, không cần MySQL server)
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+
 DB_CONFIG = {
     "host": os.getenv("DB_HOST", "localhost"),
     "user": os.getenv("DB_USER", "root"),
@@ -13,7 +19,359 @@ DB_CONFIG = {
     "port": int(os.getenv("DB_PORT", 3306))
 }
 
-# Simple connection function
+SQLITE_CONFIG = {
+    "path": os.getenv("DB_SQLITE_PATH", "libraryx.db"),
+    "busy_timeout": float(os.getenv("DB_SQLITE_BUSY_TIMEOUT", 5)),              # giây chờ khi DB đang bị khóa ghi
+    "cached_statements": int(os.getenv("DB_SQLITE_CACHED_STATEMENTS", 256)),    # số prepared statement cache mỗi connection
+    "synchronous": os.getenv("DB_SQLITE_SYNCHRONOUS", "NORMAL").upper(),       # NORMAL là đủ an toàn với WAL
+}
+
+# Cấu hình pool (có thể override bằng biến môi trường)
+POOL_CONFIG = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),                 # số connection giữ sẵn
+    "max_overflow": int(os.getenv("DB_POOL_MAX_OVERFLOW", 10)),     # số connection mở thêm khi tải cao
+    "timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),             # giây chờ tối đa khi pool đầy
+    "recycle": float(os.getenv("DB_POOL_RECYCLE", 1800)),           # giây, connection già hơn sẽ bị đóng
+    "idle_timeout": float(os.getenv("DB_POOL_IDLE_TIMEOUT", 600)),  # giây, connection rảnh lâu hơn sẽ bị đóng
+    "pre_ping": os.getenv("DB_POOL_PRE_PING", "1").lower() not in ("0", "false", "no"),
+    "ping_after": float(os.getenv("DB_POOL_PING_AFTER", 5)),        # chỉ ping khi connection đã rảnh quá N giây
+}
+
+
+class PoolTimeoutError(Exception):
+    """Hết thời gian chờ lấy connection từ pool"""
+    pass
+
+
+# Observer câu SQL (metrics, slow query log...): observer(query, elapsed_seconds) sau mỗi execute/executemany
+# Tuple rỗng thì cursor không bị bọc - không tốn gì khi không đo
+# Copy-on-write: thêm/bớt thay nguyên tuple (dưới lock), cursor đang lặp vẫn giữ tuple cũ
+_sql_observers = ()
+_sql_observers_lock = threading.Lock()
+
+
+def add_sql_observer(observer):
+    """Đăng ký observer cho mọi câu SQL chạy qua connection của pool"""
+    global _sql_observers
+    with _sql_observers_lock:
+        if observer not in _sql_observers:
+            _sql_observers = _sql_observers + (observer,)
+
+
+def remove_sql_observer(observer):
+    global _sql_observers
+    with _sql_observers_lock:
+        _sql_observers = tuple(current for current in _sql_observers if current != observer)
+
+
+class ObservedCursor:
+    """Bọc cursor thật: đo thời gian execute/executemany rồi báo cho các observer"""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def execute(self, query, params=()):
+        started = time.perf_counter()
+        try:
+            return self._raw.execute(query, params)
+        finally:
+            self._notify(query, time.perf_counter() - started)
+
+    def executemany(self, query, seq_params):
+        started = time.perf_counter()
+        try:
+            return self._raw.executemany(query, seq_params)
+        finally:
+            self._notify(query, time.perf_counter() - started)
+
+    @staticmethod
+    def _notify(query, elapsed: float):
+        for observer in _sql_observers:
+            observer(query, elapsed)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._raw.close()
+        return False
+
+
+class PooledConnection:
+    """
+    Proxy bọc connection thật
+    close() trả connection về pool thay vì đóng socket, các thuộc tính khác
+    (cursor, commit, rollback...) được chuyển thẳng xuống connection thật
+    """
+
+    def __init__(self, pool: 'ConnectionPool', raw, created_at: float):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get('_raw')
+        if raw is None:
+            raise AttributeError(f"Connection đã được trả về pool (truy cập '{name}')")
+        return getattr(raw, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self.__getattr__('cursor')(*args, **kwargs)
+        return ObservedCursor(cursor) if _sql_observers else cursor
+
+    def close(self):
+        """Trả connection về pool (gọi nhiều lần không sao)"""
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._release(raw, self._created_at)
+
+    def invalidate(self):
+        """Đóng hẳn connection thay vì trả về pool (vd: còn result chưa đọc hết)"""
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._discard(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    """
+    Pool connection dùng chung cho toàn bộ model và repository
+    - pool_size connection được giữ lại sau khi dùng, max_overflow connection mở thêm khi tải cao
+    - Connection quá recycle giây tuổi hoặc rảnh quá idle_timeout giây sẽ bị đóng
+    - pre_ping: kiểm tra connection còn sống trước khi giao cho caller
+    """
+
+    def __init__(self, connect, pool_size: int = 5, max_overflow: int = 10, timeout: float = 30,
+                 recycle: float = 1800, idle_timeout: float = 600, pre_ping: bool = True,
+                 ping_after: float = 5):
+        self._connect = connect
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.idle_timeout = idle_timeout
+        self.pre_ping = pre_ping
+        self.ping_after = ping_after
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (raw, created_at, last_used)
+        self._open = 0        # tổng số connection đang mở (rảnh + đang dùng)
+        self._in_use = 0
+        self._stats = {
+            'checkouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'ping_failures': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+        }
+
+    # ========== Checkout / Release ==========
+
+    def acquire(self) -> PooledConnection:
+        """Lấy connection từ pool, chờ tối đa timeout giây nếu pool đã đầy"""
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()  # LIFO: giữ connection "nóng", connection thừa tự hết hạn
+                    break
+                if self._open < self.pool_size + self.max_overflow:
+                    entry = None
+                    self._open += 1
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"Không lấy được connection sau {self.timeout}s "
+                        f"(pool_size={self.pool_size}, max_overflow={self.max_overflow})"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+            self._in_use += 1
+            self._stats['checkouts'] += 1
+            if waited:
+                wait_ms = (time.perf_counter() - started) * 1000
+                self._stats['waits'] += 1
+                self._stats['total_wait_ms'] += wait_ms
+                self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], wait_ms)
+
+        try:
+            raw, created_at = self._checkout_entry(entry)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, raw, created_at)
+
+    def _checkout_entry(self, entry):
+        """Kiểm tra connection rảnh (tuổi, idle, ping); mở connection mới nếu cần"""
+        if entry is not None:
+            raw, created_at, last_used = entry
+            now = time.monotonic()
+            if now - created_at > self.recycle or now - last_used > self.idle_timeout:
+                self._count('recycled')
+                self._close_quietly(raw)
+            elif self.pre_ping and now - last_used > self.ping_after and not self._ping(raw):
+                self._count('ping_failures')
+                self._close_quietly(raw)
+            else:
+                return raw, created_at
+
+        raw = self._connect()
+        self._count('created')
+        return raw, time.monotonic()
+
+    def _release(self, raw, created_at: float):
+        """Nhận lại connection: rollback transaction dở dang rồi đưa vào hàng đợi rảnh"""
+        healthy = True
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy and len(self._idle) < self.pool_size:
+                self._idle.append((raw, created_at, time.monotonic()))
+                raw = None
+            else:
+                self._open -= 1
+            self._cond.notify()
+
+        if raw is not None:
+            self._close_quietly(raw)
+
+    def _discard(self, raw):
+        """Đóng connection hỏng/không dùng lại được và giải phóng chỗ trong pool"""
+        with self._cond:
+            self._in_use -= 1
+            self._open -= 1
+            self._cond.notify()
+        self._close_quietly(raw)
+
+    # ========== Helpers ==========
+
+    def _ping(self, raw) -> bool:
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _count(self, key: str):
+        with self._cond:
+            self._stats[key] += 1
+
+    def stats(self) -> dict:
+        """Thống kê pool: số connection, thời gian chờ, số lần recycle/ping lỗi"""
+        with self._cond:
+            data = dict(self._stats)
+            data.update({
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'occupancy': self._in_use / (self.pool_size + self.max_overflow),
+            })
+        data['avg_wait_ms'] = data['total_wait_ms'] / data['waits'] if data['waits'] else 0.0
+        return data
+
+    def dispose(self):
+        """Đóng toàn bộ connection đang rảnh (dùng khi tắt app hoặc sau fork)"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+        for raw, _, _ in idle:
+            self._close_quietly(raw)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _connect_mysql():
+    import mysql.connector  # import lazy: backend sqlite không cần cài driver MySQL
+    return mysql.connector.connect(**DB_CONFIG)
+
+
+def _connect_sqlite():
+    return connect_sqlite(**SQLITE_CONFIG)
+
+
+_BACKENDS = {
+    'mysql': _connect_mysql,
+    'sqlite': _connect_sqlite,
+}
+
+
+def get_pool() -> ConnectionPool:
+    """Pool dùng chung (khởi tạo lazy, thread-safe)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if DB_BACKEND not in _BACKENDS:
+                    raise ValueError(f"DB_BACKEND không hợp lệ: {DB_BACKEND}. Phải là: {', '.join(_BACKENDS)}")
+                _pool = ConnectionPool(_BACKENDS[DB_BACKEND], **POOL_CONFIG)
+    return _pool
+
+
+def get_pool_stats() -> dict:
+    """Thống kê pool dùng chung"""
+    return get_pool().stats()
+
+
+# Unit of work đang hoạt động trong request/context hiện tại (xem app.config.unit_of_work)
+_current_session = ContextVar('db_session', default=None)
+
+
+def get_current_session():
+    """Unit of work đang được bind (None nếu không có)"""
+    return _current_session.get()
+
+
+def bind_session(session):
+    """Bind unit of work vào context hiện tại, trả về token để reset"""
+    return _current_session.set(session)
+
+
+def unbind_session(token):
+    _current_session.reset(token)
+
+
+# Lấy connection: nếu đang trong unit of work thì dùng chung connection của nó,
+# ngược lại mượn từ pool; conn.close() (hoặc thoát khối with) sẽ trả connection về pool
 def get_db_connection():
-    conn = mysql.connector.connect(**DB_CONFIG)
-    return conn
+    session = _current_session.get()
+    if session is not None:
+        return session.connection()
+    return get_pool().acquire()
@@ -0,0 +1,185 @@
+"""
+Metrics theo request cho Flask app, xuất ở /metrics (định dạng text của Prometheus)
+
+    from app.config import metrics
+    metrics.init_app(app, stats_sources={'book_cache': cached_repository.stats})
+
+Mỗi request ghi theo (blueprint, endpoint): histogram độ trễ, số response theo status,
+số câu SQL và tổng thời gian SQL (đo ở cursor của connection pool - mọi model/repository,
+kể cả BookRepository._execute_query và unit of work, đều đi qua đó). Kèm gauge của pool connection
+và các nguồn stats() đăng ký thêm (cache repository...).
+Chi phí mỗi request: cộng dồn vào một list cho mỗi câu SQL, một lần lấy lock khi request kết thúc.
+"""
+from app.config.db_config import add_sql_observer, get_pool_stats
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Tuple
+import threading
+import time
+
+PREFIX = 'libraryx'
+
+# Bucket độ trễ request (giây)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# [số câu SQL, tổng giây SQL] của request hiện tại (None ngoài request, vd: job chạy nền)
+_request_sql: ContextVar[Optional[list]] = ContextVar('metrics_request_sql', default=None)
+
+
+class Histogram:
+    """Histogram bucket cố định (đếm không cộng dồn, cộng dồn khi xuất)"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # phần tử cuối: > bucket lớn nhất (+Inf)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Giữ toàn bộ metric trong bộ nhớ process; mọi cập nhật dưới một lock"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._responses: Dict[Tuple[str, str, str], int] = {}
+        self._sql_statements: Dict[Tuple[str, str], int] = {}
+        self._sql_seconds: Dict[Tuple[str, str], float] = {}
+        self._stats_sources: Dict[str, Callable[[], dict]] = {}
+
+    def observe_request(self, blueprint: str, endpoint: str, status: int, elapsed: float,
+                        sql_statements: int, sql_seconds: float):
+        key = (blueprint, endpoint)
+        with self._lock:
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = Histogram(self.buckets)
+            histogram.observe(elapsed)
+            status_key = (blueprint, endpoint, str(status))
+            self._responses[status_key] = self._responses.get(status_key, 0) + 1
+            self._sql_statements[key] = self._sql_statements.get(key, 0) + sql_statements
+            self._sql_seconds[key] = self._sql_seconds.get(key, 0.0) + sql_seconds
+
+    def observe_sql(self, elapsed: float):
+        """Câu SQL chạy ngoài request (job nền, CLI): ghi vào blueprint/endpoint rỗng"""
+        key = ('', '')
+        with self._lock:
+            self._sql_statements[key] = self._sql_statements.get(key, 0) + 1
+            self._sql_seconds[key] = self._sql_seconds.get(key, 0.0) + elapsed
+
+    def register_stats(self, name: str, source: Callable[[], dict]):
+        """Xuất các giá trị số của source() thành gauge {PREFIX}_{name}_{khóa}"""
+        with self._lock:
+            self._stats_sources[name] = source
+
+    def render(self) -> str:
+        """Toàn bộ metric theo định dạng text exposition của Prometheus"""
+        with self._lock:
+            latency = {key: (list(h.counts), h.sum, h.count) for key, h in self._latency.items()}
+            responses = dict(self._responses)
+            sql_statements = dict(self._sql_statements)
+            sql_seconds = dict(self._sql_seconds)
+            sources = dict(self._stats_sources)
+
+        lines = []
+        name = f'{PREFIX}_http_request_duration_seconds'
+        lines += [f'# HELP {name} Thời gian xử lý request', f'# TYPE {name} histogram']
+        for (blueprint, endpoint), (counts, total, count) in sorted(latency.items()):
+            labels = _labels(blueprint=blueprint, endpoint=endpoint)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{_labels(blueprint=blueprint, endpoint=endpoint, le=le)} {cumulative}')
+            lines.append(f'{name}_sum{labels} {total!r}')
+            lines.append(f'{name}_count{labels} {count}')
+
+        name = f'{PREFIX}_http_responses_total'
+        lines += [f'# HELP {name} Số response theo status', f'# TYPE {name} counter']
+        for (blueprint, endpoint, status), value in sorted(responses.items()):
+            lines.append(f'{name}{_labels(blueprint=blueprint, endpoint=endpoint, status=status)} {value}')
+
+        for name, help_text, values in (
+            (f'{PREFIX}_sql_statements_total', 'Số câu SQL', sql_statements),
+            (f'{PREFIX}_sql_duration_seconds_total', 'Tổng thời gian chạy SQL', sql_seconds),
+        ):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for (blueprint, endpoint), value in sorted(values.items()):
+                lines.append(f'{name}{_labels(blueprint=blueprint, endpoint=endpoint)} {value!r}')
+
+        for source_name, source in sorted(sources.items()):
+            try:
+                stats = source()
+            except Exception:
+                continue
+            for key, value in sorted(stats.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f'{PREFIX}_{source_name}_{key}'
+                lines += [f'# TYPE {name} gauge', f'{name} {value!r}']
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels) -> str:
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+registry = MetricsRegistry()
+
+
+def _observe_sql(query, elapsed: float):
+    current = _request_sql.get()
+    if current is None:
+        registry.observe_sql(elapsed)
+        return
+    current[0] += 1
+    current[1] += elapsed
+
+
+def init_app(app, stats_sources: Optional[Dict[str, Callable[[], dict]]] = None, path: str = '/metrics'):
+    """
+    Đo mọi request của app và thêm route /metrics
+    stats_sources: {tên: hàm trả dict số liệu} xuất thành gauge (vd: {'book_cache': cached_repository.stats})
+    Pool connection luôn được xuất (db_pool_*)
+    """
+    from flask import Response, g, request
+
+    registry.register_stats('db_pool', get_pool_stats)
+    for name, source in (stats_sources or {}).items():
+        registry.register_stats(name, source)
+    add_sql_observer(_observe_sql)
+
+    @app.before_request
+    def _start_metrics():
+        g._metrics = (time.perf_counter(), [0, 0.0])
+        _request_sql.set(g._metrics[1])
+
+    @app.after_request
+    def _record_metrics(response):
+        started, sql = g.pop('_metrics', (None, None))
+        if started is None:
+            return response
+        blueprint, endpoint, status = request.blueprint or '', request.endpoint or '', response.status_code
+
+        def record():
+            _request_sql.set(None)
+            registry.observe_request(blueprint, endpoint, status, time.perf_counter() - started, sql[0], sql[1])
+
+        # Ghi khi response đóng: response stream (export) được tính cả thời gian và SQL lúc stream
+        response.call_on_close(record)
+        return response
+
+    def metrics_view():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    app.add_url_rule(path, 'metrics', metrics_view)
@@ -0,0 +1,164 @@
+"""
+Migration schema có version: file migrations/NNNN_tên.sql, áp dụng theo thứ tự và ghi vào bảng schema_migrations
+
+    python -m app.config.migrations up       # áp dụng các migration chưa chạy
+    python -m app.config.migrations status   # liệt kê migration và thời điểm áp dụng
+    python -m app.config.migrations check    # EXPLAIN các truy vấn nóng (config/query_plans.py)
+
+App (main.create_app) gọi ensure_current() khi khởi động: schema chưa chạy hết migration thì dừng ngay
+thay vì lỗi ở request đầu tiên đụng tới bảng/cột mới.
+
+File migration viết bằng SQL dùng chung cho MySQL và SQLite (vd: CREATE INDEX), các câu cách nhau bởi ';'.
+MySQL tự commit sau mỗi câu DDL: migration lỗi giữa chừng không rollback được nên mỗi file nên là một thay đổi nhỏ.
+"""
+from app.config.db_config import DB_BACKEND, get_pool
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import os
+import re
+import sys
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+_FILE_RE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+_CREATE_TABLE = """CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(20) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)"""
+
+# Khóa MySQL (GET_LOCK) để hai instance khởi động cùng lúc không chạy trùng migration
+_LOCK_NAME = 'libraryx_schema_migrations'
+_LOCK_TIMEOUT = 60
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    name: str
+    path: str
+
+    def statements(self) -> List[str]:
+        """Các câu SQL trong file (bỏ dòng comment '--', tách theo ';')"""
+        with open(self.path, encoding='utf-8') as f:
+            lines = [line for line in f if not line.lstrip().startswith('--')]
+        return [statement.strip() for statement in ''.join(lines).split(';') if statement.strip()]
+
+
+def discover(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Migration trong thư mục, sắp theo version; version trùng là lỗi"""
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _FILE_RE.match(filename)
+        if not match:
+            continue
+        version, name = match.groups()
+        if version in migrations:
+            raise ValueError(f"Trùng version migration {version}: {migrations[version].path}, {filename}")
+        migrations[version] = Migration(version, name, os.path.join(directory, filename))
+    return sorted(migrations.values(), key=lambda migration: int(migration.version))
+
+
+def _applied(cursor) -> Dict[str, object]:
+    cursor.execute("SELECT version, applied_at FROM schema_migrations")
+    return {str(row['version']): row['applied_at'] for row in cursor.fetchall()}
+
+
+def status(directory: str = MIGRATIONS_DIR) -> List[dict]:
+    """[{version, name, applied_at}] - applied_at None nếu chưa áp dụng"""
+    with get_pool().acquire() as conn, conn.cursor(dictionary=True) as cursor:
+        cursor.execute(_CREATE_TABLE)
+        conn.commit()
+        applied = _applied(cursor)
+    return [
+        {'version': migration.version, 'name': migration.name, 'applied_at': applied.get(migration.version)}
+        for migration in discover(directory)
+    ]
+
+
+def pending(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Các migration chưa áp dụng"""
+    applied = {item['version'] for item in status(directory) if item['applied_at'] is not None}
+    return [migration for migration in discover(directory) if migration.version not in applied]
+
+
+def ensure_current(directory: str = MIGRATIONS_DIR):
+    """RuntimeError nếu còn migration chưa áp dụng"""
+    missing = pending(directory)
+    if missing:
+        names = ', '.join(f"{migration.version}_{migration.name}" for migration in missing)
+        raise RuntimeError(f"Schema chưa ở version mới nhất, còn migration chưa áp dụng: {names}. "
+                           f"Chạy: python -m app.config.migrations up")
+
+
+def migrate(target: Optional[str] = None, directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Áp dụng các migration chưa chạy (tới target nếu có), trả về danh sách đã áp dụng"""
+    migrations = discover(directory)
+    done = []
+    with get_pool().acquire() as conn, conn.cursor(dictionary=True) as cursor:
+        cursor.execute(_CREATE_TABLE)
+        conn.commit()
+        locked = _acquire_lock(cursor)
+        try:
+            # Đọc lại sau khi có khóa: instance khác có thể vừa áp dụng xong
+            applied = _applied(cursor)
+            for migration in migrations:
+                if target is not None and int(migration.version) > int(target):
+                    break
+                if migration.version in applied:
+                    continue
+                for statement in migration.statements():
+                    cursor.execute(statement)
+                cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                               (migration.version, migration.name))
+                conn.commit()
+                done.append(migration)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if locked:
+                cursor.execute("SELECT RELEASE_LOCK(%s) AS released", (_LOCK_NAME,))
+                cursor.fetchall()
+    return done
+
+
+def _acquire_lock(cursor) -> bool:
+    if DB_BACKEND != 'mysql':
+        # SQLite: một file, ghi tuần tự - không cần khóa riêng
+        return False
+    cursor.execute("SELECT GET_LOCK(%s, %s) AS acquired", (_LOCK_NAME, _LOCK_TIMEOUT))
+    if not cursor.fetchone()['acquired']:
+        raise RuntimeError(f"Không lấy được khóa migration sau {_LOCK_TIMEOUT} giây")
+    return True
+
+
+def main(argv: List[str]) -> int:
+    command = argv[0] if argv else 'up'
+    if command == 'up':
+        done = migrate(argv[1] if len(argv) > 1 else None)
+        for migration in done:
+            print(f"Đã áp dụng {migration.version}_{migration.name}")
+        if not done:
+            print("Schema đã ở version mới nhất")
+        return 0
+    if command == 'status':
+        for item in status():
+            print(f"{item['version']}_{item['name']:<40} {item['applied_at'] or 'chưa áp dụng'}")
+        return 0
+    if command == 'check':
+        from app.config.query_plans import check_query_plans
+        problems = check_query_plans()
+        for name, issues in problems.items():
+            print(f"FAIL {name}: {'; '.join(issues)}")
+        if problems:
+            return 1
+        print("Mọi truy vấn nóng đều dùng index")
+        return 0
+    print(f"Lệnh không hợp lệ: {command}. Dùng: up [version] | status | check")
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
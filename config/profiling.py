@@ -0,0 +1,240 @@
+"""
+Profile theo yêu cầu cho từng endpoint (tắt mặc định)
+
+    from app.config import profiling
+    profiling.init_app(app)                       # + đăng ký views/profile_view.py (bp) để xem/tải kết quả
+
+Request được profile khi:
+- PROFILE_ENABLED=1 và request được lấy mẫu (PROFILE_SAMPLE_RATE, mặc định 0.01), hoặc
+- request có header X-Profile: 1 từ admin (session role 'admin') hoặc X-Profile: <PROFILE_ADMIN_TOKEN>.
+Chỉ các blueprint trong PROFILE_BLUEPRINTS (mặc định book_api, book_web, invoices, borrow).
+
+Mỗi request được profile chạy dưới cProfile (PROFILE_MODE=cprofile, mặc định) và/hoặc bộ lấy mẫu stack
+(PROFILE_MODE=sampling: chỉ lấy mẫu, overhead thấp; both: cả hai). Kết quả cộng dồn theo endpoint trong bộ nhớ,
+ghi ra PROFILE_DIR trước khi xem/tải, mỗi PROFILE_FLUSH_SECONDS (mặc định 30) và khi process thoát:
+- <endpoint>.pstats: mở bằng `python -m pstats`, snakeviz...;
+- <endpoint>.collapsed: collapsed stacks ("a;b;c số_mẫu") cho flamegraph.pl, speedscope, inferno.
+"""
+from collections import Counter
+from typing import Dict, List, Optional
+import atexit
+import cProfile
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+
+ENABLED = os.getenv("PROFILE_ENABLED", "0").lower() in ("1", "true", "yes")
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.01))
+MODE = os.getenv("PROFILE_MODE", "cprofile").lower()                       # cprofile | sampling | both
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+BLUEPRINTS = tuple(name.strip() for name in
+                   os.getenv("PROFILE_BLUEPRINTS", "book_api,book_web,invoices,borrow").split(',') if name.strip())
+ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", 5)) / 1000   # chu kỳ lấy mẫu stack
+FLUSH_INTERVAL = float(os.getenv("PROFILE_FLUSH_SECONDS", 30))              # chu kỳ ghi kết quả ra PROFILE_DIR
+
+PROFILE_HEADER = 'X-Profile'
+
+logger = logging.getLogger(__name__)
+
+_FILENAME_RE = re.compile(r'[^\w.\-]')
+
+
+def is_admin(request, session) -> bool:
+    """Admin đăng nhập (session role 'admin') hoặc gửi đúng PROFILE_ADMIN_TOKEN trong header X-Profile"""
+    if session.get('role') == 'admin':
+        return True
+    return bool(ADMIN_TOKEN) and request.headers.get(PROFILE_HEADER) == ADMIN_TOKEN
+
+
+def endpoint_filename(endpoint: str) -> str:
+    return _FILENAME_RE.sub('_', endpoint)
+
+
+class StackSampler:
+    """
+    Một thread nền đọc stack của các thread đang được profile mỗi SAMPLE_INTERVAL giây (sys._current_frames)
+    Không chạm vào code đang chạy nên overhead thấp hơn nhiều so với cProfile
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._targets: Dict[int, Counter] = {}
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, thread_id: int) -> Counter:
+        stacks = Counter()
+        with self._lock:
+            self._targets[thread_id] = stacks
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return stacks
+
+    def stop(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                if not self._targets:
+                    self._wake.clear()
+                    continue
+                for thread_id, stacks in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[_collapse(frame)] += 1
+
+
+def _collapse(frame) -> str:
+    """Stack từ ngoài vào trong, dạng collapsed: 'module:hàm;module:hàm;...'"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.splitext(os.path.basename(code.co_filename))[0]}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class ProfileStore:
+    """
+    Kết quả cộng dồn theo endpoint, giữ trong bộ nhớ và ghi ra PROFILE_DIR khi flush():
+    trước khi xem/tải (views/profile_view.py), từ thread nền mỗi PROFILE_FLUSH_SECONDS và khi process thoát.
+    Request được profile chỉ thêm kết quả vào hàng đợi - không ghi file, không gộp pstats
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR, flush_interval: float = FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval      # <= 0: không có thread nền, chỉ flush() khi được gọi
+        self._lock = threading.Lock()             # giữ rất ngắn: hàng đợi của request
+        self._flush_lock = threading.Lock()       # gộp + ghi file, ngoài đường đi của request
+        self._pending_profiles: Dict[str, List[cProfile.Profile]] = {}
+        self._pending_stacks: Dict[str, Counter] = {}
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._stacks: Dict[str, Counter] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, endpoint: str, profile: Optional[cProfile.Profile], stacks: Optional[Counter]):
+        name = endpoint_filename(endpoint)
+        with self._lock:
+            if profile is not None:
+                self._pending_profiles.setdefault(name, []).append(profile)
+            if stacks:
+                self._pending_stacks.setdefault(name, Counter()).update(stacks)
+            if self._thread is None and self.flush_interval > 0:
+                self._thread = threading.Thread(target=self._run, name='profile-flush', daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """Gộp các kết quả đang chờ vào tổng theo endpoint và ghi lại các file đã thay đổi"""
+        with self._flush_lock:
+            with self._lock:
+                profiles, self._pending_profiles = self._pending_profiles, {}
+                stacks, self._pending_stacks = self._pending_stacks, {}
+            if not profiles and not stacks:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            for name, items in profiles.items():
+                path = os.path.join(self.directory, f'{name}.pstats')
+                stats = self._stats.get(name)
+                if stats is None:
+                    # Cộng dồn tiếp file của lần chạy trước (process restart)
+                    stats = pstats.Stats(path) if os.path.exists(path) else pstats.Stats(items.pop())
+                    self._stats[name] = stats
+                if items:
+                    stats.add(*items)
+                stats.dump_stats(path)
+            for name, counter in stacks.items():
+                path = os.path.join(self.directory, f'{name}.collapsed')
+                total = self._stacks.get(name)
+                if total is None:
+                    total = self._stacks[name] = _read_collapsed(path)
+                total.update(counter)
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.writelines(f'{stack} {count}\n' for stack, count in total.most_common())
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Không ghi được kết quả profile vào %s", self.directory)
+
+    def files(self) -> list:
+        """[{name, size, modified}] các file kết quả, mới nhất trước"""
+        if not os.path.isdir(self.directory):
+            return []
+        items = []
+        for filename in os.listdir(self.directory):
+            if filename.endswith(('.pstats', '.collapsed')):
+                stat = os.stat(os.path.join(self.directory, filename))
+                items.append({'name': filename, 'size': stat.st_size, 'modified': stat.st_mtime})
+        return sorted(items, key=lambda item: item['modified'], reverse=True)
+
+
+def _read_collapsed(path: str) -> Counter:
+    stacks = Counter()
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack and count.isdigit():
+                    stacks[stack] += int(count)
+    return stacks
+
+
+store = ProfileStore()
+sampler = StackSampler()
+atexit.register(store.flush)
+
+
+def init_app(app, blueprints=BLUEPRINTS):
+    """Profile các request thuộc blueprints theo cấu hình PROFILE_*"""
+    from flask import g, request, session
+
+    def _wanted() -> bool:
+        if request.blueprint not in blueprints:
+            return False
+        if request.headers.get(PROFILE_HEADER) and is_admin(request, session):
+            return True
+        return ENABLED and random.random() < SAMPLE_RATE
+
+    @app.before_request
+    def _start_profile():
+        if not _wanted():
+            return
+        profile = None
+        if MODE in ('cprofile', 'both'):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+: chỉ một profiler hoạt động tại một thời điểm - bỏ qua request này
+                return
+        thread_id = threading.get_ident()
+        if MODE in ('sampling', 'both'):
+            sampler.start(thread_id)
+        g._profile = (profile, thread_id)
+
+    @app.teardown_request
+    def _finish_profile(exc=None):
+        profile, thread_id = g.pop('_profile', (None, None))
+        if thread_id is None:
+            return
+        if profile is not None:
+            profile.disable()
+        stacks = sampler.stop(thread_id) if MODE in ('sampling', 'both') else None
+        store.add(request.endpoint or request.path, profile, stacks)
@@ -0,0 +1,172 @@
+"""
+Kiểm tra câu SQL ở tầng truy cập dữ liệu: slow query log và phát hiện N+1
+
+    from app.config import query_inspector
+    query_inspector.init_app(app)
+
+Mọi câu SQL chạy qua connection của pool (config/db_config.py) được fingerprint (bỏ literal/tham số,
+gom IN (...) và VALUES (...)) rồi:
+- câu chạy lâu hơn DB_SLOW_QUERY_MS (mặc định 200ms) được log kèm vị trí gọi trong code;
+- cùng một fingerprint chạy quá DB_N_PLUS_ONE_THRESHOLD lần (mặc định 10) trong một request thì log cảnh báo N+1.
+
+Trong test, ghim số câu SQL tối đa của một endpoint:
+
+    with query_inspector.assert_max_queries(3):
+        client.get('/api/books/1')
+"""
+from app.config.db_config import add_sql_observer
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import re
+import sys
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_SECONDS = float(os.getenv("DB_SLOW_QUERY_MS", 200)) / 1000      # 0 = log mọi câu
+N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", 10))      # 0 = tắt cảnh báo N+1
+
+# Thư mục gốc của app: vị trí gọi là frame đầu tiên trong app nhưng ngoài config/ (pool, unit of work)
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_CONFIG_DIR = os.path.join(_APP_ROOT, 'config')
+_CALL_SITE_DEPTH = 4
+
+_COMMENT_RE = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])')
+_PARAM_RE = re.compile(r'%\(\w+\)s|%s|\?|:\w+')
+_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_VALUES_RE = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_SPACE_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(query) -> str:
+    """
+    Dạng chuẩn của câu SQL để gom các câu cùng hình dạng:
+    literal và placeholder thành ?, danh sách (?, ?, ...) thành (...), gộp khoảng trắng
+    """
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    text = _COMMENT_RE.sub(' ', query)
+    text = _STRING_RE.sub('?', text)
+    text = _NUMBER_RE.sub('?', text)
+    text = _PARAM_RE.sub('?', text)
+    text = _LIST_RE.sub('(...)', text)
+    text = _VALUES_RE.sub('(...)', text)
+    return _SPACE_RE.sub(' ', text).strip()
+
+
+def call_site() -> str:
+    """Vị trí gọi trong code app (tối đa 4 frame, trong cùng trước), bỏ qua các frame trong config/"""
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < _CALL_SITE_DEPTH:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_ROOT) and not filename.startswith(_CONFIG_DIR):
+            frames.append(f"{os.path.relpath(filename, _APP_ROOT)}:{frame.f_lineno} {frame.f_code.co_name}")
+        frame = frame.f_back
+    return ' <- '.join(frames) or '?'
+
+
+class QueryScope:
+    """Các câu SQL trong một phạm vi (một request, một khối assert_max_queries)"""
+
+    def __init__(self, name: str = '', record: bool = False):
+        self.name = name
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints: Dict[str, int] = {}
+        self.queries: Optional[List[Tuple[str, float, str]]] = [] if record else None   # (fingerprint, giây, vị trí gọi)
+        self._warned = set()
+
+    def add(self, key: str, elapsed: float) -> int:
+        self.count += 1
+        self.seconds += elapsed
+        count = self.fingerprints.get(key, 0) + 1
+        self.fingerprints[key] = count
+        if self.queries is not None:
+            self.queries.append((key, elapsed, call_site()))
+        return count
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> Dict[str, int]:
+        """Các fingerprint chạy quá threshold lần"""
+        return {key: count for key, count in self.fingerprints.items() if count > threshold}
+
+
+# Các scope đang mở (request, assert_max_queries lồng bên trong...) - mỗi câu SQL được đếm vào tất cả
+_scopes: ContextVar[Tuple[QueryScope, ...]] = ContextVar('query_inspector_scopes', default=())
+
+
+def push_scope(scope: QueryScope) -> QueryScope:
+    install()
+    _scopes.set(_scopes.get() + (scope,))
+    return scope
+
+
+def pop_scope(scope: QueryScope):
+    _scopes.set(tuple(item for item in _scopes.get() if item is not scope))
+
+
+def _observe(query, elapsed: float):
+    scopes = _scopes.get()
+    if elapsed >= SLOW_QUERY_SECONDS:
+        logger.warning("Slow query %.1fms: %s (%s)", elapsed * 1e3, fingerprint(query), call_site())
+    if not scopes:
+        return
+    key = fingerprint(query)
+    for scope in scopes:
+        count = scope.add(key, elapsed)
+        # Scope ghi lại câu SQL (assert_max_queries) báo qua AssertionError, không log trùng với scope request
+        if scope.queries is None and N_PLUS_ONE_THRESHOLD and count > N_PLUS_ONE_THRESHOLD \
+                and key not in scope._warned:
+            scope._warned.add(key)
+            logger.warning("Có thể N+1: %s chạy hơn %d lần trong %s (%s)",
+                           key, N_PLUS_ONE_THRESHOLD, scope.name or '?', call_site())
+
+
+def install():
+    """Bật inspector cho mọi connection lấy từ pool (gọi nhiều lần không sao)"""
+    add_sql_observer(_observe)
+
+
+@contextmanager
+def query_scope(name: str = '', record: bool = False):
+    """Đếm SQL trong khối with (ngoài Flask: job nền, CLI...)"""
+    scope = push_scope(QueryScope(name, record))
+    try:
+        yield scope
+    finally:
+        pop_scope(scope)
+
+
+@contextmanager
+def assert_max_queries(max_count: int, name: str = 'assert_max_queries'):
+    """Cho test: AssertionError (kèm danh sách câu SQL) nếu khối with chạy quá max_count câu SQL"""
+    with query_scope(name, record=True) as scope:
+        yield scope
+    if scope.count > max_count:
+        lines = [f"  {key} ({elapsed * 1e3:.1f}ms) {site}" for key, elapsed, site in scope.queries]
+        raise AssertionError(f"{scope.count} câu SQL, tối đa {max_count}:\n" + '\n'.join(lines))
+
+
+def init_app(app):
+    """Mỗi request là một scope (tên = endpoint) để phát hiện N+1; slow query log áp dụng cho mọi câu SQL"""
+    from flask import g, request
+
+    install()
+
+    @app.before_request
+    def _start_query_scope():
+        g._query_scope = push_scope(QueryScope(request.endpoint or request.path))
+
+    @app.after_request
+    def _end_query_scope(response):
+        scope = g.pop('_query_scope', None)
+        if scope is not None:
+            # Đóng scope khi response đóng: response stream (export) vẫn chạy SQL sau after_request
+            response.call_on_close(lambda: pop_scope(scope))
+        return response
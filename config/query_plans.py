@@ -0,0 +1,115 @@
+"""
+Kiểm tra plan của các truy vấn nóng: chạy EXPLAIN từng truy vấn đăng ký trong HOT_QUERIES
+và báo lỗi khi một truy vấn quay về full scan bảng hoặc phải sort ngoài index (filesort)
+
+Truy vấn của BookRepository được dựng bằng chính các method của repository (find_page, find_by_type...)
+với tham số đại diện, không chạm DB - sửa SQL trong repository thì danh sách tự đổi theo.
+SQL của models/ (BorrowModel, InvoiceModel) viết trực tiếp trong method nên vẫn chép ở đây - sửa ở đó thì sửa cả ở đây.
+Trên MySQL nên chạy với dữ liệu thật (staging): bảng gần rỗng thì optimizer có thể chọn full scan dù có index.
+"""
+from app.config.db_config import DB_BACKEND, get_pool
+from app.models.page_model import encode_cursor
+from app.repositories.book_repository import BookRepository
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Dict, List
+import re
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    name: str
+    sql: str
+    params: tuple = ()
+
+
+class _RecordingBookRepository(BookRepository):
+    """BookRepository không chạm DB: ghi lại các câu SELECT mà method dựng ra"""
+
+    def __init__(self):
+        self.queries = []
+
+    def _query_books(self, query: str, params: tuple = None):
+        self.queries.append((query, tuple(params or ())))
+        return []
+
+
+def repository_query(name: str, call: Callable[[BookRepository], object]) -> HotQuery:
+    """HotQuery từ câu SELECT duy nhất mà call(repository) chạy"""
+    repository = _RecordingBookRepository()
+    call(repository)
+    (sql, params), = repository.queries
+    return HotQuery(name, sql, params)
+
+
+HOT_QUERIES = [
+    # BookRepository
+    repository_query('book_by_code', lambda repo: repo.find_by_code('B000001')),
+    repository_query('books_by_type', lambda repo: repo.find_by_type('Sách giáo khoa')),
+    repository_query('books_by_publisher', lambda repo: repo.find_by_publisher('NXB')),
+    repository_query('books_by_publisher_type', lambda repo: repo.find_by_publisher('NXB', 'Sách giáo khoa')),
+    repository_query('books_page_name', lambda repo: repo.find_page(sort='name')),
+    repository_query('books_page_name_cursor',
+                     lambda repo: repo.find_page(sort='name', cursor=encode_cursor(['Sách', 1], 'next'))),
+    repository_query('books_page_type_name', lambda repo: repo.find_page(sort='name', book_type='Sách tham khảo')),
+    repository_query('books_page_type_newest', lambda repo: repo.find_page(book_type='Sách giáo khoa')),
+    repository_query('books_page_type_newest_cursor',
+                     lambda repo: repo.find_page(book_type='Sách giáo khoa', cursor=encode_cursor([100], 'next'))),
+    repository_query('books_page_publisher_newest', lambda repo: repo.find_page(publisher='NXB')),
+    # BorrowModel
+    HotQuery('borrows_by_user',
+             "SELECT * FROM borrow_books WHERE user_id = %s ORDER BY borrow_date DESC, borrow_id DESC", (1,)),
+    HotQuery('borrows_by_book',
+             "SELECT * FROM borrow_books WHERE book_id = %s ORDER BY borrow_date DESC, borrow_id DESC", (1,)),
+    # InvoiceModel
+    HotQuery('invoices_by_user',
+             "SELECT * FROM invoices WHERE user_id = %s ORDER BY invoice_date DESC, invoice_id DESC", (1,)),
+    HotQuery('invoices_by_date',
+             """SELECT * FROM invoices WHERE invoice_date >= %s AND invoice_date < %s
+                ORDER BY invoice_date, invoice_id""",
+             (date(2024, 1, 1), date(2024, 2, 1))),
+]
+
+# SQLite EXPLAIN QUERY PLAN: "SCAN books" (không kèm index) = full scan
+_SQLITE_FULL_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+
+def explain(cursor, query: HotQuery) -> List[str]:
+    """Các vấn đề trong plan của một truy vấn (rỗng = dùng index)"""
+    if DB_BACKEND == 'sqlite':
+        cursor.execute(f"EXPLAIN QUERY PLAN {query.sql}", query.params)
+        return _sqlite_problems([row['detail'] for row in cursor.fetchall()])
+    cursor.execute(f"EXPLAIN {query.sql}", query.params)
+    return _mysql_problems(cursor.fetchall())
+
+
+def _mysql_problems(rows: List[dict]) -> List[str]:
+    problems = []
+    for row in rows:
+        if row.get('type') == 'ALL':
+            problems.append(f"full scan bảng {row.get('table')}")
+        if 'Using filesort' in (row.get('Extra') or ''):
+            problems.append(f"filesort trên {row.get('table')}")
+    return problems
+
+
+def _sqlite_problems(details: List[str]) -> List[str]:
+    problems = []
+    for detail in details:
+        match = _SQLITE_FULL_SCAN_RE.match(detail)
+        if match:
+            problems.append(f"full scan bảng {match.group(1)}")
+        if detail.startswith('USE TEMP B-TREE FOR') and 'ORDER BY' in detail:
+            problems.append("filesort (temp b-tree cho ORDER BY)")
+    return problems
+
+
+def check_query_plans(queries: List[HotQuery] = None) -> Dict[str, List[str]]:
+    """EXPLAIN mọi truy vấn nóng; trả về {tên: [vấn đề]} chỉ gồm các truy vấn bị hồi quy"""
+    problems = {}
+    with get_pool().acquire() as conn, conn.cursor(dictionary=True) as cursor:
+        for query in queries if queries is not None else HOT_QUERIES:
+            issues = explain(cursor, query)
+            if issues:
+                problems[query.name] = issues
+    return problems
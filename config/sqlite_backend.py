@@ -0,0 +1,172 @@
+import sqlite3
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+import os
+import re
+import threading
+
+# Schema dùng chung với MySQL: đọc init_db.sql rồi chuyển cú pháp sang SQLite
+INIT_SQL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'init_db.sql')
+
+_ENUM_RE = re.compile(r'^(\s*)(\w+)\s+ENUM\s*\(([^)]*)\)', re.IGNORECASE | re.MULTILINE)
+_SKIP_RE = re.compile(r'^\s*(--|CREATE DATABASE|USE\s)', re.IGNORECASE)
+
+
+def _convert_date(value: bytes):
+    text = value.decode()
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        return text
+
+
+def _convert_datetime(value: bytes):
+    text = value.decode()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+# Kiểu dữ liệu trả về giống mysql-connector: DECIMAL -> Decimal, DATE -> date, DATETIME -> datetime
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('DECIMAL', lambda value: Decimal(value.decode()))
+sqlite3.register_converter('DATE', _convert_date)
+sqlite3.register_converter('DATETIME', _convert_datetime)
+
+
+def sqlite_schema(path: str = INIT_SQL_PATH) -> str:
+    """
+    Chuyển init_db.sql (MySQL) sang DDL SQLite:
+    - bỏ CREATE DATABASE / USE / comment
+    - INT AUTO_INCREMENT PRIMARY KEY -> INTEGER PRIMARY KEY AUTOINCREMENT
+    - col ENUM('a','b') -> col TEXT COLLATE NOCASE CHECK (col IN ('a','b'))
+      (NOCASE: ENUM của MySQL không phân biệt hoa thường, vd 'cũ' hợp lệ với ENUM('Mới','Cũ'))
+    """
+    with open(path, encoding='utf-8') as f:
+        lines = [line for line in f if not _SKIP_RE.match(line)]
+    ddl = ''.join(lines)
+    ddl = re.sub(r'\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', 'INTEGER PRIMARY KEY AUTOINCREMENT',
+                 ddl, flags=re.IGNORECASE)
+    return _ENUM_RE.sub(r'\1\2 TEXT COLLATE NOCASE CHECK (\2 IN (\3))', ddl)
+
+
+@lru_cache(maxsize=1024)
+def _translate(query: str) -> str:
+    """Placeholder %s (mysql-connector) -> ? (sqlite3); cache để câu SQL giống nhau dùng lại statement đã prepare"""
+    return query.replace('%s', '?')
+
+
+class SQLiteCursor:
+    """Cursor bọc sqlite3.Cursor với API giống mysql-connector (dictionary=True, %s, fetchmany...)"""
+
+    def __init__(self, raw: sqlite3.Cursor, dictionary: bool = False):
+        self._raw = raw
+        self._dictionary = dictionary
+        self._columns = None
+
+    def execute(self, query: str, params=()):
+        self._raw.execute(_translate(query), tuple(params or ()))
+        self._columns = [col[0] for col in self._raw.description] if self._raw.description else None
+        return self
+
+    def executemany(self, query: str, seq_params):
+        self._raw.executemany(_translate(query), seq_params)
+        self._columns = None
+        return self
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self._columns, row))
+
+    def fetchone(self):
+        return self._row(self._raw.fetchone())
+
+    def fetchmany(self, size: int = 1):
+        rows = self._raw.fetchmany(size)
+        return [dict(zip(self._columns, row)) for row in rows] if self._dictionary else rows
+
+    def fetchall(self):
+        rows = self._raw.fetchall()
+        return [dict(zip(self._columns, row)) for row in rows] if self._dictionary else rows
+
+    def __iter__(self):
+        return map(self._row, self._raw)
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    @property
+    def description(self):
+        return self._raw.description
+
+    def close(self):
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class SQLiteConnection:
+    """
+    Connection SQLite với API tối thiểu mà model/repository/pool đang dùng từ mysql-connector:
+    cursor(dictionary=..., buffered=...), commit, rollback, in_transaction, ping, close
+    """
+
+    def __init__(self, raw: sqlite3.Connection):
+        self._raw = raw
+
+    def cursor(self, dictionary: bool = False, buffered: bool = True, prepared: bool = False):
+        # sqlite3 luôn đọc từng dòng theo yêu cầu (không buffer) và tự cache statement đã prepare
+        return SQLiteCursor(self._raw.cursor(), dictionary)
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._raw.in_transaction
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def ping(self, reconnect: bool = False):
+        self._raw.execute('SELECT 1').fetchone()
+
+    def close(self):
+        self._raw.close()
+
+
+_schema_lock = threading.Lock()
+_initialized_paths = set()
+
+
+def connect_sqlite(path: str, busy_timeout: float = 5, cached_statements: int = 256,
+                   synchronous: str = 'NORMAL') -> SQLiteConnection:
+    """
+    Mở connection SQLite (WAL, foreign key bật) và tạo bảng theo init_db.sql ở lần đầu
+    check_same_thread=False vì pool giao connection cho nhiều thread (mỗi lúc một thread)
+    """
+    raw = sqlite3.connect(path, timeout=busy_timeout, detect_types=sqlite3.PARSE_DECLTYPES,
+                          cached_statements=cached_statements, check_same_thread=False)
+    raw.execute('PRAGMA journal_mode=WAL')
+    raw.execute(f'PRAGMA synchronous={synchronous}')
+    raw.execute('PRAGMA foreign_keys=ON')
+    with _schema_lock:
+        if path not in _initialized_paths:
+            raw.executescript(sqlite_schema())
+            _initialized_paths.add(path)
+    return SQLiteConnection(raw)
@@ -0,0 +1,233 @@
+"""
+Tracing theo tầng: view (request) -> controller -> service -> repository -> SQL, presenter và render Jinja
+
+    from app.config import tracing
+    tracing.init_app(app)
+
+Mỗi request có request id (header X-Request-ID gửi lên hoặc tự sinh, trả lại trong response).
+Request được lấy mẫu với xác suất TRACE_SAMPLE_RATE (0..1, mặc định 0 = tắt; app debug/testing
+thì header X-Trace: 1 bắt trace request đó);
+request được lấy mẫu ghi span lồng nhau ở mỗi ranh giới tầng và xuất theo định dạng Chrome Trace Event
+(mở bằng https://ui.perfetto.dev hoặc chrome://tracing), không cần service bên ngoài:
+- TRACE_EXPORT=stdout (mặc định): mỗi trace một dòng JSON {"traceEvents": [...]};
+- TRACE_EXPORT=<đường dẫn file>: nối event vào file JSON array (dạng không cần dấu ']' cuối mà trace viewer đọc được).
+
+Tầng được đánh dấu bằng @traced_class('service')... trên class: chỉ method public được bọc; request không được
+lấy mẫu chỉ tốn một lần đọc contextvar mỗi lời gọi. Generator (iter_books, stream_csv...) không được bọc
+vì span chỉ đo được lúc tạo generator.
+"""
+from app.config.db_config import add_sql_observer
+from app.config.query_inspector import fingerprint
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+import functools
+import inspect
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0))
+EXPORT = os.getenv("TRACE_EXPORT", "stdout")
+MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", 10000))     # giới hạn span mỗi trace (vòng lặp N+1 dài)
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+FORCE_HEADER = 'X-Trace'
+
+_REQUEST_ID_RE = re.compile(r'^[\w.\-]{1,64}$')
+
+# Mốc thời gian: ts của event (micro giây) = wall clock lúc import + perf_counter đã trôi qua
+_EPOCH_NS = time.time_ns() - time.perf_counter_ns()
+_PID = os.getpid()
+# Mỗi trace một "thread" riêng trong trace viewer để các request chạy song song không chồng lên nhau
+_trace_ids = itertools.count(1)
+
+
+class Trace:
+    """Các span của một request được lấy mẫu"""
+
+    def __init__(self, request_id: str, name: str):
+        self.request_id = request_id
+        self.tid = next(_trace_ids)
+        self.events: List[dict] = [{
+            'name': 'thread_name', 'ph': 'M', 'pid': _PID, 'tid': self.tid,
+            'args': {'name': f'{name} [{request_id}]'},
+        }]
+        self.dropped = 0
+        self.renders: List[int] = []    # thời điểm bắt đầu các template đang render (include lồng nhau)
+
+    def add(self, name: str, layer: str, started_ns: int, ended_ns: int, args: Optional[dict] = None):
+        if len(self.events) > MAX_SPANS:
+            self.dropped += 1
+            return
+        event = {
+            'name': name, 'cat': layer, 'ph': 'X', 'pid': _PID, 'tid': self.tid,
+            'ts': (_EPOCH_NS + started_ns) / 1000, 'dur': (ended_ns - started_ns) / 1000,
+        }
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar('tracing_current', default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, layer: str = 'app', **args):
+    """Span thủ công quanh một đoạn code (không làm gì nếu request không được lấy mẫu)"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter_ns()
+    try:
+        yield
+    except BaseException as e:
+        args['error'] = type(e).__name__
+        raise
+    finally:
+        trace.add(name, layer, started, time.perf_counter_ns(), args)
+
+
+def _wrap(func, name: str, layer: str):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        trace = _current.get()
+        if trace is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter_ns()
+        error = None
+        try:
+            return func(*args, **kwargs)
+        except BaseException as e:
+            error = {'error': type(e).__name__}
+            raise
+        finally:
+            trace.add(name, layer, started, time.perf_counter_ns(), error)
+    return wrapper
+
+
+def traced_class(layer: str):
+    """Class decorator: mỗi method public (kể cả staticmethod/classmethod) là một span '<Class>.<method>'"""
+    def decorate(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith('_'):
+                continue
+            kind = type(value) if isinstance(value, (staticmethod, classmethod)) else None
+            func = value.__func__ if kind else value
+            if not inspect.isfunction(func) or inspect.isgeneratorfunction(func):
+                continue
+            wrapped = _wrap(func, f'{cls.__name__}.{attr}', layer)
+            setattr(cls, attr, kind(wrapped) if kind else wrapped)
+        return cls
+    return decorate
+
+
+class StdoutExporter:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace):
+        line = json.dumps({'traceEvents': trace.events}, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+
+class FileExporter:
+    """Nối event vào file JSON array: '[' ở đầu file, mỗi event kết thúc bằng ',' - trace viewer chấp nhận thiếu ']'"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace):
+        lines = ''.join(json.dumps(event, ensure_ascii=False) + ',\n' for event in trace.events)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            if f.tell() == 0:
+                f.write('[\n')
+            f.write(lines)
+
+
+def make_exporter(target: str = EXPORT):
+    return StdoutExporter() if target in ('', 'stdout', '-') else FileExporter(target)
+
+
+def _observe_sql(query, elapsed: float):
+    trace = _current.get()
+    if trace is None:
+        return
+    ended = time.perf_counter_ns()
+    trace.add('sql', 'sql', ended - int(elapsed * 1e9), ended, {'query': fingerprint(query)})
+
+
+def _request_id(headers) -> str:
+    request_id = headers.get(REQUEST_ID_HEADER, '')
+    return request_id if _REQUEST_ID_RE.match(request_id) else uuid.uuid4().hex
+
+
+def init_app(app, sample_rate: Optional[float] = None, exporter=None):
+    """
+    Gắn request id cho mọi request, lấy mẫu và xuất trace
+    sample_rate/exporter mặc định theo TRACE_SAMPLE_RATE/TRACE_EXPORT
+    """
+    from flask import before_render_template, g, request, template_rendered
+
+    rate = SAMPLE_RATE if sample_rate is None else sample_rate
+    exporter = exporter or make_exporter()
+    add_sql_observer(_observe_sql)
+
+    @app.before_request
+    def _start_trace():
+        g.request_id = _request_id(request.headers)
+        forced = (app.debug or app.testing) and request.headers.get(FORCE_HEADER) == '1'
+        if not forced and not (rate > 0 and random.random() < rate):
+            _current.set(None)
+            return
+        trace = Trace(g.request_id, f'{request.method} {request.path}')
+        g._trace = (trace, time.perf_counter_ns())
+        _current.set(trace)
+
+    @app.after_request
+    def _finish_trace(response):
+        response.headers.setdefault(REQUEST_ID_HEADER, g.get('request_id', ''))
+        trace, started = g.pop('_trace', (None, None))
+        if trace is None:
+            return response
+        name = f'{request.method} {request.url_rule.rule if request.url_rule else request.path}'
+        args = {'request_id': trace.request_id, 'endpoint': request.endpoint, 'status': response.status_code}
+
+        def finish():
+            # Ghi khi response đóng: response stream (export) vẫn chạy code sau after_request
+            _current.set(None)
+            if trace.dropped:
+                args['dropped_spans'] = trace.dropped
+            trace.add(name, 'view', started, time.perf_counter_ns(), args)
+            exporter.export(trace)
+
+        response.call_on_close(finish)
+        return response
+
+    def _before_render(sender, template, context, **extra):
+        trace = _current.get()
+        if trace is not None:
+            trace.renders.append(time.perf_counter_ns())
+
+    def _after_render(sender, template, context, **extra):
+        trace = _current.get()
+        if trace is not None and trace.renders:
+            trace.add(f'render {template.name}', 'template', trace.renders.pop(), time.perf_counter_ns())
+
+    before_render_template.connect(_before_render, app, weak=False)
+    template_rendered.connect(_after_render, app, weak=False)
@@ -0,0 +1,221 @@
+from contextlib import contextmanager
+from typing import Callable, Dict, Tuple
+from app.config.db_config import get_pool, get_current_session, bind_session, unbind_session
+import threading
+
+
+class SessionConnection:
+    """
+    Proxy connection thuộc về một unit of work
+    Repository/model dùng như connection bình thường, nhưng commit() và close()
+    chỉ ghi nhận lại - unit of work commit một lần và trả connection khi kết thúc
+    """
+
+    def __init__(self, uow: 'UnitOfWork', raw):
+        self._uow = uow
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def commit(self):
+        """Đánh dấu có thay đổi; commit thật diễn ra khi unit of work kết thúc"""
+        self._uow.dirty = True
+
+    def rollback(self):
+        """Rollback toàn bộ unit of work"""
+        self._uow.rollback()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class UnitOfWork:
+    """
+    Unit of work - một connection, một transaction cho cả request
+    Connection chỉ được mượn từ pool ở câu lệnh SQL đầu tiên (lazy)
+    """
+
+    def __init__(self):
+        self._pooled = None
+        self._session_conn = None
+        self.dirty = False
+        self.rollback_only = False
+        self._after_commit = []
+        self._after_rollback = []
+
+    def connection(self) -> SessionConnection:
+        """Connection dùng chung của unit of work"""
+        if self._session_conn is None:
+            self._pooled = get_pool().acquire()
+            self._session_conn = SessionConnection(self, self._pooled)
+        return self._session_conn
+
+    def commit(self):
+        """Commit một lần nếu có thay đổi (hoặc rollback nếu đã bị đánh dấu lỗi)"""
+        if self._pooled is None:
+            return
+        if self.rollback_only:
+            self.rollback()
+        elif self.dirty:
+            self._pooled.commit()
+            self.dirty = False
+            callbacks, self._after_commit, self._after_rollback = self._after_commit, [], []
+            for callback in callbacks:
+                callback()
+
+    def rollback(self):
+        if self._pooled is not None:
+            self._pooled.rollback()
+        self.dirty = False
+        self._discarded()
+
+    def _discarded(self):
+        """Các thay đổi chưa commit đã bị bỏ: chạy callback after_rollback"""
+        callbacks, self._after_commit, self._after_rollback = self._after_rollback, [], []
+        for callback in callbacks:
+            callback()
+
+    def after_commit(self, callback):
+        """Gọi callback sau khi transaction commit (bỏ qua nếu rollback)"""
+        self._after_commit.append(callback)
+
+    def after_rollback(self, callback):
+        """Gọi callback khi transaction rollback (kể cả khi đóng mà chưa commit)"""
+        self._after_rollback.append(callback)
+
+    def close(self):
+        """Trả connection về pool (pool tự rollback phần chưa commit)"""
+        if self._pooled is not None:
+            self._pooled.close()
+        self._pooled = None
+        self._session_conn = None
+        if self.dirty:
+            # Request lỗi giữa chừng (không qua commit/rollback): pool đã bỏ các thay đổi
+            self.dirty = False
+            self._discarded()
+
+
+def after_commit(callback):
+    """
+    Gọi callback sau khi transaction hiện tại commit; ngoài unit of work thì gọi ngay
+    (vd: invalidate cache - invalidate trước commit thì request khác có thể đọc lại dữ liệu cũ vào cache)
+    """
+    current = get_current_session()
+    if current is None:
+        callback()
+    else:
+        current.after_commit(callback)
+
+
+def after_rollback(callback):
+    """Gọi callback nếu transaction hiện tại rollback; ngoài unit of work thì lệnh ghi đã tự commit nên bỏ qua"""
+    current = get_current_session()
+    if current is not None:
+        current.after_rollback(callback)
+
+
+# Listener theo tên bảng: code ghi SQL trực tiếp (model) báo dòng nào đổi, lớp cache (repository) đăng ký nhận,
+# để model không phải import repository
+_change_listeners: Dict[str, Tuple[Callable[[list], None], ...]] = {}
+_listeners_lock = threading.Lock()
+
+
+def on_change(table: str, listener: Callable[[list], None]):
+    """Đăng ký listener(ids) được gọi khi notify_change(table, ids)"""
+    with _listeners_lock:
+        _change_listeners[table] = _change_listeners.get(table, ()) + (listener,)
+
+
+def notify_change(table: str, ids):
+    """
+    Báo các dòng (theo khóa chính) của table vừa bị ghi ngoài repository:
+    gọi listener ngay và một lần nữa khi transaction hiện tại commit/rollback
+    """
+    ids = list(ids)
+
+    def action():
+        for listener in _change_listeners.get(table, ()):
+            listener(ids)
+
+    action()
+    after_commit(action)
+    after_rollback(action)
+
+
+def has_pending_writes() -> bool:
+    """
+    Unit of work hiện tại đã ghi nhưng chưa commit: đọc qua connection của nó thấy cả dòng chưa commit
+    (không được đưa kết quả đọc vào cache dùng chung)
+    """
+    current = get_current_session()
+    return current is not None and current.dirty
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Context manager: mọi get_db_connection() bên trong dùng chung một connection
+    và transaction; commit khi thoát bình thường, rollback khi có exception.
+    Lồng nhau thì tham gia unit of work bên ngoài.
+    """
+    current = get_current_session()
+    if current is not None:
+        try:
+            yield current
+        except BaseException:
+            current.rollback_only = True
+            raise
+        return
+
+    uow = UnitOfWork()
+    token = bind_session(uow)
+    try:
+        yield uow
+        uow.commit()
+    except BaseException:
+        uow.rollback()
+        raise
+    finally:
+        unbind_session(token)
+        uow.close()
+
+
+def init_app(app):
+    """
+    Bind một unit of work cho mỗi HTTP request:
+    commit khi response thành công (status < 400), rollback khi lỗi
+    """
+    from flask import g
+
+    @app.before_request
+    def _begin_unit_of_work():
+        g._unit_of_work = UnitOfWork()
+        g._unit_of_work_token = bind_session(g._unit_of_work)
+
+    @app.after_request
+    def _commit_unit_of_work(response):
+        uow = g.get('_unit_of_work')
+        if uow is not None:
+            if response.status_code < 400:
+                uow.commit()
+            else:
+                uow.rollback()
+        return response
+
+    @app.teardown_request
+    def _end_unit_of_work(exc):
+        uow = g.pop('_unit_of_work', None)
+        token = g.pop('_unit_of_work_token', None)
+        try:
+            if uow is not None:
+                uow.close()
+        finally:
+            if token is not None:
+                unbind_session(token)
@@ -1,8 +1,15 @@
 from app.services.book_service import BookService
+from app.services.import_jobs import ImportJob, ImportJobRegistry
 from app.repositories.book_repository import BookRepository
-from typing import List, Optional, Tuple, Dict
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.config.db_config import DB_BACKEND
+from app.config.tracing import traced_class
+from app.interfaces.book_repository_interface import BookFields
+from typing import List, Optional, Tuple, Dict, Iterator
 from app.models.book_model import Book
+from app.models.page_model import Page
 
+@traced_class('controller')
 class BookController:
     """
     Controller - Điều phối giữa View và Service
@@ -22,8 +29,9 @@ class BookController:
             self.book_service = book_service
         else:
             # Fallback: tạo dependencies
-            book_repository = BookRepository()
+            book_repository = SQLiteBookRepository() if DB_BACKEND == 'sqlite' else BookRepository()
             self.book_service = BookService(book_repository)
+        self.import_jobs = ImportJobRegistry()
     
     # ========== CRUD Operations ==========
     
@@ -35,18 +43,64 @@ class BookController:
         """Lấy sách theo ID"""
         return self.book_service.get_book_by_id(book_id)
     
-    def search_books(self, query: str) -> List[Book]:
-        """Tìm kiếm sách"""
-        return self.book_service.search_books(query)
+    def get_books_by_ids(self, book_ids: List[int], fields: BookFields = None) -> List[Book]:
+        """Lấy nhiều sách theo ID (multi-get)"""
+        return self.book_service.get_books_by_ids(book_ids, fields)
+    
+    def search_books(self, query: str, limit: int = 50, cursor: Optional[str] = None) -> Page:
+        """Tìm kiếm sách (xếp theo độ liên quan, phân trang)"""
+        return self.book_service.search_books(query, limit, cursor)
+    
+    def suggest_books(self, prefix: str, limit: int = 10) -> Dict[str, List[dict]]:
+        """Gợi ý sách/nhà xuất bản theo tiền tố (autocomplete)"""
+        return self.book_service.suggest_books(prefix, limit)
+    
+    def get_books_page(self, limit: int = 50, cursor: Optional[str] = None, sort: Optional[str] = None,
+                       include_total: bool = False, query: Optional[str] = None,
+                       book_type: Optional[str] = None, publisher: Optional[str] = None,
+                       fields: BookFields = None) -> Page:
+        """Lấy một trang sách (phân trang cursor, projection cột qua fields)"""
+        return self.book_service.get_books_page(limit, cursor, sort, include_total, query, book_type, publisher,
+                                                fields)
+    
+    def export_books(self, book_type: Optional[str] = None, publisher: Optional[str] = None) -> Iterator[Book]:
+        """Duyệt toàn bộ sách để export (stream)"""
+        return self.book_service.iter_books(book_type, publisher)
     
     def create_book(self, book_data: dict) -> Tuple[bool, str, Optional[int]]:
         """Tạo sách mới"""
         return self.book_service.create_book(book_data)
     
+    def import_books(self, rows: List[dict], dry_run: bool = False) -> Dict:
+        """Nhập sách hàng loạt (đồng bộ)"""
+        return self.book_service.import_books(rows, dry_run)
+    
+    def start_import_job(self, rows: List[dict], dry_run: bool = False) -> ImportJob:
+        """Nhập sách hàng loạt chạy nền - client hỏi tiến độ qua get_import_job"""
+        return self.import_jobs.start(lambda progress: self.book_service.import_books(rows, dry_run, progress))
+    
+    def sync_books(self, rows: List[dict], delete_missing: bool = False, dry_run: bool = False) -> Dict:
+        """Đồng bộ catalog với feed (đồng bộ)"""
+        return self.book_service.sync_books(rows, delete_missing, dry_run)
+    
+    def start_sync_job(self, rows: List[dict], delete_missing: bool = False, dry_run: bool = False) -> ImportJob:
+        """Đồng bộ catalog chạy nền - cùng registry với job nhập sách"""
+        return self.import_jobs.start(
+            lambda progress: self.book_service.sync_books(rows, delete_missing, dry_run, progress)
+        )
+    
+    def get_import_job(self, job_id: str) -> Optional[ImportJob]:
+        """Lấy trạng thái job nhập sách"""
+        return self.import_jobs.get(job_id)
+    
     def update_book(self, book_id: int, book_data: dict) -> Tuple[bool, str]:
         """Cập nhật sách"""
         return self.book_service.update_book(book_id, book_data)
     
+    def update_books(self, updates: List[dict]) -> List[dict]:
+        """Cập nhật một phần nhiều sách (batch PATCH)"""
+        return self.book_service.update_many(updates)
+    
     def delete_book(self, book_id: int) -> Tuple[bool, str]:
         """Xóa sách"""
         return self.book_service.delete_book(book_id)
@@ -65,6 +119,10 @@ class BookController:
         """Xuất ra các sách của nhà xuất bản (có thể lọc theo loại)"""
         return self.book_service.get_books_by_publisher(publisher, book_type)
     
+    def calculate_total_amount_by_type(self, book_type: str) -> float:
+        """Tính tổng thành tiền theo loại sách"""
+        return self.book_service.calculate_total_amount_by_type(book_type)
+    
     def calculate_total_amount_textbooks(self) -> float:
         """Tính tổng thành tiền sách giáo khoa"""
         return self.book_service.calculate_total_amount_by_type('Sách giáo khoa')
@@ -6,3 +6,9 @@ class BorrowController:
 
     def get_all(self):
         return BorrowModel.get_all()
+
+    def get_by_user(self, user_id):
+        return BorrowModel.find_by_user(user_id)
+
+    def get_by_book(self, book_id):
+        return BorrowModel.find_by_book(book_id)
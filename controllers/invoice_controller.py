@@ -2,10 +2,14 @@ from app.models.invoice_model import InvoiceModel
 
 class InvoiceController:
     def create_invoice(self, invoice, details):
-        invoice_id = InvoiceModel.create(invoice)
-        for d in details:
-            InvoiceModel.add_detail(invoice_id, d)
-        return invoice_id
+        # Header + toàn bộ detail trong một transaction, tổng tiền tính ở server
+        return InvoiceModel.create_with_details(invoice, details)
 
     def get_all(self):
         return InvoiceModel.get_all()
+
+    def get_by_user(self, user_id):
+        return InvoiceModel.find_by_user(user_id)
+
+    def get_by_date_range(self, start, end):
+        return InvoiceModel.find_by_date_range(start, end)
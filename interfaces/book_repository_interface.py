@@ -1,12 +1,19 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Tuple, Dict
+from typing import List, Optional, Tuple, Dict, Iterator, Sequence, Set, Union
 from app.models.book_model import Book
+from app.models.page_model import Page
+
+# Projection cột: 'summary' (bỏ description/image), 'detail' hoặc None (đầy đủ), hoặc danh sách cột
+BookFields = Union[str, Sequence[str], None]
 
 class BookRepositoryInterface(ABC):
-    """Interface cho Book Repository - Truy xuất dữ liệu"""
+    """
+    Interface cho Book Repository - Truy xuất dữ liệu
+    Các truy vấn danh sách nhận fields (BookFields); sách đọc một phần có loaded_fields
+    """
     
     @abstractmethod
-    def find_all(self) -> List[Book]:
+    def find_all(self, fields: BookFields = None) -> List[Book]:
         """Lấy tất cả sách"""
         pass
     
@@ -21,25 +28,93 @@ class BookRepositoryInterface(ABC):
         pass
     
     @abstractmethod
-    def search_by_name(self, name: str) -> List[Book]:
+    def find_by_ids(self, book_ids: List[int], fields: BookFields = None) -> List[Book]:
+        """Lấy nhiều sách theo danh sách ID (giữ nguyên thứ tự, bỏ qua ID không tồn tại)"""
+        pass
+    
+    @abstractmethod
+    def search_by_name(self, name: str, fields: BookFields = None) -> List[Book]:
         """Tìm kiếm sách theo tên"""
         pass
     
     @abstractmethod
-    def find_by_type(self, book_type: str) -> List[Book]:
+    def find_by_type(self, book_type: str, fields: BookFields = None) -> List[Book]:
         """Lấy sách theo loại (Giáo khoa/Tham khảo)"""
         pass
     
     @abstractmethod
-    def find_by_publisher(self, publisher: str, book_type: Optional[str] = None) -> List[Book]:
+    def find_by_publisher(self, publisher: str, book_type: Optional[str] = None,
+                          fields: BookFields = None) -> List[Book]:
         """Lấy sách theo nhà xuất bản, có thể lọc theo loại"""
         pass
     
+    @abstractmethod
+    def find_page(self, sort: str = 'newest', limit: int = 50, cursor: Optional[str] = None,
+                  include_total: bool = False, name: Optional[str] = None,
+                  book_type: Optional[str] = None, publisher: Optional[str] = None,
+                  fields: BookFields = None) -> Page:
+        """
+        Phân trang keyset (cursor) - không dùng OFFSET
+        sort: 'newest' (book_id giảm dần) hoặc 'name' (book_name, book_id)
+        Có thể lọc theo tên (name), loại (book_type), nhà xuất bản (publisher)
+        """
+        pass
+    
+    @abstractmethod
+    def iter_books(self, book_type: Optional[str] = None, publisher: Optional[str] = None,
+                   batch_size: int = 1000) -> Iterator[Book]:
+        """Duyệt toàn bộ sách (có thể lọc) theo lô, bộ nhớ không phụ thuộc kích thước bảng"""
+        pass
+    
+    @abstractmethod
+    def aggregate_statistics(self) -> Dict[str, Dict]:
+        """
+        Thống kê theo loại sách bằng một truy vấn GROUP BY
+        Trả về {book_type: {'count', 'total_amount', 'average_price'}}
+        """
+        pass
+    
+    @abstractmethod
+    def find_existing_codes(self, book_codes: List[str], for_update: bool = False) -> Set[str]:
+        """
+        Các mã sách trong danh sách đã tồn tại trong DB (truy vấn IN, chia lô)
+        for_update: khóa tới hết unit of work hiện tại để không ai thêm/xóa các mã này trước khi ghi
+        """
+        pass
+    
     @abstractmethod
     def create(self, book: Book) -> int:
         """Tạo sách mới"""
         pass
     
+    @abstractmethod
+    def create_many(self, books: List[Book]) -> int:
+        """Thêm nhiều sách bằng một executemany trong transaction hiện tại, trả về số dòng đã thêm"""
+        pass
+    
+    @abstractmethod
+    def content_hashes(self, for_update: bool = False) -> Dict[str, bytes]:
+        """
+        Mã sách -> Book.content_hash() của toàn bộ catalog trong DB
+        for_update: khóa cả bảng tới hết unit of work hiện tại (so sánh rồi ghi không bị ghi xen giữa)
+        """
+        pass
+    
+    @abstractmethod
+    def upsert_many(self, books: List[Book]) -> int:
+        """Thêm hoặc cập nhật (theo book_code) nhiều sách trong transaction hiện tại, trả về số sách đã ghi"""
+        pass
+    
+    @abstractmethod
+    def update_many(self, changes: List[Tuple[int, Dict[str, object]]]) -> int:
+        """Cập nhật một phần cột của nhiều sách [(book_id, {cột: giá trị})], trả về số sách đã cập nhật"""
+        pass
+    
+    @abstractmethod
+    def delete_by_codes(self, book_codes: List[str]) -> int:
+        """Xóa sách theo mã, trả về số dòng đã xóa"""
+        pass
+    
     @abstractmethod
     def update(self, book_id: int, book: Book) -> bool:
         """Cập nhật sách"""
@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Tuple, Dict
+from typing import Callable, Iterable, List, Optional, Tuple, Dict, Iterator, Union
 from app.models.book_model import Book
+from app.models.book_batch import BookBatch
+from app.interfaces.book_repository_interface import BookFields
+from app.models.page_model import Page
 
 class BookServiceInterface(ABC):
     """Interface cho Book Service - Business Logic"""
@@ -17,8 +20,28 @@ class BookServiceInterface(ABC):
         pass
     
     @abstractmethod
-    def search_books(self, query: str) -> List[Book]:
-        """Tìm kiếm sách"""
+    def search_books(self, query: str, limit: int = 50, cursor: Optional[str] = None,
+                     book_type: Optional[str] = None, publisher: Optional[str] = None,
+                     fields: BookFields = None) -> Page:
+        """Tìm kiếm sách (không phân biệt dấu, xếp theo độ liên quan, phân trang)"""
+        pass
+    
+    @abstractmethod
+    def suggest_books(self, prefix: str, limit: int = 10) -> Dict[str, List[dict]]:
+        """Gợi ý tên sách, mã sách, nhà xuất bản theo tiền tố"""
+        pass
+    
+    @abstractmethod
+    def get_books_page(self, limit: int = 50, cursor: Optional[str] = None, sort: Optional[str] = None,
+                       include_total: bool = False, query: Optional[str] = None,
+                       book_type: Optional[str] = None, publisher: Optional[str] = None,
+                       fields: BookFields = None) -> Page:
+        """Lấy một trang sách (phân trang cursor), có thể tìm kiếm/lọc, projection cột (fields)"""
+        pass
+    
+    @abstractmethod
+    def iter_books(self, book_type: Optional[str] = None, publisher: Optional[str] = None) -> Iterator[Book]:
+        """Duyệt toàn bộ sách (dùng cho export dạng stream)"""
         pass
     
     @abstractmethod
@@ -62,6 +85,38 @@ class BookServiceInterface(ABC):
         """Lấy thống kê tổng quan"""
         pass
     
+    @abstractmethod
+    def import_books(self, rows: Iterable[dict], dry_run: bool = False,
+                     progress: Optional[Callable[[str, int, int], None]] = None) -> Dict:
+        """Nhập sách hàng loạt, trả về báo cáo kèm lỗi theo từng dòng"""
+        pass
+    
+    @abstractmethod
+    def sync_books(self, rows: Iterable[dict], delete_missing: bool = False, dry_run: bool = False,
+                   progress: Optional[Callable[[str, int, int], None]] = None) -> Dict:
+        """Đồng bộ catalog với feed theo mã sách, chỉ ghi sách mới/đã đổi"""
+        pass
+    
+    @abstractmethod
+    def get_books_by_ids(self, book_ids: List[int], fields: BookFields = None) -> List[Book]:
+        """Lấy nhiều sách theo ID trong một truy vấn"""
+        pass
+    
+    @abstractmethod
+    def update_many(self, updates: List[dict]) -> List[dict]:
+        """Cập nhật một phần nhiều sách trong một transaction, trả về kết quả từng phần tử"""
+        pass
+    
+    @abstractmethod
+    def get_book_batch(self, book_type: Optional[str] = None, publisher: Optional[str] = None) -> BookBatch:
+        """Lấy sách dạng cột (BookBatch) cho phân tích hàng loạt"""
+        pass
+    
+    @abstractmethod
+    def summarize_books(self, books: Union[List[Book], BookBatch]) -> Dict:
+        """Thống kê tổng quan trên một tập sách cho trước"""
+        pass
+    
     @abstractmethod
     def validate_book_data(self, book_data: dict) -> Tuple[bool, str]:
         """Validate dữ liệu sách"""
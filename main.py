@@ -0,0 +1,46 @@
+"""
+Tạo Flask app: blueprint + unit of work + metrics, slow query log/N+1, tracing, profiling
+
+    python app/main.py                    # chạy dev server (FLASK_HOST/FLASK_PORT)
+    from app.main import create_app       # WSGI server, test, load test
+"""
+import os
+import sys
+
+if __package__ in (None, ''):
+    # `python app/main.py`: thư mục chứa app/ chưa nằm trong sys.path
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+
+def create_app() -> Flask:
+    from app.config import metrics, migrations, profiling, query_inspector, tracing, unit_of_work
+    from app.views import account_view, auth_view, borrow_view, invoice_view, profile_view, user_view
+    from app.views.book_view import book_api_bp, book_web_bp
+
+    # Dừng ngay nếu DB chưa chạy hết migration (vd: catalog_meta) thay vì lỗi ở request đầu tiên
+    migrations.ensure_current()
+
+    app = Flask(__name__)
+    app.secret_key = os.getenv('FLASK_SECRET_KEY', 'dev-secret-change-me')
+
+    app.register_blueprint(book_web_bp, url_prefix='/books')
+    app.register_blueprint(book_api_bp, url_prefix='/api/books')
+    app.register_blueprint(auth_view.bp)
+    app.register_blueprint(user_view.bp)
+    app.register_blueprint(account_view.bp)
+    app.register_blueprint(invoice_view.bp)
+    app.register_blueprint(borrow_view.bp)
+    app.register_blueprint(profile_view.bp)
+
+    unit_of_work.init_app(app)
+    metrics.init_app(app)
+    query_inspector.init_app(app)
+    tracing.init_app(app)
+    profiling.init_app(app)
+    return app
+
+
+if __name__ == '__main__':
+    create_app().run(host=os.getenv('FLASK_HOST', '127.0.0.1'), port=int(os.getenv('FLASK_PORT', 5000)))
@@ -0,0 +1,21 @@
+-- Index cho các truy vấn nóng (kiểm tra bằng: python -m app.config.migrations check)
+-- InnoDB/SQLite tự nối khóa chính vào cuối index phụ nên (a, b) cũng phục vụ ORDER BY a, b, book_id
+
+-- find_by_type ... ORDER BY book_name; find_page(sort='name', book_type=...)
+CREATE INDEX idx_books_type_name ON books (book_type, book_name);
+-- find_page(sort='name') không lọc
+CREATE INDEX idx_books_name ON books (book_name);
+-- find_by_publisher ... ORDER BY book_name
+CREATE INDEX idx_books_publisher_name ON books (publisher, book_name);
+-- find_by_publisher(publisher, book_type) ... ORDER BY book_name
+CREATE INDEX idx_books_publisher_type_name ON books (publisher, book_type, book_name);
+-- find_page(sort='newest', publisher=...): ORDER BY book_id DESC trong một NXB
+CREATE INDEX idx_books_publisher_id ON books (publisher, book_id);
+
+-- BorrowModel.find_by_user / find_by_book ... ORDER BY borrow_date DESC
+CREATE INDEX idx_borrow_books_user_date ON borrow_books (user_id, borrow_date);
+CREATE INDEX idx_borrow_books_book_date ON borrow_books (book_id, borrow_date);
+
+-- InvoiceModel.find_by_user ... ORDER BY invoice_date DESC; find_by_date_range
+CREATE INDEX idx_invoices_user_date ON invoices (user_id, invoice_date);
+CREATE INDEX idx_invoices_date ON invoices (invoice_date);
@@ -0,0 +1,7 @@
+-- Dấu thay đổi cho BookRepository.catalog_version(): một dòng, version tăng trong cùng transaction với mọi lần ghi
+-- bảng books (BookRepository, InventoryModel.reserve... qua CatalogModel.bump_version) - đọc một dòng theo khóa chính
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    id INT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO catalog_meta (id, version) VALUES (1, 0)
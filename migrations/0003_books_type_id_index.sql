@@ -0,0 +1,3 @@
+-- find_page(sort='newest', book_type=...): ORDER BY book_id DESC trong một loại sách
+-- (idx_books_type_name xếp theo book_name trong từng loại nên vẫn phải sort)
+CREATE INDEX idx_books_type_id ON books (book_type, book_id);
@@ -0,0 +1,141 @@
+from app.models.book_model import Book, TextBook, ReferenceBook
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+TEXTBOOK = 'Sách giáo khoa'
+REFERENCE_BOOK = 'Sách tham khảo'
+
+# Mã loại sách trong cột type_code
+TYPE_CODES = {TEXTBOOK: 0, REFERENCE_BOOK: 1}
+_TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+# Cột không dùng để tính toán - giữ dạng list Python để chuyển ngược lại List[Book]
+_OBJECT_COLUMNS = ('book_code', 'book_name', 'import_date', 'publisher', 'image', 'description', 'condition_status')
+
+
+class BookBatch:
+    """
+    Lô sách dạng cột (columnar) cho phân tích hàng loạt trên catalog lớn
+    Cột số là mảng NumPy: book_id, type_code, price, quantity, tax, used (sách giáo khoa cũ)
+    Thành tiền tính vector hóa, cùng quy tắc với model:
+    - Sách giáo khoa: số lượng * đơn giá, cũ thì * 50%
+    - Sách tham khảo: số lượng * đơn giá + thuế
+    """
+
+    def __init__(self, book_id: np.ndarray, type_code: np.ndarray, price: np.ndarray, quantity: np.ndarray,
+                 tax: np.ndarray, used: np.ndarray, columns: Optional[Dict[str, list]] = None):
+        self.book_id = book_id
+        self.type_code = type_code
+        self.price = price
+        self.quantity = quantity
+        self.tax = tax
+        self.used = used
+        self.columns = columns if columns is not None else {name: [None] * len(book_id) for name in _OBJECT_COLUMNS}
+
+    def __len__(self):
+        return len(self.book_id)
+
+    # ========== Chuyển đổi ==========
+
+    @classmethod
+    def from_books(cls, books: Iterable[Book]) -> 'BookBatch':
+        """Tạo lô từ List[Book] (hoặc iterator, vd: repository.iter_books())"""
+        book_ids, type_codes, prices, quantities, taxes, used = [], [], [], [], [], []
+        columns = {name: [] for name in _OBJECT_COLUMNS}
+        for book in books:
+            is_textbook = isinstance(book, TextBook)
+            book_ids.append(book.book_id or 0)
+            type_codes.append(TYPE_CODES.get(book.get_book_type(), -1))
+            prices.append(book.price)
+            quantities.append(book.quantity)
+            taxes.append(book.tax if isinstance(book, ReferenceBook) else 0.0)
+            condition_status = book.condition_status if is_textbook else None
+            used.append(is_textbook and (condition_status or '').lower() == 'cũ')
+            for name in _OBJECT_COLUMNS:
+                columns[name].append(getattr(book, name, None))
+        return cls(
+            np.array(book_ids, dtype=np.int64),
+            np.array(type_codes, dtype=np.int8),
+            np.array(prices, dtype=np.float64),
+            np.array(quantities, dtype=np.int64),
+            np.array(taxes, dtype=np.float64),
+            np.array(used, dtype=bool),
+            columns
+        )
+
+    def to_books(self) -> List[Book]:
+        """Chuyển ngược lại List[Book] (bỏ qua dòng không rõ loại sách)"""
+        books = []
+        columns = self.columns
+        for i, (book_id, type_code, price, quantity, tax) in enumerate(zip(
+                self.book_id.tolist(), self.type_code.tolist(), self.price.tolist(),
+                self.quantity.tolist(), self.tax.tolist())):
+            common = dict(
+                book_id=book_id or None,
+                book_code=columns['book_code'][i],
+                book_name=columns['book_name'][i],
+                import_date=columns['import_date'][i],
+                price=price,
+                quantity=quantity,
+                publisher=columns['publisher'][i],
+                image=columns['image'][i],
+                description=columns['description'][i],
+            )
+            if type_code == TYPE_CODES[TEXTBOOK]:
+                books.append(TextBook(condition_status=columns['condition_status'][i], **common))
+            elif type_code == TYPE_CODES[REFERENCE_BOOK]:
+                books.append(ReferenceBook(tax=tax, **common))
+        return books
+
+    def filter(self, book_type: Optional[str] = None) -> 'BookBatch':
+        """Lô con theo loại sách"""
+        if not book_type:
+            return self
+        mask = self._mask(book_type)
+        positions = np.flatnonzero(mask).tolist()
+        columns = {name: [values[i] for i in positions] for name, values in self.columns.items()}
+        return BookBatch(self.book_id[mask], self.type_code[mask], self.price[mask], self.quantity[mask],
+                         self.tax[mask], self.used[mask], columns)
+
+    # ========== Tính toán vector hóa ==========
+
+    def totals(self) -> np.ndarray:
+        """Thành tiền từng dòng"""
+        base = self.quantity * self.price
+        textbook = self.type_code == TYPE_CODES[TEXTBOOK]
+        reference = self.type_code == TYPE_CODES[REFERENCE_BOOK]
+        amount = np.where(textbook & self.used, base * 0.5, base)
+        return np.where(reference, amount + self.tax, amount)
+
+    def total_amount(self, book_type: Optional[str] = None) -> float:
+        """Tổng thành tiền (của cả lô hoặc một loại sách)"""
+        totals = self.totals()
+        if book_type:
+            totals = totals[self._mask(book_type)]
+        return float(totals.sum())
+
+    def average_price(self, book_type: Optional[str] = None) -> float:
+        """Trung bình đơn giá (0 nếu không có sách)"""
+        prices = self.price[self._mask(book_type)] if book_type else self.price
+        return float(prices.mean()) if len(prices) else 0.0
+
+    def count(self, book_type: Optional[str] = None) -> int:
+        return int(self._mask(book_type).sum()) if book_type else len(self)
+
+    def statistics(self) -> Dict[str, Dict]:
+        """Thống kê theo loại sách - cùng dạng với BookRepository.aggregate_statistics()"""
+        totals = self.totals()
+        result = {}
+        for code in np.unique(self.type_code).tolist():
+            if code not in _TYPE_NAMES:
+                continue
+            mask = self.type_code == code
+            result[_TYPE_NAMES[code]] = {
+                'count': int(mask.sum()),
+                'total_amount': float(totals[mask].sum()),
+                'average_price': float(self.price[mask].mean()),
+            }
+        return result
+
+    def _mask(self, book_type: str) -> np.ndarray:
+        return self.type_code == TYPE_CODES.get(book_type, -1)
@@ -1,9 +1,38 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Callable, FrozenSet, Optional, Sequence
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
 from abc import ABC, abstractmethod
+from operator import itemgetter
+import hashlib
 
-@dataclass
+
+def _parse_import_date(value):
+    """import_date dạng chuỗi ISO -> datetime (DB driver đã trả date/datetime thì giữ nguyên)"""
+    if value and isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    return value
+
+
+_CENT = Decimal('0.01')
+
+
+def _hash_value(value) -> str:
+    """Dạng chuẩn của một giá trị như sau khi lưu vào DB (DECIMAL(10,2), DATE, ENUM không phân biệt hoa thường)"""
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return str(Decimal(repr(value)).quantize(_CENT, ROUND_HALF_UP))
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    return str(value)
+
+
+# slots=True: không có __dict__ mỗi instance - nhẹ hơn khi giữ hàng trăm nghìn sách trong bộ nhớ
+@dataclass(slots=True)
 class Book(ABC):
     """Base Model - Đại diện cho sách (Abstract)"""
     book_id: Optional[int] = None
@@ -15,6 +44,8 @@ class Book(ABC):
     publisher: str = ""
     image: str = ""
     description: str = ""
+    # Các cột đã đọc từ DB khi query có projection (None = đầy đủ); kw_only để không đổi thứ tự tham số
+    loaded_fields: Optional[FrozenSet[str]] = field(default=None, repr=False, compare=False, kw_only=True)
     
     @abstractmethod
     def calculate_total_amount(self) -> float:
@@ -26,9 +57,32 @@ class Book(ABC):
         """Trả về loại sách"""
         pass
     
+    def is_loaded(self, name: str) -> bool:
+        """Field đã được đọc từ DB chưa (False với cột bị bỏ qua bởi projection)"""
+        return self.loaded_fields is None or name in self.loaded_fields
+    
+    def _type_fields(self) -> dict:
+        """Field đặc thù của từng loại sách"""
+        return {}
+    
+    def amount_loaded(self) -> bool:
+        """Đã đọc đủ các field để tính thành tiền chưa"""
+        return all(map(self.is_loaded, ('price', 'quantity') + tuple(self._type_fields())))
+    
+    def content_hash(self) -> bytes:
+        """
+        Hash nội dung mọi cột trừ book_id - so sánh sách từ feed với dòng trong DB khi đồng bộ
+        Giá trị được chuẩn hóa như khi lưu vào DB nên một dòng đã đồng bộ cho cùng hash với dòng feed
+        """
+        values = [self.book_code, self.book_name, self.get_book_type(), self.import_date, self.price,
+                  self.quantity, self.publisher, self.image, self.description]
+        # Field đặc thù là ENUM/DECIMAL: ENUM so không phân biệt hoa thường
+        values.extend(value.lower() if isinstance(value, str) else value for value in self._type_fields().values())
+        return hashlib.blake2b('\x1f'.join(map(_hash_value, values)).encode('utf-8'), digest_size=16).digest()
+    
     def to_dict(self) -> dict:
-        """Chuyển đổi đối tượng Book thành dictionary"""
-        return {
+        """Chuyển đổi đối tượng Book thành dictionary (sách đọc một phần: bỏ các field chưa đọc)"""
+        data = {
             'book_id': self.book_id,
             'book_code': self.book_code,
             'book_name': self.book_name,
@@ -41,9 +95,16 @@ class Book(ABC):
             'description': self.description,
             'total_amount': self.calculate_total_amount()
         }
+        data.update(self._type_fields())
+        if self.loaded_fields is None:
+            return data
+        return {
+            key: value for key, value in data.items()
+            if key == 'book_type' or self.is_loaded(key) or (key == 'total_amount' and self.amount_loaded())
+        }
 
 
-@dataclass
+@dataclass(slots=True)
 class TextBook(Book):
     """Sách giáo khoa - có tình trạng (mới/cũ)"""
     condition_status: str = "mới"  # mới hoặc cũ
@@ -62,20 +123,13 @@ class TextBook(Book):
     def get_book_type(self) -> str:
         return "Sách giáo khoa"
     
-    def to_dict(self) -> dict:
-        data = super().to_dict()
-        data['condition_status'] = self.condition_status
-        return data
+    def _type_fields(self) -> dict:
+        return {'condition_status': self.condition_status}
     
     @classmethod
     def from_dict(cls, data: dict) -> 'TextBook':
         """Tạo đối tượng TextBook từ dictionary"""
-        import_date = data.get('import_date')
-        if import_date and isinstance(import_date, str):
-            try:
-                import_date = datetime.fromisoformat(import_date.replace('Z', '+00:00'))
-            except ValueError:
-                import_date = None
+        import_date = _parse_import_date(data.get('import_date'))
         
         return cls(
             book_id=data.get('book_id'),
@@ -91,7 +145,7 @@ class TextBook(Book):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ReferenceBook(Book):
     """Sách tham khảo - có thuế"""
     tax: float = 0.0
@@ -106,20 +160,13 @@ class ReferenceBook(Book):
     def get_book_type(self) -> str:
         return "Sách tham khảo"
     
-    def to_dict(self) -> dict:
-        data = super().to_dict()
-        data['tax'] = self.tax
-        return data
+    def _type_fields(self) -> dict:
+        return {'tax': self.tax}
     
     @classmethod
     def from_dict(cls, data: dict) -> 'ReferenceBook':
         """Tạo đối tượng ReferenceBook từ dictionary"""
-        import_date = data.get('import_date')
-        if import_date and isinstance(import_date, str):
-            try:
-                import_date = datetime.fromisoformat(import_date.replace('Z', '+00:00'))
-            except ValueError:
-                import_date = None
+        import_date = _parse_import_date(data.get('import_date'))
         
         return cls(
             book_id=data.get('book_id'),
@@ -132,4 +179,52 @@ class ReferenceBook(Book):
             image=data.get('image', ''),
             description=data.get('description', ''),
             tax=float(data.get('tax', 0))
-        )
\ No newline at end of file
+        )
+
+
+_COMMON_COLUMNS = ('book_id', 'book_code', 'book_name', 'import_date', 'price', 'quantity',
+                   'publisher', 'image', 'description')
+
+# Giá trị khi cột không có trong SELECT (giống mặc định của from_dict)
+_COLUMN_DEFAULTS = {
+    'book_code': '', 'book_name': '', 'import_date': None, 'price': 0, 'quantity': 0,
+    'publisher': '', 'image': '', 'description': '', 'condition_status': 'mới', 'tax': 0,
+}
+
+
+def book_row_loader(columns: Sequence[str]) -> Callable[[tuple], Optional[Book]]:
+    """
+    Tạo hàm hydrate dòng dạng tuple (cursor thường, không dictionary=True) -> Book
+    Vị trí cột tính một lần cho cả truy vấn (từ cursor.description); kết quả giống from_dict.
+    SELECT có projection (thiếu cột): cột thiếu nhận giá trị mặc định và Book được đánh dấu
+    loaded_fields để to_dict()/presenter bỏ qua. Cần có book_id và book_type.
+    """
+    positions = {name: i for i, name in enumerate(columns)}
+    if 'book_id' not in positions or 'book_type' not in positions:
+        raise ValueError("Query phải SELECT book_id và book_type")
+    # Cột thiếu trỏ vào phần đệm nối thêm vào cuối dòng
+    missing = [name for name in _COLUMN_DEFAULTS if name not in positions]
+    for offset, name in enumerate(missing):
+        positions[name] = len(columns) + offset
+    padding = tuple(_COLUMN_DEFAULTS[name] for name in missing)
+    loaded = frozenset(columns) if missing else None
+
+    common = itemgetter(*(positions[name] for name in _COMMON_COLUMNS))
+    type_pos, condition_pos, tax_pos = positions['book_type'], positions['condition_status'], positions['tax']
+
+    def load(row: tuple) -> Optional[Book]:
+        book_type = row[type_pos]
+        if book_type != 'Sách giáo khoa' and book_type != 'Sách tham khảo':
+            return None
+        if padding:
+            row = row + padding
+        book_id, book_code, book_name, import_date, price, quantity, publisher, image, description = common(row)
+        if import_date.__class__ is str:
+            import_date = _parse_import_date(import_date)
+        # Tham số theo thứ tự field của dataclass
+        if book_type == 'Sách giáo khoa':
+            return TextBook(book_id, book_code, book_name, import_date, float(price), int(quantity),
+                            publisher, image, description, row[condition_pos], loaded_fields=loaded)
+        return ReferenceBook(book_id, book_code, book_name, import_date, float(price), int(quantity),
+                             publisher, image, description, float(row[tax_pos]), loaded_fields=loaded)
+    return load
@@ -1,26 +1,45 @@
 from app.config.db_config import get_db_connection
+from app.config.unit_of_work import unit_of_work
+from app.models.inventory_model import InventoryModel
 
 class BorrowModel:
     @staticmethod
     def borrow(data):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""INSERT INTO borrow_books (user_id, book_id, quantity, borrow_date, return_date, fee)
-                          VALUES (%s,%s,%s,%s,%s,%s)""", (
-            data.get('user_id'), data.get('book_id'), data.get('quantity'), data.get('borrow_date'), data.get('return_date'), data.get('fee')
-        ))
-        conn.commit()
-        last_id = cursor.lastrowid
-        cursor.close()
-        conn.close()
-        return last_id
+        """Ghi nhận mượn sách và trừ tồn kho trong cùng một transaction"""
+        try:
+            book_id, quantity = int(data.get('book_id')), int(data.get('quantity'))
+        except (TypeError, ValueError):
+            raise ValueError("book_id và quantity phải là số nguyên")
+        if quantity <= 0:
+            raise ValueError("Số lượng phải lớn hơn 0")
+
+        with unit_of_work(), get_db_connection() as conn, conn.cursor() as cursor:
+            InventoryModel.reserve([(book_id, quantity)])
+            cursor.execute("""INSERT INTO borrow_books (user_id, book_id, quantity, borrow_date, return_date, fee)
+                              VALUES (%s,%s,%s,%s,%s,%s)""", (
+                data.get('user_id'), book_id, quantity, data.get('borrow_date'), data.get('return_date'), data.get('fee')
+            ))
+            conn.commit()
+            return cursor.lastrowid
 
     @staticmethod
     def get_all():
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM borrow_books")
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return rows
+        with get_db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT * FROM borrow_books")
+            return cursor.fetchall()
+
+    @staticmethod
+    def find_by_user(user_id):
+        """Lượt mượn của một người dùng, mới nhất trước (index idx_borrow_books_user_date)"""
+        with get_db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT * FROM borrow_books WHERE user_id = %s ORDER BY borrow_date DESC, borrow_id DESC",
+                           (user_id,))
+            return cursor.fetchall()
+
+    @staticmethod
+    def find_by_book(book_id):
+        """Lượt mượn của một cuốn sách, mới nhất trước (index idx_borrow_books_book_date)"""
+        with get_db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT * FROM borrow_books WHERE book_id = %s ORDER BY borrow_date DESC, borrow_id DESC",
+                           (book_id,))
+            return cursor.fetchall()
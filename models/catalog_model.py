@@ -0,0 +1,10 @@
+class CatalogModel:
+    """Version của catalog (bảng books): bảng một dòng catalog_meta (migration 0002)"""
+
+    @staticmethod
+    def bump_version(cursor):
+        """
+        Tăng version trong transaction của cursor - gọi sau mọi câu ghi books, trước commit
+        Dòng bị khóa tới khi transaction kết thúc (MySQL) nên nên gọi ở cuối, sát commit
+        """
+        cursor.execute("UPDATE catalog_meta SET version = version + 1 WHERE id = 1")
@@ -0,0 +1,69 @@
+from app.config.db_config import get_db_connection
+from app.config.unit_of_work import notify_change, unit_of_work
+from app.models.catalog_model import CatalogModel
+
+
+class InsufficientStockError(ValueError):
+    """Không đủ tồn kho cho một hoặc nhiều sách"""
+
+    def __init__(self, shortages):
+        # shortages: {book_id: (số lượng yêu cầu, số lượng còn)}
+        self.shortages = shortages
+        detail = ', '.join(f"sách {book_id} (cần {requested}, còn {available})"
+                           for book_id, (requested, available) in shortages.items())
+        super().__init__(f"Không đủ tồn kho: {detail}")
+
+
+class InventoryModel:
+    @staticmethod
+    def reserve(items):
+        """
+        Trừ tồn kho cho nhiều sách trong transaction hiện tại, không đọc-rồi-ghi.
+        Một câu UPDATE có điều kiện cho cả lô (tương đương với từng dòng
+        UPDATE books SET quantity = quantity - n WHERE book_id = ? AND quantity >= n),
+        chỉ khóa các dòng liên quan.
+        Nếu có dòng không đủ hàng: chỉ hoàn tác câu UPDATE này (ROLLBACK TO SAVEPOINT) rồi raise
+        InsufficientStockError - các ghi trước đó của unit of work giữ nguyên, caller quyết định
+        rollback (để exception thoát khỏi unit of work) hay xử lý tiếp.
+        items: danh sách (book_id, quantity)
+        """
+        requested = {}
+        for book_id, quantity in items:
+            requested[book_id] = requested.get(book_id, 0) + quantity
+        if not requested:
+            return
+        # Thứ tự book_id cố định để hai giao dịch đồng thời không khóa chéo (deadlock)
+        ordered = sorted(requested.items())
+        book_ids = tuple(book_id for book_id, _ in ordered)
+        placeholders = ','.join(['%s'] * len(ordered))
+        case_sql = "CASE book_id " + " ".join(["WHEN %s THEN %s"] * len(ordered)) + " END"
+        case_params = tuple(value for pair in ordered for value in pair)
+
+        shortages = None
+        with unit_of_work(), get_db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            # Không RELEASE: trên SQLite, RELEASE savepoint ngoài cùng sẽ commit cả transaction;
+            # savepoint tự mất khi transaction commit/rollback
+            cursor.execute("SAVEPOINT reserve_stock")
+            cursor.execute(
+                f"""UPDATE books SET quantity = quantity - {case_sql}
+                    WHERE book_id IN ({placeholders}) AND quantity >= {case_sql}""",
+                case_params + book_ids + case_params
+            )
+            if cursor.rowcount < len(ordered):
+                # Bỏ các dòng đã trừ rồi đọc lại tồn kho để báo chính xác sách nào thiếu
+                cursor.execute("ROLLBACK TO SAVEPOINT reserve_stock")
+                cursor.execute(f"SELECT book_id, quantity FROM books WHERE book_id IN ({placeholders})", book_ids)
+                available = {row['book_id']: row['quantity'] for row in cursor.fetchall()}
+                shortages = {
+                    book_id: (quantity, available.get(book_id, 0))
+                    for book_id, quantity in ordered
+                    if available.get(book_id, 0) < quantity
+                }
+            else:
+                CatalogModel.bump_version(cursor)
+                conn.commit()
+        if shortages is not None:
+            # Raise ngoài khối unit_of_work: exception bên trong sẽ đánh dấu unit of work bên ngoài rollback_only
+            raise InsufficientStockError(shortages)
+        # quantity trong cache (CachedBookRepository...) đã cũ
+        notify_change('books', book_ids)
@@ -1,35 +1,68 @@
 from app.config.db_config import get_db_connection
+from app.config.unit_of_work import unit_of_work
+from app.models.inventory_model import InventoryModel
+from decimal import Decimal
 
 class InvoiceModel:
     @staticmethod
-    def create(invoice):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO invoices (user_id, invoice_code, total_amount) VALUES (%s,%s,%s)",
-                       (invoice.get('user_id'), invoice.get('invoice_code'), invoice.get('total_amount')))
-        conn.commit()
-        invoice_id = cursor.lastrowid
-        cursor.close()
-        conn.close()
-        return invoice_id
+    def create_with_details(invoice, details):
+        """
+        Tạo hóa đơn + toàn bộ chi tiết trong một transaction:
+        một SELECT ... IN lấy đơn giá, một INSERT header, một executemany cho chi tiết.
+        Đơn giá và total_amount tính ở server (bỏ qua unit_price/total_amount client gửi lên).
+        Tồn kho được trừ trong cùng transaction (InventoryModel.reserve).
+        Trả về (invoice_id, total_amount); raise ValueError nếu dữ liệu không hợp lệ,
+        InsufficientStockError nếu không đủ hàng.
+        """
+        lines = []
+        for d in details:
+            try:
+                book_id, quantity = int(d.get('book_id')), int(d.get('quantity'))
+            except (TypeError, ValueError):
+                raise ValueError("book_id và quantity phải là số nguyên")
+            if quantity <= 0:
+                raise ValueError("Số lượng phải lớn hơn 0")
+            lines.append((book_id, quantity))
 
-    @staticmethod
-    def add_detail(invoice_id, detail):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO invoice_details (invoice_id, book_id, quantity, unit_price) VALUES (%s,%s,%s,%s)",
-                       (invoice_id, detail.get('book_id'), detail.get('quantity'), detail.get('unit_price')))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return True
+        book_ids = list(dict.fromkeys(book_id for book_id, _ in lines))
+        placeholders = ','.join(['%s'] * len(book_ids))
+        with unit_of_work(), get_db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            cursor.execute(f"SELECT book_id, price FROM books WHERE book_id IN ({placeholders})", tuple(book_ids))
+            prices = {row['book_id']: Decimal(str(row['price'])) for row in cursor.fetchall()}
+            missing = [book_id for book_id in book_ids if book_id not in prices]
+            if missing:
+                raise ValueError(f"Không tìm thấy sách: {', '.join(map(str, missing))}")
+            InventoryModel.reserve(lines)
+
+            total_amount = sum(prices[book_id] * quantity for book_id, quantity in lines)
+            cursor.execute("INSERT INTO invoices (user_id, invoice_code, total_amount) VALUES (%s,%s,%s)",
+                           (invoice.get('user_id'), invoice.get('invoice_code'), total_amount))
+            invoice_id = cursor.lastrowid
+            cursor.executemany(
+                "INSERT INTO invoice_details (invoice_id, book_id, quantity, unit_price) VALUES (%s,%s,%s,%s)",
+                [(invoice_id, book_id, quantity, prices[book_id]) for book_id, quantity in lines]
+            )
+            conn.commit()
+        return invoice_id, total_amount
 
     @staticmethod
     def get_all():
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM invoices")
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return rows
+        with get_db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT * FROM invoices")
+            return cursor.fetchall()
+
+    @staticmethod
+    def find_by_user(user_id):
+        """Hóa đơn của một người dùng, mới nhất trước (index idx_invoices_user_date)"""
+        with get_db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT * FROM invoices WHERE user_id = %s ORDER BY invoice_date DESC, invoice_id DESC",
+                           (user_id,))
+            return cursor.fetchall()
+
+    @staticmethod
+    def find_by_date_range(start, end):
+        """Hóa đơn có invoice_date trong [start, end) theo thời gian (index idx_invoices_date)"""
+        with get_db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            cursor.execute("""SELECT * FROM invoices WHERE invoice_date >= %s AND invoice_date < %s
+                              ORDER BY invoice_date, invoice_id""", (start, end))
+            return cursor.fetchall()
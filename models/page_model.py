@@ -0,0 +1,53 @@
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Sequence, Tuple
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+@dataclass
+class Page:
+    """Một trang kết quả phân trang keyset (cursor)"""
+    items: List[Any] = field(default_factory=list)
+    limit: int = DEFAULT_PAGE_SIZE
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+    def pagination_dict(self) -> dict:
+        """Thông tin phân trang (không gồm items) để trả về cho client"""
+        return {
+            'limit': self.limit,
+            'count': len(self.items),
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'total': self.total
+        }
+
+
+def encode_cursor(values: Sequence, direction: str = 'next') -> str:
+    """Mã hóa giá trị khóa sắp xếp thành cursor opaque (base64 url-safe)"""
+    payload = json.dumps({'k': list(values), 'd': direction}, ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[list, str]:
+    """Giải mã cursor; raise ValueError nếu cursor không hợp lệ"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        values, direction = payload['k'], payload['d']
+    except (ValueError, KeyError, TypeError, UnicodeError):
+        raise ValueError("Cursor không hợp lệ")
+    if not isinstance(values, list) or direction not in ('next', 'prev'):
+        raise ValueError("Cursor không hợp lệ")
+    return values, direction
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    """Giới hạn kích thước trang trong [1, MAX_PAGE_SIZE]"""
+    if not limit:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
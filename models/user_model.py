@@ -3,57 +3,39 @@ from app.config.db_config import get_db_connection
 class UserModel:
     @staticmethod
     def get_all():
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM users")
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return rows
+        with get_db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT * FROM users")
+            return cursor.fetchall()
 
     @staticmethod
     def get_by_id(user_id):
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM users WHERE user_id = %s", (user_id,))
-        row = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        return row
+        with get_db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT * FROM users WHERE user_id = %s", (user_id,))
+            return cursor.fetchone()
 
     @staticmethod
     def add(data):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        sql = """INSERT INTO users (account_id, full_name, age, email, phone, gender, address)
-                 VALUES (%s,%s,%s,%s,%s,%s,%s)"""
-        cursor.execute(sql, (
-            data.get('account_id'), data.get('full_name'), data.get('age'), data.get('email'),
-            data.get('phone'), data.get('gender'), data.get('address')
-        ))
-        conn.commit()
-        last_id = cursor.lastrowid
-        cursor.close()
-        conn.close()
-        return last_id
+        with get_db_connection() as conn, conn.cursor() as cursor:
+            sql = """INSERT INTO users (account_id, full_name, age, email, phone, gender, address)
+                     VALUES (%s,%s,%s,%s,%s,%s,%s)"""
+            cursor.execute(sql, (
+                data.get('account_id'), data.get('full_name'), data.get('age'), data.get('email'),
+                data.get('phone'), data.get('gender'), data.get('address')
+            ))
+            conn.commit()
+            return cursor.lastrowid
 
     @staticmethod
     def update(user_id, data):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        sql = """UPDATE users SET full_name=%s, age=%s, email=%s, phone=%s, gender=%s, address=%s WHERE user_id=%s"""
-        cursor.execute(sql, (data.get('full_name'), data.get('age'), data.get('email'), data.get('phone'), data.get('gender'), data.get('address'), user_id))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with get_db_connection() as conn, conn.cursor() as cursor:
+            sql = """UPDATE users SET full_name=%s, age=%s, email=%s, phone=%s, gender=%s, address=%s WHERE user_id=%s"""
+            cursor.execute(sql, (data.get('full_name'), data.get('age'), data.get('email'), data.get('phone'), data.get('gender'), data.get('address'), user_id))
+            conn.commit()
         return True
 
     @staticmethod
     def delete(user_id):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with get_db_connection() as conn, conn.cursor() as cursor:
+            cursor.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
+            conn.commit()
         return True
@@ -1,54 +1,89 @@
 from app.models.book_model import Book, TextBook, ReferenceBook
-from typing import List, Optional, Dict
+from app.models.book_batch import BookBatch
+from app.models.page_model import Page
+from app.config.tracing import traced_class
+from typing import List, Optional, Dict, Iterable, Iterator, Tuple, Union
 from datetime import datetime
+import csv
+import io
+import json
 
+@traced_class('presenter')
 class BookPresenter:
     """
     Presenter - Chịu trách nhiệm format và transform dữ liệu cho View
     Tuân thủ SRP: chỉ lo presentation logic, không có business logic
     """
     
+    # Field có thể vắng mặt khi sách được đọc với projection (fields='summary'...)
+    _LOADABLE_FIELDS = ('book_code', 'book_name', 'price', 'quantity', 'publisher', 'import_date',
+                        'description', 'condition_status', 'tax')
+    
     # ========== List Presentations ==========
     
     @staticmethod
-    def present_books_list(books_data: List[Book], message: Optional[str] = None, 
-                          error: Optional[str] = None, search_query: Optional[str] = None) -> dict:
+    def present_books_list(books_data: Union[List[Book], BookBatch], message: Optional[str] = None, 
+                          error: Optional[str] = None, search_query: Optional[str] = None,
+                          page: Optional[Page] = None) -> dict:
         """Chuẩn bị dữ liệu cho template danh sách sách"""
-        transformed_books = [BookPresenter._transform_book_for_list(book) for book in books_data]
+        transformed_books, _ = BookPresenter._transform_books(books_data)
         
         return {
             'books': transformed_books,
             'message': message,
             'error': error,
             'search_query': search_query or '',
-            'books_count': len(transformed_books)
+            'books_count': len(transformed_books),
+            'pagination': BookPresenter.present_pagination(page)
         }
     
     @staticmethod
-    def present_books_by_type(books_data: List[Book], book_type: str) -> dict:
-        """Chuẩn bị dữ liệu cho danh sách sách theo loại"""
-        transformed_books = [BookPresenter._transform_book_for_list(book) for book in books_data]
-        total_amount = sum(book.calculate_total_amount() for book in books_data)
+    def present_books_by_type(books_data: Union[List[Book], BookBatch], book_type: str,
+                              total_amount: Optional[float] = None, page: Optional[Page] = None) -> dict:
+        """
+        Chuẩn bị dữ liệu cho danh sách sách theo loại
+        total_amount: tổng thành tiền của cả loại (khi chỉ hiển thị một trang)
+        """
+        transformed_books, page_total = BookPresenter._transform_books(books_data)
+        if total_amount is None:
+            total_amount = page_total
         
         return {
             'books': transformed_books,
             'book_type': book_type,
             'books_count': len(transformed_books),
             'total_amount': total_amount,
-            'formatted_total_amount': f"{total_amount:,.0f} VND"
+            'formatted_total_amount': f"{total_amount:,.0f} VND",
+            'pagination': BookPresenter.present_pagination(page)
         }
     
     @staticmethod
-    def present_books_by_publisher(books_data: List[Book], publisher: str, 
-                                   book_type: Optional[str] = None) -> dict:
+    def present_books_by_publisher(books_data: Union[List[Book], BookBatch], publisher: str, 
+                                   book_type: Optional[str] = None, page: Optional[Page] = None) -> dict:
         """Chuẩn bị dữ liệu cho danh sách sách theo nhà xuất bản"""
-        transformed_books = [BookPresenter._transform_book_for_list(book) for book in books_data]
+        transformed_books, _ = BookPresenter._transform_books(books_data)
         
         return {
             'books': transformed_books,
             'publisher': publisher,
             'book_type': book_type,
-            'books_count': len(transformed_books)
+            'books_count': len(transformed_books),
+            'pagination': BookPresenter.present_pagination(page)
+        }
+    
+    @staticmethod
+    def present_pagination(page: Optional[Page]) -> dict:
+        """Thông tin phân trang cho template (link trang trước/sau)"""
+        if page is None:
+            return {'has_next': False, 'has_prev': False, 'next_cursor': None,
+                    'prev_cursor': None, 'limit': None, 'total': None}
+        return {
+            'has_next': page.next_cursor is not None,
+            'has_prev': page.prev_cursor is not None,
+            'next_cursor': page.next_cursor,
+            'prev_cursor': page.prev_cursor,
+            'limit': page.limit,
+            'total': page.total
         }
     
     # ========== Form Presentations ==========
@@ -105,13 +140,64 @@ class BookPresenter:
             'formatted_total_amount_all': f"{stats_data['total_amount_all']:,.0f} VND"
         }
     
+    # ========== Export (stream) ==========
+    
+    EXPORT_FIELDS = [
+        'book_id', 'book_code', 'book_name', 'book_type', 'import_date', 'price', 'quantity',
+        'publisher', 'condition_status', 'tax', 'image', 'description', 'total_amount'
+    ]
+    
+    @staticmethod
+    def stream_ndjson(books: Iterable[Book], chunk_size: int = 500) -> Iterator[str]:
+        """NDJSON: mỗi dòng một sách; gom chunk_size dòng cho mỗi lần yield"""
+        buffer = []
+        for book in books:
+            buffer.append(json.dumps(book.to_dict(), ensure_ascii=False, default=str))
+            if len(buffer) >= chunk_size:
+                yield '\n'.join(buffer) + '\n'
+                buffer.clear()
+        if buffer:
+            yield '\n'.join(buffer) + '\n'
+    
+    @staticmethod
+    def stream_csv(books: Iterable[Book], chunk_size: int = 500) -> Iterator[str]:
+        """CSV có header; gom chunk_size dòng cho mỗi lần yield"""
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=BookPresenter.EXPORT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for count, book in enumerate(books, 1):
+            writer.writerow(book.to_dict())
+            if count % chunk_size == 0:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+        yield output.getvalue()
+    
     # ========== Helper Methods ==========
     
     @staticmethod
-    def _transform_book_for_list(book: Book) -> dict:
+    def _transform_books(books_data: Union[List[Book], BookBatch]) -> Tuple[List[dict], float]:
+        """
+        Transform cả danh sách, trả về (các dòng, tổng thành tiền)
+        BookBatch: thành tiền từng dòng tính vector hóa một lần cho cả lô
+        """
+        if isinstance(books_data, BookBatch):
+            # to_books() bỏ các dòng không rõ loại sách - lọc totals tương ứng để giữ đúng cặp
+            totals = books_data.totals()[books_data.type_code >= 0]
+            books = books_data.to_books()
+            transformed = [BookPresenter._transform_book_for_list(book, total)
+                           for book, total in zip(books, totals.tolist())]
+            return transformed, float(totals.sum())
+        transformed = [BookPresenter._transform_book_for_list(book) for book in books_data]
+        return transformed, sum(row.get('total_amount', 0) for row in transformed)
+    
+    @staticmethod
+    def _transform_book_for_list(book: Book, total_amount: Optional[float] = None) -> dict:
         """Transform đối tượng Book cho hiển thị trong danh sách"""
         if not book:
             return {}
+        if total_amount is None:
+            total_amount = book.calculate_total_amount()
         
         base_data = {
             'book_id': book.book_id,
@@ -125,8 +211,8 @@ class BookPresenter:
             'description': book.description,
             'formatted_price': f"{book.price:,.0f} VND",
             'formatted_import_date': BookPresenter._format_date(book.import_date),
-            'total_amount': book.calculate_total_amount(),
-            'formatted_total_amount': f"{book.calculate_total_amount():,.0f} VND"
+            'total_amount': total_amount,
+            'formatted_total_amount': f"{total_amount:,.0f} VND"
         }
         
         # Thêm field đặc thù theo loại sách
@@ -136,6 +222,16 @@ class BookPresenter:
             base_data['tax'] = book.tax
             base_data['formatted_tax'] = f"{book.tax:,.0f} VND"
         
+        # Sách đọc một phần (projection): bỏ field chưa đọc và bản format của nó
+        if book.loaded_fields is not None:
+            for name in list(base_data):
+                if name in BookPresenter._LOADABLE_FIELDS and not book.is_loaded(name):
+                    base_data.pop(name)
+                    base_data.pop(f'formatted_{name}', None)
+            if not book.amount_loaded():
+                base_data.pop('total_amount')
+                base_data.pop('formatted_total_amount')
+        
         return base_data
     
     @staticmethod
@@ -1,8 +1,12 @@
-from app.config.db_config import get_db_connection
-from app.interfaces.book_repository_interface import BookRepositoryInterface
-from app.models.book_model import Book, TextBook, ReferenceBook
-from typing import List, Optional
+from app.config.db_config import get_db_connection, get_pool
+from app.config.tracing import traced_class
+from app.interfaces.book_repository_interface import BookRepositoryInterface, BookFields
+from app.models.book_model import Book, TextBook, ReferenceBook, book_row_loader
+from app.models.catalog_model import CatalogModel
+from app.models.page_model import Page, encode_cursor, decode_cursor, clamp_limit
+from typing import List, Optional, Dict, Iterator, Set, Tuple
 
+@traced_class('repository')
 class BookRepository(BookRepositoryInterface):
     """
     Concrete implementation của Book Repository
@@ -10,24 +14,81 @@ class BookRepository(BookRepositoryInterface):
     Tuân thủ SRP: chỉ lo database operations
     """
     
+    # Khóa sắp xếp cho phân trang keyset: (các cột khóa - cột cuối là unique, chiều sắp xếp)
+    SORT_KEYS = {
+        'newest': (('book_id',), 'DESC'),
+        'name': (('book_name', 'book_id'), 'ASC'),
+    }
+    
+    # Số phần tử tối đa trong một mệnh đề IN (...)
+    IN_CHUNK_SIZE = 1000
+    
+    COLUMNS = ('book_id', 'book_code', 'book_name', 'book_type', 'price', 'quantity', 'publisher',
+               'import_date', 'condition_status', 'tax', 'image', 'description')
+    
+    # Projection đặt tên: 'summary' cho trang danh sách - đủ để hiển thị và tính thành tiền,
+    # bỏ description (TEXT) và image; 'detail' = toàn bộ cột
+    PROJECTIONS = {
+        'summary': ('book_id', 'book_code', 'book_name', 'book_type', 'price', 'quantity', 'publisher',
+                    'import_date', 'condition_status', 'tax'),
+        'detail': None,
+    }
+    
     def _execute_query(self, query: str, params: tuple = None, fetch_one: bool = False, fetch_all: bool = False):
-        """Helper method để quản lý connection tốt hơn"""
-        conn = None
-        try:
-            conn = get_db_connection()
-            with conn.cursor(dictionary=True) as cursor:
-                cursor.execute(query, params or ())
-                
-                if fetch_one:
-                    return cursor.fetchone()
-                elif fetch_all:
-                    return cursor.fetchall()
-                else:
-                    conn.commit()
-                    return cursor.lastrowid if cursor.lastrowid else True
-        finally:
-            if conn:
-                conn.close()
+        """Helper method: mượn connection từ pool, trả lại pool khi xong"""
+        with get_db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            cursor.execute(query, params or ())
+
+            if fetch_one:
+                return cursor.fetchone()
+            elif fetch_all:
+                return cursor.fetchall()
+            else:
+                conn.commit()
+                return cursor.lastrowid if cursor.lastrowid else True
+    
+    def _execute_write(self, query: str, params: tuple = None):
+        """Helper method: câu ghi books + tăng catalog version trong cùng transaction"""
+        with get_db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            cursor.execute(query, params or ())
+            lastrowid = cursor.lastrowid
+            CatalogModel.bump_version(cursor)
+            conn.commit()
+            return lastrowid if lastrowid else True
+    
+    def _select(self, fields: BookFields = None, required: Tuple[str, ...] = ()) -> str:
+        """
+        "SELECT <cột> FROM books" theo projection
+        Luôn lấy book_id, book_type (để hydrate) và các cột trong required (vd: khóa sắp xếp)
+        """
+        if fields is None:
+            return "SELECT * FROM books"
+        if isinstance(fields, str) and fields in self.COLUMNS:
+            fields = (fields,)
+        if isinstance(fields, str):
+            if fields not in self.PROJECTIONS:
+                raise ValueError(f"Projection không hợp lệ. Phải là: {', '.join(self.PROJECTIONS)} hoặc danh sách cột")
+            columns = self.PROJECTIONS[fields]
+            if columns is None:
+                return "SELECT * FROM books"
+        else:
+            columns = tuple(fields)
+            unknown = [col for col in columns if col not in self.COLUMNS]
+            if unknown:
+                raise ValueError(f"Cột không hợp lệ: {', '.join(unknown)}")
+        columns = dict.fromkeys(('book_id', 'book_type') + tuple(required) + tuple(columns))
+        return f"SELECT {', '.join(columns)} FROM books"
+    
+    def _query_books(self, query: str, params: tuple = None) -> List[Book]:
+        """
+        SELECT trả về danh sách Book: cursor tuple (không dictionary=True),
+        vị trí cột tính một lần cho cả truy vấn rồi hydrate theo vị trí
+        """
+        with get_db_connection() as conn, conn.cursor() as cursor:
+            cursor.execute(query, params or ())
+            rows = cursor.fetchall()
+            load = book_row_loader([col[0] for col in cursor.description])
+        return [book for book in map(load, rows) if book is not None]
     
     def _row_to_book(self, row: dict) -> Optional[Book]:
         """Convert database row thành Book object (Factory pattern)"""
@@ -41,58 +102,370 @@ class BookRepository(BookRepositoryInterface):
             return ReferenceBook.from_dict(row)
         return None
     
-    def find_all(self) -> List[Book]:
+    def find_all(self, fields: BookFields = None) -> List[Book]:
         """Lấy tất cả sách"""
-        rows = self._execute_query("SELECT * FROM books ORDER BY book_id DESC", fetch_all=True)
-        return [self._row_to_book(row) for row in rows if self._row_to_book(row)]
+        return self._query_books(f"{self._select(fields)} ORDER BY book_id DESC")
     
     def find_by_id(self, book_id: int) -> Optional[Book]:
         """Tìm sách theo ID"""
-        row = self._execute_query(
-            "SELECT * FROM books WHERE book_id = %s", 
-            (book_id,), 
-            fetch_one=True
-        )
-        return self._row_to_book(row)
+        books = self._query_books("SELECT * FROM books WHERE book_id = %s", (book_id,))
+        return books[0] if books else None
     
     def find_by_code(self, book_code: str) -> Optional[Book]:
         """Tìm sách theo mã"""
-        row = self._execute_query(
-            "SELECT * FROM books WHERE book_code = %s", 
-            (book_code,), 
-            fetch_one=True
-        )
-        return self._row_to_book(row)
+        books = self._query_books("SELECT * FROM books WHERE book_code = %s", (book_code,))
+        return books[0] if books else None
+    
+    def find_by_ids(self, book_ids: List[int], fields: BookFields = None) -> List[Book]:
+        """Lấy nhiều sách bằng WHERE book_id IN (...), chia lô để câu SQL không quá dài"""
+        select = self._select(fields)
+        books_by_id = {}
+        unique_ids = list(dict.fromkeys(book_ids))
+        for start in range(0, len(unique_ids), self.IN_CHUNK_SIZE):
+            chunk = unique_ids[start:start + self.IN_CHUNK_SIZE]
+            placeholders = ','.join(['%s'] * len(chunk))
+            for book in self._query_books(f"{select} WHERE book_id IN ({placeholders})", tuple(chunk)):
+                books_by_id[book.book_id] = book
+        return [books_by_id[book_id] for book_id in unique_ids if book_id in books_by_id]
     
-    def search_by_name(self, name: str) -> List[Book]:
+    def search_by_name(self, name: str, fields: BookFields = None) -> List[Book]:
         """Tìm kiếm sách theo tên"""
-        rows = self._execute_query(
-            "SELECT * FROM books WHERE book_name LIKE %s ORDER BY book_name", 
-            (f'%{name}%',), 
-            fetch_all=True
+        return self._query_books(
+            f"{self._select(fields)} WHERE book_name LIKE %s ORDER BY book_name", 
+            (f'%{name}%',)
         )
-        return [self._row_to_book(row) for row in rows if self._row_to_book(row)]
     
-    def find_by_type(self, book_type: str) -> List[Book]:
+    def find_by_type(self, book_type: str, fields: BookFields = None) -> List[Book]:
         """Lấy sách theo loại"""
-        rows = self._execute_query(
-            "SELECT * FROM books WHERE book_type = %s ORDER BY book_name", 
-            (book_type,), 
-            fetch_all=True
+        return self._query_books(
+            f"{self._select(fields)} WHERE book_type = %s ORDER BY book_name", 
+            (book_type,)
         )
-        return [self._row_to_book(row) for row in rows if self._row_to_book(row)]
     
-    def find_by_publisher(self, publisher: str, book_type: Optional[str] = None) -> List[Book]:
+    def find_by_publisher(self, publisher: str, book_type: Optional[str] = None,
+                          fields: BookFields = None) -> List[Book]:
         """Lấy sách theo nhà xuất bản, có thể lọc theo loại"""
         if book_type:
-            query = "SELECT * FROM books WHERE publisher = %s AND book_type = %s ORDER BY book_name"
+            query = f"{self._select(fields)} WHERE publisher = %s AND book_type = %s ORDER BY book_name"
             params = (publisher, book_type)
         else:
-            query = "SELECT * FROM books WHERE publisher = %s ORDER BY book_name"
+            query = f"{self._select(fields)} WHERE publisher = %s ORDER BY book_name"
             params = (publisher,)
         
-        rows = self._execute_query(query, params, fetch_all=True)
-        return [self._row_to_book(row) for row in rows if self._row_to_book(row)]
+        return self._query_books(query, params)
+    
+    def find_page(self, sort: str = 'newest', limit: int = 50, cursor: Optional[str] = None,
+                  include_total: bool = False, name: Optional[str] = None,
+                  book_type: Optional[str] = None, publisher: Optional[str] = None,
+                  fields: BookFields = None) -> Page:
+        """Phân trang keyset: WHERE (khóa) > (cursor) ORDER BY khóa LIMIT n+1"""
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"Khóa sắp xếp không hợp lệ. Phải là: {', '.join(self.SORT_KEYS)}")
+        columns, direction = self.SORT_KEYS[sort]
+        limit = clamp_limit(limit)
+        
+        # Điều kiện lọc
+        filters, filter_params = [], []
+        if name:
+            filters.append("book_name LIKE %s")
+            filter_params.append(f'%{name}%')
+        if book_type:
+            filters.append("book_type = %s")
+            filter_params.append(book_type)
+        if publisher:
+            filters.append("publisher = %s")
+            filter_params.append(publisher)
+        
+        # Điều kiện keyset từ cursor
+        conditions, params = list(filters), list(filter_params)
+        backwards = False
+        if cursor:
+            values, cursor_direction = decode_cursor(cursor)
+            if len(values) != len(columns):
+                raise ValueError("Cursor không hợp lệ")
+            backwards = cursor_direction == 'prev'
+            operator = '>' if (direction == 'ASC') != backwards else '<'
+            keyset_sql, keyset_params = self._keyset_condition(columns, values, operator)
+            conditions.append(keyset_sql)
+            params.extend(keyset_params)
+        
+        order_direction = direction if not backwards else ('ASC' if direction == 'DESC' else 'DESC')
+        query = self._select(fields, required=columns)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY " + ", ".join(f"{col} {order_direction}" for col in columns)
+        query += " LIMIT %s"
+        params.append(limit + 1)
+        
+        books = self._query_books(query, tuple(params))
+        has_more = len(books) > limit
+        books = books[:limit]
+        if backwards:
+            books.reverse()
+        
+        page = Page(items=books, limit=limit)
+        if books:
+            # Tên cột khóa trùng tên thuộc tính của Book
+            first_key = [getattr(books[0], col) for col in columns]
+            last_key = [getattr(books[-1], col) for col in columns]
+            if (has_more and not backwards) or (backwards and cursor):
+                page.next_cursor = encode_cursor(last_key, 'next')
+            if (has_more and backwards) or (cursor and not backwards):
+                page.prev_cursor = encode_cursor(first_key, 'prev')
+        
+        if include_total:
+            count_query = "SELECT COUNT(*) AS total FROM books"
+            if filters:
+                count_query += " WHERE " + " AND ".join(filters)
+            page.total = int(self._execute_query(count_query, tuple(filter_params), fetch_one=True)['total'])
+        return page
+    
+    @staticmethod
+    def _keyset_condition(columns, values, operator: str):
+        """
+        (a, b) > (x, y) viết dạng mở rộng: a > x OR (a = x AND b > y)
+        để MySQL dùng được range scan trên index
+        """
+        clauses, params = [], []
+        for i, col in enumerate(columns):
+            parts = [f"{prev} = %s" for prev in columns[:i]] + [f"{col} {operator} %s"]
+            clauses.append("(" + " AND ".join(parts) + ")")
+            params.extend(values[:i] + [values[i]])
+        return "(" + " OR ".join(clauses) + ")", params
+    
+    def iter_books(self, book_type: Optional[str] = None, publisher: Optional[str] = None,
+                   batch_size: int = 1000) -> Iterator[Book]:
+        """
+        Duyệt sách theo lô bằng cursor unbuffered (server-side): chỉ giữ batch_size dòng trong bộ nhớ
+        Dùng connection riêng từ pool (không dùng unit of work của request) vì connection
+        bị chiếm cho tới khi đọc hết kết quả - thường là sau khi request đã trả header
+        """
+        conditions, params = [], []
+        if book_type:
+            conditions.append("book_type = %s")
+            params.append(book_type)
+        if publisher:
+            conditions.append("publisher = %s")
+            params.append(publisher)
+        query = "SELECT * FROM books"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY book_id"
+        
+        conn = get_pool().acquire()
+        cursor = None
+        finished = False
+        try:
+            cursor = conn.cursor(buffered=False)
+            cursor.execute(query, tuple(params))
+            load = book_row_loader([col[0] for col in cursor.description])
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    book = load(row)
+                    if book is not None:
+                        yield book
+            cursor.close()
+            finished = True
+        finally:
+            if finished:
+                conn.close()
+            else:
+                self._abandon_stream(conn, cursor)
+    
+    def _abandon_stream(self, conn, cursor):
+        """Dừng stream giữa chừng (client ngắt kết nối...): còn result chưa đọc trên socket nên bỏ connection"""
+        conn.invalidate()
+    
+    def aggregate_statistics(self) -> Dict[str, Dict]:
+        """
+        Thống kê theo loại sách trong một truy vấn GROUP BY
+        Thành tiền tính ngay trong SQL theo đúng quy tắc của model:
+        - Sách giáo khoa cũ: số lượng * đơn giá * 50%
+        - Sách tham khảo: số lượng * đơn giá + thuế
+        """
+        rows = self._execute_query(
+            """SELECT book_type,
+                      COUNT(*) AS book_count,
+                      SUM(CASE
+                            WHEN book_type = 'Sách giáo khoa' AND LOWER(condition_status) = 'cũ'
+                                THEN quantity * price * 0.5
+                            WHEN book_type = 'Sách tham khảo'
+                                THEN quantity * price + COALESCE(tax, 0)
+                            ELSE quantity * price
+                          END) AS total_amount,
+                      AVG(price) AS average_price
+               FROM books
+               WHERE book_type IN ('Sách giáo khoa', 'Sách tham khảo')
+               GROUP BY book_type""",
+            fetch_all=True
+        )
+        return {
+            row['book_type']: {
+                'count': int(row['book_count']),
+                'total_amount': float(row['total_amount'] or 0),
+                'average_price': float(row['average_price'] or 0),
+            }
+            for row in rows
+        }
+    
+    def catalog_version(self) -> int:
+        """
+        Version của bảng books: đọc một dòng catalog_meta theo khóa chính (migration 0002)
+        Mỗi lần ghi của repository tăng đúng 1 trong cùng transaction với câu ghi;
+        code ghi thẳng vào books ngoài repository cũng phải gọi CatalogModel.bump_version
+        """
+        row = self._execute_query("SELECT version FROM catalog_meta WHERE id = 1", fetch_one=True)
+        return int(row['version'])
+    
+    def find_existing_codes(self, book_codes: List[str], for_update: bool = False) -> Set[str]:
+        """
+        Mã sách đã tồn tại: SELECT book_code ... IN (...) theo lô IN_CHUNK_SIZE
+        for_update (trong unit of work): SELECT ... FOR UPDATE - InnoDB khóa cả mã chưa có trên index unique
+        nên transaction khác thêm đúng mã đó phải chờ tới khi unit of work này commit/rollback
+        """
+        existing = set()
+        unique_codes = list(dict.fromkeys(book_codes))
+        if not unique_codes:
+            return existing
+        with get_db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            suffix = self._lock_rows(conn, cursor) if for_update else ''
+            for start in range(0, len(unique_codes), self.IN_CHUNK_SIZE):
+                chunk = unique_codes[start:start + self.IN_CHUNK_SIZE]
+                placeholders = ','.join(['%s'] * len(chunk))
+                cursor.execute(f"SELECT book_code FROM books WHERE book_code IN ({placeholders}){suffix}", tuple(chunk))
+                existing.update(row['book_code'] for row in cursor.fetchall())
+        return existing
+    
+    def _lock_rows(self, conn, cursor) -> str:
+        """Hậu tố của SELECT khóa các dòng đọc được tới hết transaction (MySQL/InnoDB)"""
+        return " FOR UPDATE"
+    
+    # Cột ghi khi thêm hàng loạt (mọi cột trừ book_id)
+    WRITE_COLUMNS = ('book_code', 'book_name', 'book_type', 'import_date', 'price', 'quantity',
+                     'publisher', 'condition_status', 'tax', 'image', 'description')
+    
+    @staticmethod
+    def _write_params(book: Book) -> tuple:
+        """Tham số theo WRITE_COLUMNS: sách giáo khoa thuế 0, sách tham khảo không có tình trạng"""
+        if isinstance(book, TextBook):
+            condition_status, tax = book.condition_status, 0
+        elif isinstance(book, ReferenceBook):
+            condition_status, tax = None, book.tax
+        else:
+            raise ValueError("Invalid book type")
+        return (
+            book.book_code, book.book_name, book.get_book_type(), book.import_date,
+            book.price, book.quantity, book.publisher, condition_status, tax,
+            book.image, book.description
+        )
+    
+    def _insert_sql(self) -> str:
+        placeholders = ','.join(['%s'] * len(self.WRITE_COLUMNS))
+        return f"INSERT INTO books ({', '.join(self.WRITE_COLUMNS)}) VALUES ({placeholders})"
+    
+    def _upsert_clause(self) -> str:
+        """Mệnh đề upsert theo khóa unique book_code (cú pháp MySQL)"""
+        updates = ', '.join(f"{col}=VALUES({col})" for col in self.WRITE_COLUMNS if col != 'book_code')
+        return f" ON DUPLICATE KEY UPDATE {updates}"
+    
+    def _write_many(self, sql: str, books: List[Book]) -> int:
+        if not books:
+            return 0
+        params = [self._write_params(book) for book in books]
+        with get_db_connection() as conn, conn.cursor() as cursor:
+            cursor.executemany(sql, params)
+            rowcount = cursor.rowcount
+            CatalogModel.bump_version(cursor)
+            conn.commit()
+            return rowcount
+    
+    def create_many(self, books: List[Book]) -> int:
+        """
+        Thêm nhiều sách bằng executemany (mysql-connector gộp thành INSERT nhiều dòng)
+        Một câu INSERT cho cả hai loại sách
+        """
+        return self._write_many(self._insert_sql(), books)
+    
+    def upsert_many(self, books: List[Book]) -> int:
+        """
+        INSERT ... ON DUPLICATE KEY UPDATE theo lô: sách mới được thêm, sách đã có mã được ghi đè mọi cột
+        (rowcount của MySQL đếm 2 cho dòng cập nhật nên trả về số sách đã gửi)
+        """
+        self._write_many(self._insert_sql() + self._upsert_clause(), books)
+        return len(books)
+    
+    # Cột được cập nhật một phần (PATCH) - mã và loại sách không đổi sau khi tạo
+    UPDATE_COLUMNS = ('book_name', 'import_date', 'price', 'quantity', 'publisher',
+                      'condition_status', 'tax', 'image', 'description')
+    
+    def update_many(self, changes: List[Tuple[int, Dict[str, object]]]) -> int:
+        """
+        Cập nhật một phần cột của nhiều sách: gom các sách đổi cùng tập cột thành một executemany
+        UPDATE books SET a=%s, b=%s WHERE book_id=%s - chỉ ghi cột được gửi, không ghi đè cột khác
+        (vd: quantity vừa bị InventoryModel.reserve trừ khi chỉ sửa giá); mọi nhóm trong một transaction
+        """
+        groups: Dict[Tuple[str, ...], List[tuple]] = {}
+        for book_id, values in changes:
+            columns = tuple(sorted(values))
+            if not columns:
+                continue
+            invalid = [col for col in columns if col not in self.UPDATE_COLUMNS]
+            if invalid:
+                raise ValueError(f"Không cập nhật được cột: {', '.join(invalid)}")
+            groups.setdefault(columns, []).append(tuple(values[col] for col in columns) + (book_id,))
+        if not groups:
+            return 0
+        updated = 0
+        with get_db_connection() as conn, conn.cursor() as cursor:
+            for columns, params in groups.items():
+                assignments = ', '.join(f"{col}=%s" for col in columns)
+                cursor.executemany(f"UPDATE books SET {assignments} WHERE book_id=%s", params)
+                updated += len(params)
+            CatalogModel.bump_version(cursor)
+            conn.commit()
+        return updated
+    
+    def delete_by_codes(self, book_codes: List[str]) -> int:
+        """DELETE ... WHERE book_code IN (...) theo lô IN_CHUNK_SIZE, mọi lô trong một transaction"""
+        unique_codes = list(dict.fromkeys(book_codes))
+        if not unique_codes:
+            return 0
+        deleted = 0
+        with get_db_connection() as conn, conn.cursor() as cursor:
+            for start in range(0, len(unique_codes), self.IN_CHUNK_SIZE):
+                chunk = unique_codes[start:start + self.IN_CHUNK_SIZE]
+                placeholders = ','.join(['%s'] * len(chunk))
+                cursor.execute(f"DELETE FROM books WHERE book_code IN ({placeholders})", tuple(chunk))
+                deleted += cursor.rowcount
+            CatalogModel.bump_version(cursor)
+            conn.commit()
+        return deleted
+    
+    def content_hashes(self, for_update: bool = False) -> Dict[str, bytes]:
+        """
+        Hash nội dung từng sách, đọc stream cả bảng (bộ nhớ chỉ giữ mã + 16 byte mỗi sách)
+        for_update (trong unit of work): đọc qua connection của unit of work bằng SELECT ... FOR UPDATE
+        (khóa mọi dòng và khoảng trống giữa chúng) - cursor buffered nên kết quả nằm trọn trong bộ nhớ một lúc
+        """
+        if not for_update:
+            return {book.book_code: book.content_hash() for book in self.iter_books()}
+        hashes = {}
+        with get_db_connection() as conn, conn.cursor() as cursor:
+            suffix = self._lock_rows(conn, cursor)
+            cursor.execute(f"SELECT * FROM books ORDER BY book_id{suffix}")
+            load = book_row_loader([col[0] for col in cursor.description])
+            while True:
+                rows = cursor.fetchmany(self.IN_CHUNK_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    book = load(row)
+                    if book is not None:
+                        hashes[book.book_code] = book.content_hash()
+        return hashes
     
     def create(self, book: Book) -> int:
         """Tạo sách mới"""
@@ -119,7 +492,7 @@ class BookRepository(BookRepositoryInterface):
         else:
             raise ValueError("Invalid book type")
         
-        return self._execute_query(sql, params)
+        return self._execute_write(sql, params)
     
     def update(self, book_id: int, book: Book) -> bool:
         """Cập nhật sách"""
@@ -144,10 +517,10 @@ class BookRepository(BookRepositoryInterface):
         else:
             raise ValueError("Invalid book type")
         
-        self._execute_query(sql, params)
+        self._execute_write(sql, params)
         return True
     
     def delete(self, book_id: int) -> bool:
         """Xóa sách"""
-        self._execute_query("DELETE FROM books WHERE book_id = %s", (book_id,))
+        self._execute_write("DELETE FROM books WHERE book_id = %s", (book_id,))
         return True
\ No newline at end of file
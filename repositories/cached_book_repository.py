@@ -0,0 +1,323 @@
+from app.config.tracing import traced_class
+from app.config.unit_of_work import after_commit, after_rollback, has_pending_writes, on_change
+from app.interfaces.book_repository_interface import BookRepositoryInterface, BookFields
+from app.models.book_model import Book
+from app.models.page_model import Page
+from collections import OrderedDict
+from typing import List, Optional, Dict, Iterator, Set, Tuple
+import copy
+import threading
+import time
+import weakref
+
+_MISSING = object()
+
+# Mọi CachedBookRepository đang sống - để code ghi books ngoài repository (tồn kho...) invalidate được
+_instances = weakref.WeakSet()
+
+
+def _on_books_changed(book_ids):
+    """Xóa cache của các sách (theo id/mã) trong mọi CachedBookRepository (unit_of_work.notify_change('books'))"""
+    for repository in list(_instances):
+        repository.invalidate_ids(book_ids)
+
+
+on_change('books', _on_books_changed)
+
+
+class LRUTTLCache:
+    """
+    Cache LRU có giới hạn kích thước + TTL, thread-safe
+    Lưu được cả giá trị None (negative cache) để tránh query lặp cho mã không tồn tại
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.generation = 0         # tăng mỗi lần invalidate, dùng để bỏ các lần fill đã cũ
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Trả về giá trị hoặc _MISSING"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return _MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation: int):
+        """Lưu giá trị nếu không có invalidate nào xảy ra kể từ khi bắt đầu đọc DB"""
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def peek(self, key):
+        """Đọc giá trị không cập nhật LRU/counter"""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry[1] if entry else _MISSING
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def invalidate_where(self, predicate):
+        """Xóa các entry thỏa predicate(key, value)"""
+        with self._lock:
+            self.generation += 1
+            stale = [k for k, (_, v) in self._data.items() if predicate(k, v)]
+            for key in stale:
+                del self._data[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+@traced_class('cache')
+class CachedBookRepository(BookRepositoryInterface):
+    """
+    Decorator repository: bọc một BookRepositoryInterface khác và cache
+    find_by_id / find_by_code (read-through), invalidate khi create/update/delete
+    Các truy vấn danh sách được chuyển thẳng xuống repository bên trong
+
+    Dùng (opt-in):
+        BookController(book_service=BookService(CachedBookRepository(BookRepository())))
+    """
+
+    def __init__(self, inner: BookRepositoryInterface, max_size: int = 4096, ttl: float = 60.0):
+        self.inner = inner
+        self.cache = LRUTTLCache(max_size=max_size, ttl=ttl)
+        _instances.add(self)
+
+    # ========== Cached point lookups ==========
+
+    def find_by_id(self, book_id: int) -> Optional[Book]:
+        """Tìm sách theo ID (có cache)"""
+        return self._read_through(('id', book_id), lambda: self.inner.find_by_id(book_id))
+
+    def find_by_code(self, book_code: str) -> Optional[Book]:
+        """Tìm sách theo mã (có cache)"""
+        return self._read_through(('code', book_code), lambda: self.inner.find_by_code(book_code))
+
+    def find_by_ids(self, book_ids: List[int], fields: BookFields = None) -> List[Book]:
+        """
+        Lấy nhiều sách: phần đã cache trả ngay, phần còn lại một truy vấn IN
+        Cache chỉ giữ sách đầy đủ nên fields bị bỏ qua (trả về nhiều cột hơn yêu cầu)
+        """
+        found = {}
+        missing = []
+        for book_id in dict.fromkeys(book_ids):
+            value = self.cache.get(('id', book_id))
+            if value is _MISSING:
+                missing.append(book_id)
+            elif value is not None:
+                found[book_id] = value
+        if missing:
+            generation = self.cache.generation
+            cacheable = not has_pending_writes()
+            loaded = {book.book_id: book for book in self.inner.find_by_ids(missing)}
+            for book_id in missing:
+                book = loaded.get(book_id)
+                if cacheable:
+                    self.cache.put(('id', book_id), book, generation)
+                    if book is not None:
+                        self.cache.put(('code', book.book_code), book, generation)
+                if book is not None:
+                    found[book_id] = book
+        return [copy.copy(found[book_id]) for book_id in dict.fromkeys(book_ids) if book_id in found]
+
+    def _read_through(self, key, loader) -> Optional[Book]:
+        value = self.cache.get(key)
+        if value is _MISSING:
+            generation = self.cache.generation
+            value = loader()
+            if has_pending_writes():
+                # Đọc qua connection của unit of work đã ghi chưa commit: có thể là dòng sẽ bị rollback
+                return copy.copy(value) if value is not None else None
+            self.cache.put(key, value, generation)
+            # Điền luôn khóa còn lại để lần tra theo id/mã kế tiếp cũng hit
+            if value is not None:
+                other = ('code', value.book_code) if key[0] == 'id' else ('id', value.book_id)
+                self.cache.put(other, value, generation)
+        # Trả bản sao để caller sửa object không làm bẩn cache
+        return copy.copy(value) if value is not None else None
+
+    # ========== Pass-through queries ==========
+
+    def find_all(self, fields: BookFields = None) -> List[Book]:
+        return self.inner.find_all(fields)
+
+    def search_by_name(self, name: str, fields: BookFields = None) -> List[Book]:
+        return self.inner.search_by_name(name, fields)
+
+    def find_by_type(self, book_type: str, fields: BookFields = None) -> List[Book]:
+        return self.inner.find_by_type(book_type, fields)
+
+    def find_by_publisher(self, publisher: str, book_type: Optional[str] = None,
+                          fields: BookFields = None) -> List[Book]:
+        return self.inner.find_by_publisher(publisher, book_type, fields)
+
+    def find_page(self, sort: str = 'newest', limit: int = 50, cursor: Optional[str] = None,
+                  include_total: bool = False, name: Optional[str] = None,
+                  book_type: Optional[str] = None, publisher: Optional[str] = None,
+                  fields: BookFields = None) -> Page:
+        return self.inner.find_page(sort, limit, cursor, include_total, name, book_type, publisher, fields)
+
+    def iter_books(self, book_type: Optional[str] = None, publisher: Optional[str] = None,
+                   batch_size: int = 1000) -> Iterator[Book]:
+        return self.inner.iter_books(book_type, publisher, batch_size)
+
+    def aggregate_statistics(self) -> Dict[str, Dict]:
+        return self.inner.aggregate_statistics()
+
+    def find_existing_codes(self, book_codes: List[str], for_update: bool = False) -> Set[str]:
+        return self.inner.find_existing_codes(book_codes, for_update)
+
+    def content_hashes(self, for_update: bool = False) -> Dict[str, bytes]:
+        return self.inner.content_hashes(for_update)
+
+    # ========== Writes (invalidate) ==========
+    # Invalidate ngay và một lần nữa khi transaction commit/rollback: giữa hai thời điểm đó request khác
+    # vẫn đọc được dòng cũ từ DB và điền lại vào cache
+
+    def create(self, book: Book) -> int:
+        """Tạo sách mới và xóa negative cache của mã sách và ID mới"""
+        book_id = None
+        try:
+            book_id = self.inner.create(book)
+            return book_id
+        finally:
+            if book_id is not None:
+                self._invalidate(lambda: self.cache.invalidate(('code', book.book_code), ('id', book_id)))
+            else:
+                self._invalidate(lambda: self.cache.invalidate(('code', book.book_code)))
+
+    def create_many(self, books: List[Book]) -> int:
+        """Thêm nhiều sách và xóa negative cache của các mã sách và mọi ID (chưa biết ID mới)"""
+        codes = [book.book_code for book in books]
+        try:
+            return self.inner.create_many(books)
+        finally:
+            self._invalidate(lambda: self._invalidate_new_codes(codes))
+
+    def upsert_many(self, books: List[Book]) -> int:
+        """Thêm/cập nhật nhiều sách theo mã và xóa cache của các sách đó"""
+        codes = [book.book_code for book in books]
+        try:
+            return self.inner.upsert_many(books)
+        finally:
+            self._invalidate(lambda: self._invalidate_new_codes(codes))
+
+    def update_many(self, changes: List[Tuple[int, Dict[str, object]]]) -> int:
+        """Cập nhật một phần nhiều sách và xóa cache theo id/mã"""
+        book_ids = [book_id for book_id, _ in changes]
+        try:
+            return self.inner.update_many(changes)
+        finally:
+            self._invalidate(lambda: self.invalidate_ids(book_ids))
+
+    def delete_by_codes(self, book_codes: List[str]) -> int:
+        """Xóa sách theo mã và xóa cache của các sách đó"""
+        codes = list(book_codes)
+        try:
+            return self.inner.delete_by_codes(codes)
+        finally:
+            self._invalidate(lambda: self._invalidate_codes(codes))
+
+    def update(self, book_id: int, book: Book) -> bool:
+        """Cập nhật sách và xóa cache theo id/mã"""
+        try:
+            return self.inner.update(book_id, book)
+        finally:
+            self._invalidate(lambda: self._invalidate_book(book_id, book.book_code))
+
+    def delete(self, book_id: int) -> bool:
+        """Xóa sách và xóa cache theo id/mã"""
+        try:
+            return self.inner.delete(book_id)
+        finally:
+            self._invalidate(lambda: self._invalidate_book(book_id))
+
+    @staticmethod
+    def _invalidate(action):
+        action()
+        after_commit(action)
+        after_rollback(action)
+
+    def _invalidate_book(self, book_id: int, book_code: Optional[str] = None):
+        keys = [('id', book_id)]
+        if book_code:
+            keys.append(('code', book_code))
+        cached = self.cache.peek(('id', book_id))
+        if cached is not _MISSING and cached is not None:
+            keys.append(('code', cached.book_code))
+            self.cache.invalidate(*keys)
+        else:
+            # Không biết mã của sách: quét các entry theo mã trỏ tới book_id này
+            self.cache.invalidate(*keys)
+            self.cache.invalidate_where(
+                lambda k, v: k[0] == 'code' and v is not None and v.book_id == book_id
+            )
+
+    def invalidate_ids(self, book_ids):
+        """Xóa cache theo id và theo mã của các sách đó (một lần quét cho cả lô)"""
+        ids = set(book_ids)
+        self.cache.invalidate(*(('id', book_id) for book_id in ids))
+        self.cache.invalidate_where(lambda k, v: k[0] == 'code' and v is not None and v.book_id in ids)
+
+    def _invalidate_codes(self, book_codes):
+        """Xóa cache theo mã và theo id của các sách mang mã đó"""
+        codes = set(book_codes)
+        self.cache.invalidate(*(('code', code) for code in codes))
+        self.cache.invalidate_where(lambda k, v: k[0] == 'id' and v is not None and v.book_code in codes)
+
+    def _invalidate_new_codes(self, book_codes):
+        """Sau khi thêm sách chưa biết ID: như _invalidate_codes và bỏ mọi negative cache theo id"""
+        codes = set(book_codes)
+        self.cache.invalidate(*(('code', code) for code in codes))
+        self.cache.invalidate_where(lambda k, v: k[0] == 'id' and (v is None or v.book_code in codes))
+
+    def stats(self) -> dict:
+        """Thống kê cache: hit/miss/eviction"""
+        return self.cache.stats()
@@ -0,0 +1,373 @@
+from app.interfaces.book_repository_interface import BookRepositoryInterface, BookFields
+from app.models.book_model import Book
+from app.models.page_model import Page, encode_cursor, decode_cursor, clamp_limit
+from app.repositories.book_repository import BookRepository
+from app.services.book_search_index import fold_text
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import bisect
+import copy
+import threading
+import time
+
+
+def _entry_key(entry):
+    return entry[0]
+
+
+class _Indexes:
+    """Snapshot các hash index của catalog (thay nguyên khối khi reload)"""
+
+    def __init__(self):
+        self.by_id: Dict[int, Book] = {}
+        self.by_code: Dict[str, Book] = {}
+        self.by_type: Dict[str, Dict[int, Book]] = {}
+        self.by_publisher: Dict[str, Dict[int, Book]] = {}
+        self.by_publisher_type: Dict[Tuple[str, str], Dict[int, Book]] = {}
+        self.folded_names: Dict[int, str] = {}
+
+    def add(self, book: Book):
+        self.by_id[book.book_id] = book
+        self.by_code[book.book_code] = book
+        self.folded_names[book.book_id] = fold_text(book.book_name)
+        book_type = book.get_book_type()
+        self.by_type.setdefault(book_type, {})[book.book_id] = book
+        if book.publisher:
+            self.by_publisher.setdefault(book.publisher, {})[book.book_id] = book
+            self.by_publisher_type.setdefault((book.publisher, book_type), {})[book.book_id] = book
+
+    def remove(self, book_id: int):
+        book = self.by_id.pop(book_id, None)
+        if book is None:
+            return
+        if self.by_code.get(book.book_code) is book:
+            del self.by_code[book.book_code]
+        self.folded_names.pop(book_id, None)
+        book_type = book.get_book_type()
+        self._discard(self.by_type, book_type, book_id)
+        if book.publisher:
+            self._discard(self.by_publisher, book.publisher, book_id)
+            self._discard(self.by_publisher_type, (book.publisher, book_type), book_id)
+
+    @staticmethod
+    def _discard(index: dict, key, book_id: int):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(book_id, None)
+            if not bucket:
+                del index[key]
+
+
+class InMemoryBookRepository(BookRepositoryInterface):
+    """
+    Repository đọc từ bộ nhớ cho deployment đọc nhiều, ghi ít
+    - Nạp toàn bộ bảng books một lần, giữ hash index theo id, mã, loại, NXB và (NXB, loại)
+    - Sách trong bộ nhớ luôn đầy đủ cột: tham số fields (projection) được bỏ qua
+    - Ghi: write-through xuống repository bên trong rồi cập nhật index ngay (đọc lại được ngay sau khi ghi)
+      và nhận version mới của DB làm snapshot, không phải nạp lại (một lần đọc catalog_version() sau mỗi lần ghi)
+    - Mỗi refresh_interval giây so catalog_version() của DB (thay đổi từ node khác, trừ tồn kho...)
+      với snapshot, khác thì nạp lại; reload_interval giây nạp lại bắt buộc
+      (phòng code ghi thẳng vào books mà không gọi CatalogModel.bump_version)
+
+    Dùng (opt-in):
+        BookController(book_service=BookService(InMemoryBookRepository(BookRepository())))
+    """
+
+    def __init__(self, inner: BookRepository, refresh_interval: float = 5.0, reload_interval: float = 300.0):
+        self.inner = inner
+        self.refresh_interval = refresh_interval
+        self.reload_interval = reload_interval
+        self._indexes: Optional[_Indexes] = None
+        self._sorted: Dict[tuple, list] = {}  # (sort, bucket) -> [(khóa, book)] tăng dần, xóa khi có ghi
+        self._version = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._stats = {'loads': 0, 'version_checks': 0}
+
+    # ========== Nạp / đồng bộ ==========
+
+    def reload(self):
+        """Nạp lại toàn bộ catalog từ repository bên trong"""
+        with self._load_lock:
+            self._load()
+
+    def _load(self):
+        # Đọc version trước khi đọc dữ liệu: thay đổi xen giữa sẽ bị phát hiện ở lần kiểm tra sau
+        version = self.inner.catalog_version()
+        indexes = _Indexes()
+        for book in self.inner.iter_books():
+            indexes.add(book)
+        with self._lock:
+            self._indexes = indexes
+            self._sorted = {}
+            self._version = version
+            self._loaded_at = self._checked_at = time.monotonic()
+            self._stats['loads'] += 1
+
+    def _current(self) -> _Indexes:
+        """Index hiện tại; nạp lần đầu, kiểm tra version khi tới hạn"""
+        now = time.monotonic()
+        due = self.refresh_interval > 0 and now - self._checked_at > self.refresh_interval
+        if self._indexes is None or due:
+            with self._load_lock:
+                now = time.monotonic()
+                if self._indexes is None:
+                    self._load()
+                elif self.refresh_interval > 0 and now - self._checked_at > self.refresh_interval:
+                    self._refresh(now)
+        return self._indexes
+
+    def _refresh(self, now: float):
+        expired = self.reload_interval > 0 and now - self._loaded_at > self.reload_interval
+        if not expired:
+            self._stats['version_checks'] += 1
+            if self.inner.catalog_version() == self._version:
+                self._checked_at = now
+                return
+        self._load()
+
+    # ========== Truy vấn ==========
+
+    def find_all(self, fields: BookFields = None) -> List[Book]:
+        """Lấy tất cả sách (book_id giảm dần)"""
+        return self._copies(book for _, book in reversed(self._sorted_bucket('newest', None, None)))
+
+    def find_by_id(self, book_id: int) -> Optional[Book]:
+        return self._copy(self._current().by_id.get(book_id))
+
+    def find_by_code(self, book_code: str) -> Optional[Book]:
+        return self._copy(self._current().by_code.get(book_code))
+
+    def find_by_ids(self, book_ids: List[int], fields: BookFields = None) -> List[Book]:
+        by_id = self._current().by_id
+        return self._copies(by_id[book_id] for book_id in dict.fromkeys(book_ids) if book_id in by_id)
+
+    def search_by_name(self, name: str, fields: BookFields = None) -> List[Book]:
+        """Tìm theo tên (chứa chuỗi, không phân biệt hoa thường/dấu như collation của MySQL)"""
+        needle = fold_text(name)
+        entries = self._sorted_bucket('name', None, None)
+        folded_names = self._indexes.folded_names
+        return self._copies(book for _, book in entries if needle in folded_names.get(book.book_id, ''))
+
+    def find_by_type(self, book_type: str, fields: BookFields = None) -> List[Book]:
+        return self._copies(book for _, book in self._sorted_bucket('name', book_type, None))
+
+    def find_by_publisher(self, publisher: str, book_type: Optional[str] = None,
+                          fields: BookFields = None) -> List[Book]:
+        return self._copies(book for _, book in self._sorted_bucket('name', book_type, publisher))
+
+    def find_page(self, sort: str = 'newest', limit: int = 50, cursor: Optional[str] = None,
+                  include_total: bool = False, name: Optional[str] = None,
+                  book_type: Optional[str] = None, publisher: Optional[str] = None,
+                  fields: BookFields = None) -> Page:
+        """Phân trang keyset trên danh sách đã sắp xếp (bisect); cursor tương thích với BookRepository"""
+        if sort not in BookRepository.SORT_KEYS:
+            raise ValueError(f"Khóa sắp xếp không hợp lệ. Phải là: {', '.join(BookRepository.SORT_KEYS)}")
+        direction = BookRepository.SORT_KEYS[sort][1]
+        limit = clamp_limit(limit)
+
+        entries = self._sorted_bucket(sort, book_type, publisher)
+        if name:
+            needle = fold_text(name)
+            folded_names = self._indexes.folded_names
+            entries = [entry for entry in entries if needle in folded_names.get(entry[1].book_id, '')]
+        count = len(entries)
+
+        # Vị trí tính theo thứ tự hiển thị (DESC = đảo ngược danh sách tăng dần)
+        start, end = 0, limit
+        if cursor:
+            values, cursor_direction = decode_cursor(cursor)
+            if len(values) != len(BookRepository.SORT_KEYS[sort][0]):
+                raise ValueError("Cursor không hợp lệ")
+            key = tuple(values)
+            try:
+                if cursor_direction == 'next':
+                    start = (bisect.bisect_right(entries, key, key=_entry_key) if direction == 'ASC'
+                             else count - bisect.bisect_left(entries, key, key=_entry_key))
+                    end = start + limit
+                else:
+                    end = (bisect.bisect_left(entries, key, key=_entry_key) if direction == 'ASC'
+                           else count - bisect.bisect_right(entries, key, key=_entry_key))
+                    start = max(0, end - limit)
+            except TypeError:
+                raise ValueError("Cursor không hợp lệ")
+
+        if direction == 'ASC':
+            window = entries[start:end]
+        else:
+            window = entries[max(0, count - end):count - start][::-1]
+        page = Page(items=self._copies(book for _, book in window), limit=limit)
+        if window:
+            if end < count:
+                page.next_cursor = encode_cursor(list(window[-1][0]), 'next')
+            if start > 0:
+                page.prev_cursor = encode_cursor(list(window[0][0]), 'prev')
+        if include_total:
+            page.total = count
+        return page
+
+    def iter_books(self, book_type: Optional[str] = None, publisher: Optional[str] = None,
+                   batch_size: int = 1000) -> Iterator[Book]:
+        """Duyệt sách theo book_id tăng dần (trên snapshot hiện tại)"""
+        for _, book in self._sorted_bucket('newest', book_type, publisher):
+            yield copy.copy(book)
+
+    def aggregate_statistics(self) -> Dict[str, Dict]:
+        """Thống kê theo loại sách, cùng quy tắc thành tiền với model"""
+        self._current()
+        result = {}
+        with self._lock:
+            for book_type, bucket in self._indexes.by_type.items():
+                books = bucket.values()
+                result[book_type] = {
+                    'count': len(bucket),
+                    'total_amount': float(sum(book.calculate_total_amount() for book in books)),
+                    'average_price': float(sum(book.price for book in books) / len(bucket)),
+                }
+        return result
+
+    def find_existing_codes(self, book_codes: List[str], for_update: bool = False) -> Set[str]:
+        """Hỏi thẳng DB: index trong bộ nhớ có thể chưa thấy mã vừa thêm ở node khác"""
+        return self.inner.find_existing_codes(book_codes, for_update)
+
+    def content_hashes(self, for_update: bool = False) -> Dict[str, bytes]:
+        """Đọc từ DB: đồng bộ phải so với dữ liệu mới nhất, không phải snapshot"""
+        return self.inner.content_hashes(for_update)
+
+    def _bucket(self, indexes: _Indexes, book_type: Optional[str], publisher: Optional[str]) -> Dict[int, Book]:
+        if publisher and book_type:
+            return indexes.by_publisher_type.get((publisher, book_type), {})
+        if publisher:
+            return indexes.by_publisher.get(publisher, {})
+        if book_type:
+            return indexes.by_type.get(book_type, {})
+        return indexes.by_id
+
+    def _sorted_bucket(self, sort: str, book_type: Optional[str], publisher: Optional[str]) -> list:
+        """[(khóa sắp xếp, book)] tăng dần của một bucket; cache tới lần ghi/nạp kế tiếp"""
+        self._current()
+        cache_key = (sort, book_type, publisher)
+        with self._lock:
+            entries = self._sorted.get(cache_key)
+            if entries is None:
+                columns = BookRepository.SORT_KEYS[sort][0]
+                bucket = self._bucket(self._indexes, book_type, publisher)
+                # Khóa luôn kết thúc bằng book_id (unique) nên không bao giờ phải so sánh hai Book
+                entries = sorted((tuple(getattr(book, col) for col in columns), book) for book in bucket.values())
+                self._sorted[cache_key] = entries
+            return entries
+
+    @staticmethod
+    def _copy(book: Optional[Book]) -> Optional[Book]:
+        # Trả bản sao để caller sửa object không làm bẩn index
+        return copy.copy(book) if book is not None else None
+
+    @staticmethod
+    def _copies(books) -> List[Book]:
+        return [copy.copy(book) for book in books]
+
+    # ========== Ghi (write-through) ==========
+
+    def create(self, book: Book) -> int:
+        """Tạo sách ở DB rồi thêm vào index"""
+        before = self._version
+        book_id = self.inner.create(book)
+        self._apply_many([book_id], before)
+        return book_id
+
+    def create_many(self, books: List[Book]) -> int:
+        """Thêm nhiều sách ở DB; không biết id từng dòng nên nạp lại toàn bộ ở lần kiểm tra version kế tiếp"""
+        count = self.inner.create_many(books)
+        self._invalidate_all()
+        return count
+
+    def upsert_many(self, books: List[Book]) -> int:
+        """Thêm/cập nhật nhiều sách ở DB; nạp lại toàn bộ ở lần kiểm tra version kế tiếp"""
+        count = self.inner.upsert_many(books)
+        self._invalidate_all()
+        return count
+
+    def update_many(self, changes: List[Tuple[int, Dict[str, object]]]) -> int:
+        """Cập nhật một phần nhiều sách ở DB rồi đọc lại các dòng đó (một truy vấn IN) vào index"""
+        before = self._version
+        result = self.inner.update_many(changes)
+        self._apply_many([book_id for book_id, _ in changes], before)
+        return result
+
+    def delete_by_codes(self, book_codes: List[str]) -> int:
+        """Xóa sách theo mã ở DB rồi bỏ khỏi index"""
+        before = self._version
+        count = self.inner.delete_by_codes(book_codes)
+        version = self._version_after_write(before)
+        with self._lock:
+            if self._indexes is not None:
+                for code in book_codes:
+                    book = self._indexes.by_code.get(code)
+                    if book is not None:
+                        self._indexes.remove(book.book_id)
+                self._after_write(version)
+        return count
+
+    def update(self, book_id: int, book: Book) -> bool:
+        """Cập nhật sách ở DB rồi thay bản trong index"""
+        before = self._version
+        result = self.inner.update(book_id, book)
+        self._apply_many([book_id], before)
+        return result
+
+    def delete(self, book_id: int) -> bool:
+        """Xóa sách ở DB rồi bỏ khỏi index"""
+        before = self._version
+        result = self.inner.delete(book_id)
+        version = self._version_after_write(before)
+        with self._lock:
+            if self._indexes is not None:
+                self._indexes.remove(book_id)
+                self._after_write(version)
+        return result
+
+    def _apply_many(self, book_ids: List[int], before: Optional[int]):
+        """Đọc lại đúng các dòng vừa ghi (giá trị DB sinh ra: id, mặc định...) và cập nhật index"""
+        if self._indexes is None:
+            return
+        books = {book.book_id: book for book in self.inner.find_by_ids(book_ids)}
+        version = self._version_after_write(before)
+        with self._lock:
+            if self._indexes is None:
+                return
+            for book_id in book_ids:
+                self._indexes.remove(book_id)
+                if book_id in books:
+                    self._indexes.add(books[book_id])
+            self._after_write(version)
+
+    def _invalidate_all(self):
+        """Không biết id các dòng vừa ghi: buộc lần truy vấn kế tiếp kiểm tra version (và nạp lại)"""
+        with self._lock:
+            self._after_write(None)
+            self._checked_at = 0.0
+
+    def _version_after_write(self, before: Optional[int]):
+        """
+        Version DB sau lần ghi (đọc trên cùng connection/transaction với lần ghi) = version của index
+        sau khi áp dụng lần ghi đó, nếu lần ghi chỉ tăng version đúng 1 so với snapshot trước khi ghi
+        (hoặc không ghi gì); ngược lại None - có thay đổi từ nơi khác, lần kiểm tra kế tiếp nạp lại
+        Transaction bị rollback sau đó: version DB quay về giá trị cũ, khác snapshot nên vẫn nạp lại
+        """
+        if before is None or self._indexes is None:
+            return None
+        version = self.inner.catalog_version()
+        return version if version in (before, before + 1) else None
+
+    def _after_write(self, version):
+        self._sorted = {}
+        self._version = version
+
+    def stats(self) -> dict:
+        """Số sách trong bộ nhớ, số lần nạp/kiểm tra version"""
+        with self._lock:
+            data = dict(self._stats)
+            data['size'] = len(self._indexes.by_id) if self._indexes is not None else 0
+            data['loaded_at'] = self._loaded_at
+        return data
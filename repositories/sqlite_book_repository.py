@@ -0,0 +1,26 @@
+from app.repositories.book_repository import BookRepository
+
+
+class SQLiteBookRepository(BookRepository):
+    """
+    Book Repository cho backend SQLite (DB_BACKEND=sqlite)
+    Câu SQL dùng chung với BookRepository - connection SQLite (config/sqlite_backend.py)
+    nhận placeholder %s và trả dict như mysql-connector; chỉ khác ở phần phụ thuộc driver
+    """
+
+    def _upsert_clause(self) -> str:
+        """SQLite không có ON DUPLICATE KEY UPDATE: dùng ON CONFLICT(book_code) DO UPDATE"""
+        updates = ', '.join(f"{col}=excluded.{col}" for col in self.WRITE_COLUMNS if col != 'book_code')
+        return f" ON CONFLICT(book_code) DO UPDATE SET {updates}"
+
+    def _lock_rows(self, conn, cursor) -> str:
+        """SQLite không có SELECT ... FOR UPDATE: lấy khóa ghi của cả DB (BEGIN IMMEDIATE) tới hết transaction"""
+        if not conn.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE")
+        return ""
+
+    def _abandon_stream(self, conn, cursor):
+        """SQLite đọc từng dòng theo yêu cầu, không có result treo trên socket: đóng cursor rồi trả connection về pool"""
+        if cursor is not None:
+            cursor.close()
+        conn.close()
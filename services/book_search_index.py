@@ -0,0 +1,171 @@
+from app.models.book_model import Book
+from app.models.page_model import encode_cursor, decode_cursor
+from typing import Dict, Iterable, List, Optional, Tuple
+import bisect
+import math
+import re
+import threading
+import unicodedata
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def fold_text(text: Optional[str]) -> str:
+    """Bỏ dấu tiếng Việt + chữ thường: 'Sách Giáo Khoa Đại số' -> 'sach giao khoa dai so'"""
+    if not text:
+        return ''
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    decomposed = unicodedata.normalize('NFD', text)
+    return ''.join(ch for ch in decomposed if unicodedata.category(ch) != 'Mn').lower()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Tách từ sau khi bỏ dấu"""
+    return _TOKEN_RE.findall(fold_text(text))
+
+
+class BookSearchIndex:
+    """
+    Inverted index trong bộ nhớ cho book_name, publisher, description
+    - Không phân biệt dấu (gõ 'sach giao khoa' vẫn ra 'Sách giáo khoa')
+    - Xếp hạng BM25, trọng số theo field (tên sách > NXB > mô tả)
+    - Cập nhật từng sách khi create/update/delete, không cần build lại
+    """
+
+    FIELD_WEIGHTS = {'book_name': 3.0, 'publisher': 1.5, 'description': 1.0}
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, float]] = {}  # token -> {book_id: tf có trọng số}
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}   # book_id -> các token của sách
+        self._doc_length: Dict[int, float] = {}
+        self._doc_meta: Dict[int, Tuple[str, str]] = {}    # book_id -> (book_type, publisher)
+        self._total_length = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    # ========== Cập nhật index ==========
+
+    def build(self, books: Iterable[Book]):
+        """Build lại toàn bộ index"""
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_length.clear()
+            self._doc_meta.clear()
+            self._total_length = 0.0
+            for book in books:
+                self._add(book)
+
+    def add(self, book: Book):
+        """Thêm hoặc thay thế một sách trong index"""
+        with self._lock:
+            self._remove(book.book_id)
+            self._add(book)
+
+    def remove(self, book_id: int):
+        with self._lock:
+            self._remove(book_id)
+
+    def _add(self, book: Book):
+        weighted_tf: Dict[str, float] = {}
+        length = 0.0
+        for field, weight in self.FIELD_WEIGHTS.items():
+            tokens = tokenize(getattr(book, field, None))
+            length += weight * len(tokens)
+            for token in tokens:
+                weighted_tf[token] = weighted_tf.get(token, 0.0) + weight
+        if not weighted_tf:
+            return
+        for token, tf in weighted_tf.items():
+            self._postings.setdefault(token, {})[book.book_id] = tf
+        self._doc_terms[book.book_id] = tuple(weighted_tf)
+        self._doc_length[book.book_id] = length
+        self._doc_meta[book.book_id] = (book.get_book_type(), book.publisher)
+        self._total_length += length
+
+    def _remove(self, book_id: int):
+        terms = self._doc_terms.pop(book_id, None)
+        if terms is None:
+            return
+        for token in terms:
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(book_id, None)
+                if not posting:
+                    del self._postings[token]
+        self._total_length -= self._doc_length.pop(book_id, 0.0)
+        self._doc_meta.pop(book_id, None)
+
+    # ========== Tìm kiếm ==========
+
+    def search(self, query: str, limit: int = 50, cursor: Optional[str] = None,
+               book_type: Optional[str] = None, publisher: Optional[str] = None
+               ) -> Tuple[List[int], Optional[str], Optional[str], int]:
+        """
+        Tìm các sách chứa tất cả từ trong query, xếp theo độ liên quan
+        Trả về (book_ids của trang, next_cursor, prev_cursor, tổng số kết quả)
+        """
+        ranked = self._rank(tokenize(query), book_type, publisher)
+        keys = [(-score, book_id) for book_id, score in ranked]
+
+        start, end = 0, limit
+        if cursor:
+            values, direction = decode_cursor(cursor)
+            if len(values) != 2:
+                raise ValueError("Cursor không hợp lệ")
+            position = (-float(values[0]), int(values[1]))
+            if direction == 'next':
+                start = bisect.bisect_right(keys, position)
+                end = start + limit
+            else:
+                end = bisect.bisect_left(keys, position)
+                start = max(0, end - limit)
+
+        page = ranked[start:end]
+        next_cursor = prev_cursor = None
+        if page and end < len(ranked):
+            next_cursor = encode_cursor([page[-1][1], page[-1][0]], 'next')
+        if page and start > 0:
+            prev_cursor = encode_cursor([page[0][1], page[0][0]], 'prev')
+        return [book_id for book_id, _ in page], next_cursor, prev_cursor, len(ranked)
+
+    def _rank(self, tokens: List[str], book_type: Optional[str],
+              publisher: Optional[str]) -> List[Tuple[int, float]]:
+        """BM25 trên các sách chứa đủ mọi token; sắp theo (điểm giảm dần, book_id)"""
+        if not tokens:
+            return []
+        with self._lock:
+            postings = []
+            for token in dict.fromkeys(tokens):
+                posting = self._postings.get(token)
+                if not posting:
+                    return []
+                postings.append(posting)
+            postings.sort(key=len)
+
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+            if book_type or publisher:
+                candidates = {
+                    book_id for book_id in candidates
+                    if (not book_type or self._doc_meta[book_id][0] == book_type)
+                    and (not publisher or self._doc_meta[book_id][1] == publisher)
+                }
+
+            total_docs = len(self._doc_terms)
+            avg_length = self._total_length / total_docs if total_docs else 1.0
+            scores = dict.fromkeys(candidates, 0.0)
+            for posting in postings:
+                idf = math.log(1 + (total_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for book_id in candidates:
+                    tf = posting[book_id]
+                    norm = self.K1 * (1 - self.B + self.B * self._doc_length[book_id] / avg_length)
+                    scores[book_id] += idf * tf * (self.K1 + 1) / (tf + norm)
+
+        return sorted(((book_id, round(score, 6)) for book_id, score in scores.items()),
+                      key=lambda item: (-item[1], item[0]))
@@ -1,9 +1,22 @@
 from app.interfaces.book_service_interface import BookServiceInterface
-from app.interfaces.book_repository_interface import BookRepositoryInterface
+from app.interfaces.book_repository_interface import BookRepositoryInterface, BookFields
 from app.models.book_model import Book, TextBook, ReferenceBook
+from app.models.book_batch import BookBatch
+from app.models.page_model import Page, clamp_limit
 from app.validators.book_validator import BookValidator
-from typing import List, Optional, Tuple, Dict
+from app.config.unit_of_work import after_commit, unit_of_work
+from app.config.tracing import traced_class
+from app.services.book_search_index import BookSearchIndex
+from app.services.book_typeahead import BookTypeahead
+from typing import Callable, Iterable, List, Optional, Tuple, Dict, Iterator, Union
+import os
+import threading
+import time
 
+# Build lại search index / typeahead sau N giây để thấy thay đổi từ process/node khác (0 = không bao giờ)
+SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv('SEARCH_INDEX_REFRESH_SECONDS', 300))
+
+@traced_class('service')
 class BookService(BookServiceInterface):
     """
     Concrete implementation của Book Service
@@ -11,9 +24,24 @@ class BookService(BookServiceInterface):
     Tuân thủ SRP: không trực tiếp làm việc với database
     """
     
+    # Số dòng mỗi lần executemany khi nhập hàng loạt
+    IMPORT_CHUNK_SIZE = 1000
+    
+    # Field được sửa qua PATCH theo loại sách (mã và loại sách không đổi sau khi tạo)
+    PATCH_FIELDS = {
+        'Sách giáo khoa': ('book_name', 'import_date', 'price', 'quantity', 'publisher',
+                           'condition_status', 'image', 'description'),
+        'Sách tham khảo': ('book_name', 'import_date', 'price', 'quantity', 'publisher',
+                           'tax', 'image', 'description'),
+    }
+    
     def __init__(self, book_repository: BookRepositoryInterface):
         self.book_repository = book_repository
         self.validator = BookValidator()
+        self._search_index = None
+        self._typeahead = None
+        self._indexes_built_at = 0.0
+        self._index_lock = threading.Lock()
     
     # ========== CRUD Operations ==========
     
@@ -21,30 +49,85 @@ class BookService(BookServiceInterface):
         """Lấy tất cả sách"""
         return self.book_repository.find_all()
     
+    def get_books_by_ids(self, book_ids: List[int], fields: BookFields = None) -> List[Book]:
+        """Lấy nhiều sách theo ID trong một truy vấn (giữ thứ tự, bỏ qua ID không tồn tại)"""
+        return self.book_repository.find_by_ids(book_ids, fields)
+    
     def get_book_by_id(self, book_id: int) -> Optional[Book]:
         """Lấy sách theo ID"""
         return self.book_repository.find_by_id(book_id)
     
-    def search_books(self, query: str) -> List[Book]:
-        """Tìm kiếm sách theo tên"""
-        return self.book_repository.search_by_name(query)
+    def search_books(self, query: str, limit: int = 50, cursor: Optional[str] = None,
+                     book_type: Optional[str] = None, publisher: Optional[str] = None,
+                     fields: BookFields = None) -> Page:
+        """
+        Tìm kiếm sách theo tên, nhà xuất bản, mô tả (không phân biệt dấu)
+        Kết quả xếp theo độ liên quan, phân trang cursor
+        """
+        limit = clamp_limit(limit)
+        book_ids, next_cursor, prev_cursor, total = self._get_indexes()[0].search(
+            query, limit, cursor, book_type, publisher
+        )
+        return Page(
+            items=self.book_repository.find_by_ids(book_ids, fields), limit=limit,
+            next_cursor=next_cursor, prev_cursor=prev_cursor, total=total
+        )
+    
+    def suggest_books(self, prefix: str, limit: int = 10) -> Dict[str, List[dict]]:
+        """Gợi ý tên sách, mã sách, nhà xuất bản theo tiền tố (autocomplete)"""
+        return self._get_indexes()[1].suggest(prefix, max(1, min(limit, 50)))
+    
+    def get_books_page(self, limit: int = 50, cursor: Optional[str] = None, sort: Optional[str] = None,
+                       include_total: bool = False, query: Optional[str] = None,
+                       book_type: Optional[str] = None, publisher: Optional[str] = None,
+                       fields: BookFields = None) -> Page:
+        """
+        Lấy một trang sách (phân trang cursor)
+        Có query: tìm kiếm xếp theo độ liên quan (search_books)
+        Mặc định: danh sách chung sắp theo sách mới nhất, lọc theo loại/NXB sắp theo tên
+        """
+        if query:
+            return self.search_books(query, limit, cursor, book_type, publisher, fields)
+        if not sort:
+            sort = 'name' if (book_type or publisher) else 'newest'
+        return self.book_repository.find_page(
+            sort=sort, limit=limit, cursor=cursor, include_total=include_total,
+            book_type=book_type, publisher=publisher, fields=fields
+        )
+    
+    def iter_books(self, book_type: Optional[str] = None, publisher: Optional[str] = None) -> Iterator[Book]:
+        """Duyệt toàn bộ sách theo lô (export dạng stream)"""
+        return self.book_repository.iter_books(book_type, publisher)
     
     def create_book(self, book_data: dict) -> Tuple[bool, str, Optional[int]]:
-        """Tạo sách mới"""
+        """Tạo sách mới (kiểm tra trùng mã + insert trong một unit of work)"""
+        with unit_of_work():
+            return self._create_book(book_data)
+    
+    def _validate_new_book(self, book_data: dict) -> Tuple[bool, str]:
+        """Validate loại sách rồi validate theo loại (dùng chung cho thêm một sách và nhập hàng loạt)"""
         # Lấy loại sách
         book_type = book_data.get('book_type')
         
         # Validate loại sách
         is_valid, message = self.validator.validate_book_type(book_type)
         if not is_valid:
-            return False, message, None
+            return False, message
         
         # Validate theo loại sách
         if book_type == 'Sách giáo khoa':
-            is_valid, message = self.validator.validate_textbook(book_data)
-        else:  # Sách tham khảo
-            is_valid, message = self.validator.validate_reference_book(book_data)
-        
+            return self.validator.validate_textbook(book_data)
+        return self.validator.validate_reference_book(book_data)
+    
+    @staticmethod
+    def _build_book(book_data: dict) -> Book:
+        """TextBook/ReferenceBook theo book_type (dữ liệu đã qua _validate_new_book)"""
+        if book_data['book_type'] == 'Sách giáo khoa':
+            return TextBook.from_dict(book_data)
+        return ReferenceBook.from_dict(book_data)
+    
+    def _create_book(self, book_data: dict) -> Tuple[bool, str, Optional[int]]:
+        is_valid, message = self._validate_new_book(book_data)
         if not is_valid:
             return False, message, None
         
@@ -54,18 +137,148 @@ class BookService(BookServiceInterface):
         
         # Tạo đối tượng Book tương ứng
         try:
-            if book_type == 'Sách giáo khoa':
-                book = TextBook.from_dict(book_data)
-            else:
-                book = ReferenceBook.from_dict(book_data)
-            
+            book = self._build_book(book_data)
             book_id = self.book_repository.create(book)
+            book.book_id = book_id
+            self._on_book_saved(book)
             return True, "Thêm sách thành công", book_id
         except Exception as e:
             return False, f"Lỗi khi thêm sách: {str(e)}", None
     
+    def import_books(self, rows: Iterable[dict], dry_run: bool = False,
+                     progress: Optional[Callable[[str, int, int], None]] = None) -> Dict:
+        """
+        Nhập sách hàng loạt:
+        - Validate mọi dòng trong một lượt (cùng quy tắc với create_book), báo lỗi theo số dòng
+        - Mã trùng trong file và mã đã có trong DB (một truy vấn IN) bị bỏ qua kèm lỗi
+        - Dòng hợp lệ được insert bằng executemany theo lô IMPORT_CHUNK_SIZE trong một transaction;
+          kiểm tra mã đã có nằm trong cùng transaction và khóa các mã đó (for_update) nên mã do request
+          khác thêm đồng thời được báo lỗi theo dòng thay vì làm hỏng cả lô
+        dry_run: chỉ validate; progress(phase, đã xử lý, tổng) được gọi sau mỗi lô
+        """
+        rows = list(rows)
+        total = len(rows)
+        report = progress or (lambda phase, processed, count: None)
+        candidates, errors = self._parse_rows(rows, report)
+        
+        books = []
+        inserted = 0
+        with unit_of_work():
+            # Business rule: mã sách đã tồn tại (một truy vấn IN cho cả file, chia lô)
+            existing = self.book_repository.find_existing_codes([book.book_code for _, book in candidates],
+                                                                for_update=not dry_run)
+            for row_number, book in candidates:
+                if book.book_code in existing:
+                    errors.append({'row': row_number, 'book_code': book.book_code, 'error': "Mã sách đã tồn tại"})
+                else:
+                    books.append(book)
+            if books and not dry_run:
+                for start in range(0, len(books), self.IMPORT_CHUNK_SIZE):
+                    inserted += self.book_repository.create_many(books[start:start + self.IMPORT_CHUNK_SIZE])
+                    report('inserting', inserted, len(books))
+        errors.sort(key=lambda item: item['row'])
+        if inserted:
+            # executemany không trả id từng sách: build lại search index/typeahead ở lần dùng kế tiếp
+            self._reset_indexes()
+        
+        return {
+            'total': total,
+            'valid': len(books),
+            'inserted': inserted,
+            'failed': len(errors),
+            'dry_run': dry_run,
+            'errors': errors
+        }
+    
+    def sync_books(self, rows: Iterable[dict], delete_missing: bool = False, dry_run: bool = False,
+                   progress: Optional[Callable[[str, int, int], None]] = None) -> Dict:
+        """
+        Đồng bộ catalog với feed (khóa: book_code), chạy lại nhiều lần cho cùng kết quả:
+        - So Book.content_hash() của từng dòng feed với hash trong DB: chỉ sách mới/đã đổi được ghi
+          bằng INSERT ... ON DUPLICATE KEY UPDATE theo lô, sách không đổi bỏ qua
+        - delete_missing: xóa sách có trong DB nhưng không có trong feed
+        - Đọc hash, so sánh và ghi trong một transaction; hash đọc với for_update nên không có ghi xen giữa
+          (vd: sách vừa thêm ở request khác bị xóa vì không có trong hash đã đọc)
+        - Dòng feed lỗi (validate, mã trùng) bị bỏ qua và báo theo số dòng như import_books
+        """
+        rows = list(rows)
+        report = progress or (lambda phase, processed, count: None)
+        candidates, errors = self._parse_rows(rows, report)
+        
+        created, changed, unchanged, removed = [], [], 0, []
+        with unit_of_work():
+            current = self.book_repository.content_hashes(for_update=not dry_run)
+            report('diffing', len(current), len(current))
+            for _, book in candidates:
+                current_hash = current.get(book.book_code)
+                if current_hash is None:
+                    created.append(book)
+                elif current_hash != book.content_hash():
+                    changed.append(book)
+                else:
+                    unchanged += 1
+            if delete_missing:
+                # Feed có dòng lỗi thì không xóa theo mã của dòng đó (sách vẫn có trong feed)
+                feed_codes = {book_data.get('book_code') for book_data in rows}
+                removed = [code for code in current if code not in feed_codes]
+            
+            writes = created + changed
+            if not dry_run:
+                for start in range(0, len(writes), self.IMPORT_CHUNK_SIZE):
+                    self.book_repository.upsert_many(writes[start:start + self.IMPORT_CHUNK_SIZE])
+                    report('upserting', min(start + self.IMPORT_CHUNK_SIZE, len(writes)), len(writes))
+                if removed:
+                    self.book_repository.delete_by_codes(removed)
+                    report('deleting', len(removed), len(removed))
+        if not dry_run and (created or changed or removed):
+            self._reset_indexes()
+        
+        return {
+            'total': len(rows),
+            'inserted': len(created),
+            'updated': len(changed),
+            'unchanged': unchanged,
+            'deleted': len(removed),
+            'failed': len(errors),
+            'dry_run': dry_run,
+            'errors': errors
+        }
+    
+    def _parse_rows(self, rows: List[dict],
+                    report: Callable[[str, int, int], None]) -> Tuple[List[Tuple[int, Book]], List[dict]]:
+        """
+        Validate + tạo Book cho từng dòng nhập (cùng quy tắc với create_book)
+        Trả về ([(số dòng, book)], [lỗi {row, book_code, error}]); mã trùng trong file bị báo lỗi
+        """
+        total = len(rows)
+        errors, candidates, seen_codes = [], [], {}
+        
+        for row_number, book_data in enumerate(rows, start=1):
+            is_valid, message = self._validate_new_book(book_data)
+            book_code = book_data.get('book_code')
+            if is_valid and book_code in seen_codes:
+                is_valid, message = False, f"Mã sách trùng với dòng {seen_codes[book_code]}"
+            if is_valid:
+                try:
+                    book = self._build_book(book_data)
+                except (ValueError, TypeError) as e:
+                    is_valid, message = False, f"Dữ liệu không hợp lệ: {str(e)}"
+            if not is_valid:
+                errors.append({'row': row_number, 'book_code': book_code, 'error': message})
+                continue
+            seen_codes[book_code] = row_number
+            candidates.append((row_number, book))
+            if row_number % self.IMPORT_CHUNK_SIZE == 0:
+                report('validating', row_number, total)
+        report('validating', total, total)
+        return candidates, errors
+    
     def update_book(self, book_id: int, book_data: dict) -> Tuple[bool, str]:
-        """Cập nhật sách"""
+        """Cập nhật sách (kiểm tra tồn tại + update trong một unit of work)"""
+        with unit_of_work():
+            return self._update_book(book_id, book_data)
+    
+    def _update_book(self, book_id: int, book_data: dict) -> Tuple[bool, str]:
         # Kiểm tra sách tồn tại
         existing_book = self.book_repository.find_by_id(book_id)
         if not existing_book:
@@ -86,12 +299,76 @@ class BookService(BookServiceInterface):
         try:
             book.book_id = book_id
             self.book_repository.update(book_id, book)
+            book.book_code = existing_book.book_code
+            self._on_book_saved(book)
             return True, "Cập nhật sách thành công"
         except Exception as e:
             return False, f"Lỗi khi cập nhật sách: {str(e)}"
     
+    def update_many(self, updates: List[dict]) -> List[dict]:
+        """
+        Cập nhật một phần (PATCH) nhiều sách trong một transaction: [{book_id, field: giá trị, ...}]
+        - Đọc mọi sách bằng một truy vấn IN, gộp field gửi lên vào dữ liệu hiện tại rồi validate như update_book
+        - Phần tử lỗi bị bỏ qua; phần tử hợp lệ chỉ ghi các cột được gửi
+        Trả về kết quả từng phần tử theo thứ tự gửi: {book_id, success, message}
+        """
+        with unit_of_work():
+            results, changes, saved = self._prepare_updates(updates)
+            if changes:
+                self.book_repository.update_many(changes)
+        for book in saved:
+            self._on_book_saved(book)
+        return results
+    
+    def _prepare_updates(self, updates: List[dict]) -> Tuple[List[dict], List[Tuple[int, dict]], List[Book]]:
+        existing = {book.book_id: book for book in self.book_repository.find_by_ids(
+            [item.get('book_id') for item in updates if isinstance(item.get('book_id'), int)]
+        )}
+        results, changes, saved, seen = [], [], [], set()
+        for item in updates:
+            book_id = item.get('book_id')
+            fields = {key: value for key, value in item.items() if key != 'book_id'}
+            is_valid, message, book = self._patch_book(existing.get(book_id), fields)
+            if is_valid and book_id in seen:
+                is_valid, message = False, "book_id bị lặp trong yêu cầu"
+            results.append({'book_id': book_id, 'success': is_valid, 'message': message})
+            if is_valid:
+                seen.add(book_id)
+                changes.append((book_id, {key: getattr(book, key) for key in fields}))
+                saved.append(book)
+        return results, changes, saved
+    
+    def _patch_book(self, current: Optional[Book], fields: dict) -> Tuple[bool, str, Optional[Book]]:
+        """Gộp field vào sách hiện tại và validate; trả về (hợp lệ, thông báo, sách sau khi sửa)"""
+        if current is None:
+            return False, "Không tìm thấy sách", None
+        if not fields:
+            return False, "Không có trường nào để cập nhật", None
+        book_type = current.get_book_type()
+        invalid = [key for key in fields if key not in self.PATCH_FIELDS[book_type]]
+        if invalid:
+            return False, f"Không cập nhật được trường: {', '.join(invalid)}", None
+        
+        book_data = current.to_dict()
+        book_data.update(fields)
+        if book_type == 'Sách giáo khoa':
+            is_valid, message = self.validator.validate_textbook(book_data)
+        else:
+            is_valid, message = self.validator.validate_reference_book(book_data)
+        if not is_valid:
+            return False, message, None
+        try:
+            book_class = TextBook if book_type == 'Sách giáo khoa' else ReferenceBook
+            return True, "Cập nhật sách thành công", book_class.from_dict(book_data)
+        except (ValueError, TypeError) as e:
+            return False, f"Dữ liệu không hợp lệ: {str(e)}", None
+    
     def delete_book(self, book_id: int) -> Tuple[bool, str]:
-        """Xóa sách"""
+        """Xóa sách (kiểm tra tồn tại + delete trong một unit of work)"""
+        with unit_of_work():
+            return self._delete_book(book_id)
+    
+    def _delete_book(self, book_id: int) -> Tuple[bool, str]:
         # Kiểm tra sách tồn tại
         existing_book = self.book_repository.find_by_id(book_id)
         if not existing_book:
@@ -99,6 +376,7 @@ class BookService(BookServiceInterface):
         
         try:
             self.book_repository.delete(book_id)
+            self._on_book_deleted(book_id)
             return True, "Xóa sách thành công"
         except Exception as e:
             return False, f"Lỗi khi xóa sách: {str(e)}"
@@ -121,40 +399,114 @@ class BookService(BookServiceInterface):
         Tính tổng thành tiền cho từng loại sách
         - Sách giáo khoa: tính theo condition_status
         - Sách tham khảo: tính có thuế
+        (tính bằng SQL aggregate, không tải từng cuốn sách)
         """
-        books = self.book_repository.find_by_type(book_type)
-        total = sum(book.calculate_total_amount() for book in books)
-        return total
+        return self._type_statistics(book_type)['total_amount']
     
     def calculate_average_price_reference_books(self) -> float:
         """Tính trung bình cộng đơn giá của các sách tham khảo"""
-        reference_books = self.book_repository.find_by_type('Sách tham khảo')
-        
-        if not reference_books:
-            return 0.0
-        
-        total_price = sum(book.price for book in reference_books)
-        return total_price / len(reference_books)
+        return self._type_statistics('Sách tham khảo')['average_price']
     
     def get_statistics(self) -> Dict:
         """
         Lấy thống kê tổng quan
-        Trả về dictionary chứa các thông tin thống kê
+        Trả về dictionary chứa các thông tin thống kê (một truy vấn GROUP BY duy nhất)
         """
-        all_books = self.get_all_books()
-        textbooks = [b for b in all_books if b.get_book_type() == 'Sách giáo khoa']
-        reference_books = [b for b in all_books if b.get_book_type() == 'Sách tham khảo']
+        return self._summarize(self.book_repository.aggregate_statistics())
+    
+    def get_book_batch(self, book_type: Optional[str] = None, publisher: Optional[str] = None) -> BookBatch:
+        """Đọc sách (stream theo lô) thành BookBatch dạng cột"""
+        return BookBatch.from_books(self.book_repository.iter_books(book_type, publisher))
+    
+    def summarize_books(self, books: Union[List[Book], BookBatch]) -> Dict:
+        """
+        Thống kê tổng quan (cùng dạng get_statistics) trên một tập sách cho trước
+        Tính vector hóa trên BookBatch; List[Book] được chuyển sang BookBatch trước
+        """
+        if not isinstance(books, BookBatch):
+            books = BookBatch.from_books(books)
+        return self._summarize(books.statistics())
+    
+    def _summarize(self, stats: Dict) -> Dict:
+        """Thống kê theo loại (dạng aggregate_statistics) -> thống kê tổng quan"""
+        textbooks = self._type_statistics('Sách giáo khoa', stats)
+        reference_books = self._type_statistics('Sách tham khảo', stats)
         
         return {
-            'total_books': len(all_books),
-            'total_textbooks': len(textbooks),
-            'total_reference_books': len(reference_books),
-            'total_amount_textbooks': self.calculate_total_amount_by_type('Sách giáo khoa'),
-            'total_amount_reference_books': self.calculate_total_amount_by_type('Sách tham khảo'),
-            'average_price_reference_books': self.calculate_average_price_reference_books(),
-            'total_amount_all': sum(book.calculate_total_amount() for book in all_books)
+            'total_books': textbooks['count'] + reference_books['count'],
+            'total_textbooks': textbooks['count'],
+            'total_reference_books': reference_books['count'],
+            'total_amount_textbooks': textbooks['total_amount'],
+            'total_amount_reference_books': reference_books['total_amount'],
+            'average_price_reference_books': reference_books['average_price'],
+            'total_amount_all': textbooks['total_amount'] + reference_books['total_amount']
         }
     
+    def _type_statistics(self, book_type: str, stats: Optional[Dict] = None) -> Dict:
+        """Thống kê của một loại sách (mặc định 0 nếu chưa có sách loại đó)"""
+        if stats is None:
+            stats = self.book_repository.aggregate_statistics()
+        return stats.get(book_type, {'count': 0, 'total_amount': 0.0, 'average_price': 0.0})
+    
+    # ========== Search Index / Typeahead ==========
+    
+    def _get_indexes(self) -> Tuple[BookSearchIndex, BookTypeahead]:
+        """
+        Search index + typeahead trong bộ nhớ: build lazy bằng một lượt đọc repository,
+        build lại khi quá hạn
+        """
+        search_index, typeahead = self._search_index, self._typeahead
+        if search_index is not None and typeahead is not None and not self._indexes_expired():
+            return search_index, typeahead
+        with self._index_lock:
+            # Kiểm tra lại trong lock: thread khác có thể vừa build xong
+            if self._search_index is None or self._indexes_expired():
+                search_index, typeahead = BookSearchIndex(), BookTypeahead()
+                
+                def feed():
+                    for book in self.book_repository.iter_books():
+                        search_index.add(book)
+                        yield book
+                
+                typeahead.build(feed())
+                self._search_index, self._typeahead = search_index, typeahead
+                self._indexes_built_at = time.monotonic()
+            return self._search_index, self._typeahead
+    
+    def _indexes_expired(self) -> bool:
+        return (SEARCH_INDEX_REFRESH_SECONDS > 0 and
+                time.monotonic() - self._indexes_built_at > SEARCH_INDEX_REFRESH_SECONDS)
+    
+    # Index dùng chung cho mọi request: chỉ đổi khi transaction commit (after_commit),
+    # thay đổi bị rollback không để lại sách ma trong kết quả tìm kiếm/typeahead
+    
+    def _on_book_saved(self, book: Book):
+        """Đồng bộ search index + typeahead sau khi thêm/sửa sách"""
+        def apply():
+            # Giữ lock: _reset_indexes/_get_indexes có thể thay cả hai index giữa chừng
+            with self._index_lock:
+                if self._search_index is not None:
+                    self._search_index.add(book)
+                    self._typeahead.add(book)
+        after_commit(apply)
+    
+    def _reset_indexes(self):
+        """Bỏ search index + typeahead hiện tại (build lại lazy)"""
+        def apply():
+            with self._index_lock:
+                self._search_index = None
+                self._typeahead = None
+        after_commit(apply)
+    
+    def _on_book_deleted(self, book_id: int):
+        """Đồng bộ search index + typeahead sau khi xóa sách"""
+        def apply():
+            with self._index_lock:
+                if self._search_index is not None:
+                    self._search_index.remove(book_id)
+                    self._typeahead.remove(book_id)
+        after_commit(apply)
+    
     def validate_book_data(self, book_data: dict) -> Tuple[bool, str]:
         """Validate dữ liệu sách (wrapper method)"""
         book_type = book_data.get('book_type')
@@ -0,0 +1,142 @@
+from app.models.book_model import Book
+from app.services.book_search_index import tokenize
+from typing import Dict, Iterable, List, Tuple
+import bisect
+import threading
+
+_SEP = '\x00'
+
+
+class BookTypeahead:
+    """
+    Gợi ý theo tiền tố (autocomplete) cho tên sách, mã sách, nhà xuất bản
+    Mảng khóa đã sắp xếp + bisect: tra cứu O(log n + k), không phân biệt dấu
+    Khóa dạng "<chuỗi đã bỏ dấu>\\x00<loại>\\x00<tham chiếu>" nên có thể xóa chính xác từng entry
+    """
+
+    # Số vị trí bắt đầu từ trong tên sách được index ('giao' khớp 'Sách giáo khoa')
+    MAX_WORD_STARTS = 4
+    KIND_PRIORITY = {'code': 0, 'name': 1, 'word': 2, 'publisher': 3}
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._books: Dict[int, Tuple[str, str, str]] = {}  # book_id -> (book_code, book_name, publisher)
+        self._publishers: Dict[str, int] = {}              # publisher -> số sách đang tham chiếu
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    # ========== Cập nhật ==========
+
+    def build(self, books: Iterable[Book]):
+        """Build lại toàn bộ (sắp xếp một lần)"""
+        with self._lock:
+            self._keys = []
+            self._books.clear()
+            self._publishers.clear()
+            for book in books:
+                self._keys.extend(self._register(book))
+            self._keys.sort()
+
+    def add(self, book: Book):
+        """Thêm hoặc thay thế một sách"""
+        with self._lock:
+            self._remove(book.book_id)
+            for key in self._register(book):
+                bisect.insort(self._keys, key)
+
+    def remove(self, book_id: int):
+        with self._lock:
+            self._remove(book_id)
+
+    def _register(self, book: Book) -> List[str]:
+        """Ghi nhận sách và trả về các khóa mới cần chèn"""
+        self._books[book.book_id] = (book.book_code, book.book_name, book.publisher or '')
+        keys = self._book_keys(book.book_id, book.book_code, book.book_name)
+        if book.publisher:
+            count = self._publishers.get(book.publisher, 0)
+            self._publishers[book.publisher] = count + 1
+            if count == 0:
+                keys.extend(self._publisher_keys(book.publisher))
+        return keys
+
+    def _remove(self, book_id: int):
+        data = self._books.pop(book_id, None)
+        if data is None:
+            return
+        book_code, book_name, publisher = data
+        stale = self._book_keys(book_id, book_code, book_name)
+        if publisher:
+            count = self._publishers.get(publisher, 0) - 1
+            if count <= 0:
+                self._publishers.pop(publisher, None)
+                stale.extend(self._publisher_keys(publisher))
+            else:
+                self._publishers[publisher] = count
+        for key in stale:
+            position = bisect.bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+
+    def _book_keys(self, book_id: int, book_code: str, book_name: str) -> List[str]:
+        keys = [self._key(' '.join(tokenize(book_code)), 'code', book_id)]
+        keys.extend(self._phrase_keys(book_name, 'name', 'word', book_id))
+        return list(dict.fromkeys(keys))
+
+    def _publisher_keys(self, publisher: str) -> List[str]:
+        return list(dict.fromkeys(self._phrase_keys(publisher, 'publisher', 'publisher', publisher)))
+
+    def _phrase_keys(self, text: str, kind: str, word_kind: str, ref) -> List[str]:
+        """Khóa cho cả cụm từ và cho các vị trí bắt đầu từ phía sau"""
+        words = tokenize(text)
+        if not words:
+            return []
+        keys = [self._key(' '.join(words), kind, ref)]
+        for start in range(1, min(len(words), self.MAX_WORD_STARTS)):
+            keys.append(self._key(' '.join(words[start:]), word_kind, ref))
+        return keys
+
+    @staticmethod
+    def _key(text: str, kind: str, ref) -> str:
+        return f"{text}{_SEP}{kind}{_SEP}{ref}"
+
+    # ========== Tra cứu ==========
+
+    def suggest(self, prefix: str, limit: int = 10) -> Dict[str, List[dict]]:
+        """Top-k sách (theo tên/mã) và nhà xuất bản có tiền tố khớp"""
+        folded = ' '.join(tokenize(prefix))
+        if not folded:
+            return {'books': [], 'publishers': []}
+        if prefix[-1:].isspace():
+            folded += ' '
+
+        # Quét một cửa sổ nhỏ sau vị trí bisect rồi ưu tiên: mã > đầu tên > giữa tên
+        window = limit * 4
+        candidates = []
+        with self._lock:
+            position = bisect.bisect_left(self._keys, folded)
+            while position < len(self._keys) and len(candidates) < window:
+                key = self._keys[position]
+                if not key.startswith(folded):
+                    break
+                text, kind, ref = key.split(_SEP)
+                candidates.append((self.KIND_PRIORITY[kind], len(text), kind, ref))
+                position += 1
+            candidates.sort()
+
+            books, publishers, seen, seen_publishers = [], [], set(), set()
+            for _, _, kind, ref in candidates:
+                if kind == 'publisher':
+                    if ref not in seen_publishers and len(publishers) < limit:
+                        seen_publishers.add(ref)
+                        publishers.append({'publisher': ref})
+                    continue
+                book_id = int(ref)
+                if book_id in seen or len(books) >= limit or book_id not in self._books:
+                    continue
+                seen.add(book_id)
+                book_code, book_name, publisher = self._books[book_id]
+                books.append({'book_id': book_id, 'book_code': book_code,
+                              'book_name': book_name, 'publisher': publisher})
+        return {'books': books, 'publishers': publishers}
@@ -0,0 +1,81 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import threading
+import time
+import uuid
+
+
+@dataclass
+class ImportJob:
+    """Trạng thái một lần nhập sách chạy nền"""
+    job_id: str
+    status: str = 'pending'      # pending | running | done | failed
+    phase: str = ''              # validating | inserting
+    processed: int = 0
+    total: int = 0
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'phase': self.phase,
+            'processed': self.processed,
+            'total': self.total,
+            'progress': self.processed / self.total if self.total else 0.0,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class ImportJobRegistry:
+    """
+    Chạy việc nhập sách lớn trong thread nền và giữ tiến độ để client hỏi lại
+    Thread mới không kế thừa unit of work của request nên việc nhập có transaction riêng
+    """
+
+    def __init__(self, max_finished: int = 100):
+        self.max_finished = max_finished
+        self._jobs: Dict[str, ImportJob] = {}
+        self._lock = threading.Lock()
+
+    def start(self, work: Callable[[Callable[[str, int, int], None]], dict]) -> ImportJob:
+        """work(progress) -> kết quả; progress(phase, processed, total) cập nhật tiến độ"""
+        job = ImportJob(job_id=uuid.uuid4().hex)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+
+        def progress(phase: str, processed: int, total: int):
+            job.phase, job.processed, job.total = phase, processed, total
+
+        def run():
+            job.status = 'running'
+            try:
+                job.result = work(progress)
+                job.status = 'done'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'failed'
+            finally:
+                job.finished_at = time.time()
+
+        threading.Thread(target=run, name=f'book-import-{job.job_id[:8]}', daemon=True).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        finished: List[ImportJob] = sorted(
+            (job for job in self._jobs.values() if job.finished_at is not None),
+            key=lambda job: job.finished_at
+        )
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.job_id]
@@ -0,0 +1,69 @@
+"""Phần dùng chung của benchmark: catalog giả lập (nạp vào SQLite tạm), percentile, lưu và so với baseline"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.benchmarks.catalog import CatalogSpec, generate_rows, publisher_name, seed_catalog
+from app.benchmarks.report import compare, load_results, percentile, save_results
+from app.config.migrations import migrate
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.services.book_service import BookService
+from collections import Counter
+from contextlib import redirect_stdout
+import io
+import unittest
+
+
+def setUpModule():
+    migrate()
+
+
+class CatalogTest(unittest.TestCase):
+    def test_same_seed_same_catalog(self):
+        spec = CatalogSpec(200, seed=7)
+        self.assertEqual(list(generate_rows(spec)), list(generate_rows(spec)))
+        self.assertNotEqual(list(generate_rows(spec)), list(generate_rows(CatalogSpec(200, seed=8))))
+
+    def test_type_mix_and_publisher_skew(self):
+        rows = list(generate_rows(CatalogSpec(2000, textbook_ratio=0.8, publishers=10, publisher_skew=1.5)))
+        textbooks = sum(1 for row in rows if row[2] == 'Sách giáo khoa')
+        self.assertAlmostEqual(textbooks / len(rows), 0.8, delta=0.05)
+        publishers = Counter(row[6] for row in rows)
+        self.assertEqual(publishers.most_common(1)[0][0], publisher_name(1))
+        self.assertGreater(publishers[publisher_name(1)], 5 * publishers[publisher_name(10)])
+
+    def test_seed_catalog_replaces_books(self):
+        repository = SQLiteBookRepository()
+        version = repository.catalog_version()
+        self.assertEqual(seed_catalog(CatalogSpec(120), chunk_size=50), 120)
+        self.assertEqual(seed_catalog(CatalogSpec(30)), 30)
+        self.assertGreater(repository.catalog_version(), version)
+        self.assertEqual(BookService(repository).get_statistics()['total_books'], 30)
+
+
+class ReportTest(unittest.TestCase):
+    def test_percentile_nearest_rank(self):
+        samples = [float(value) for value in range(1, 101)]
+        self.assertEqual((percentile(samples, 50), percentile(samples, 95), percentile(samples, 99)), (50, 95, 99))
+        self.assertEqual(percentile([3.0], 99), 3.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_save_then_compare(self):
+        path = os.path.join(tempfile.mkdtemp(prefix='libraryx_bench_'), 'baseline.json')
+        save_results(path, {'1000': {'find_all': {'p50_ms': 10.0, 'errors': 0}}}, note='test')
+        baseline = load_results(path)
+        self.assertEqual(baseline['meta']['note'], 'test')
+        metrics = (('p50_ms', True), ('errors', True))
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(compare({'1000': {'find_all': {'p50_ms': 10.5, 'errors': 0}}}, baseline, 0.1, metrics), [])
+            regressions = compare({'1000': {'find_all': {'p50_ms': 12.0, 'errors': 2}},
+                                   '5000': {'find_all': {'p50_ms': 99.0}}}, baseline, 0.1, metrics)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('1000 find_all p50_ms'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""BookBatch dạng cột: chuyển qua lại List[Book], thành tiền vector hóa khớp với model"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config (qua BookService)
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.models.book_batch import BookBatch
+from app.models.book_model import ReferenceBook, TextBook
+from app.presenters.book_presenter import BookPresenter
+from app.services.book_service import BookService
+from datetime import datetime
+import unittest
+
+BOOKS = [
+    TextBook(1, 'SGK001', 'Toán 10', datetime(2024, 1, 15), 25000.0, 10, 'NXB Giáo dục', condition_status='Mới'),
+    TextBook(2, 'SGK002', 'Văn 10', None, 30000.0, 4, 'NXB Giáo dục', condition_status='Cũ'),
+    TextBook(3, 'SGK003', 'Sử 10', None, 12500.0, 3, 'NXB Trẻ', condition_status='cũ'),
+    ReferenceBook(4, 'STK001', 'Lập trình Python', None, 120000.0, 3, 'NXB Trẻ', tax=6000.0),
+    ReferenceBook(5, 'STK002', 'Cấu trúc dữ liệu', None, 80000.0, 2, 'NXB Trẻ', tax=0.0),
+]
+
+
+class BookBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.batch = BookBatch.from_books(BOOKS)
+
+    def test_round_trip(self):
+        self.assertEqual(len(self.batch), 5)
+        self.assertEqual(self.batch.to_books(), BOOKS)
+        self.assertEqual(BookBatch.from_books([]).to_books(), [])
+
+    def test_totals_match_model(self):
+        self.assertEqual(self.batch.totals().tolist(), [book.calculate_total_amount() for book in BOOKS])
+        for book_type in ('Sách giáo khoa', 'Sách tham khảo'):
+            books = [book for book in BOOKS if book.get_book_type() == book_type]
+            self.assertEqual(self.batch.total_amount(book_type), sum(book.calculate_total_amount() for book in books))
+            self.assertEqual(self.batch.count(book_type), len(books))
+            self.assertEqual(self.batch.average_price(book_type), sum(book.price for book in books) / len(books))
+        self.assertEqual(self.batch.average_price('Truyện'), 0.0)
+
+    def test_filter(self):
+        references = self.batch.filter('Sách tham khảo')
+        self.assertEqual(references.to_books(), BOOKS[3:])
+        self.assertIs(self.batch.filter(None), self.batch)
+
+    def test_statistics_shape(self):
+        stats = self.batch.statistics()
+        self.assertEqual(set(stats), {'Sách giáo khoa', 'Sách tham khảo'})
+        self.assertEqual(stats['Sách tham khảo'], {'count': 2, 'total_amount': 526000.0, 'average_price': 100000.0})
+        self.assertEqual(BookService(None).summarize_books(self.batch), BookService(None).summarize_books(BOOKS))
+
+    def test_presenter_accepts_batch(self):
+        self.assertEqual(BookPresenter.present_books_by_type(self.batch, 'Tất cả'),
+                         BookPresenter.present_books_by_type(BOOKS, 'Tất cả'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""Multi-get (?ids=) và PATCH hàng loạt trên SQLite tạm: thứ tự theo yêu cầu, kết quả từng phần tử, một transaction"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config.migrations import migrate
+from app.main import create_app
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.services.book_service import BookService
+from app.tests.test_book_service import REFERENCE_BOOK, TEXTBOOK, clear_books
+from unittest import mock
+import unittest
+
+
+def setUpModule():
+    migrate()
+
+
+class BulkTestCase(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+        self.repository = SQLiteBookRepository()
+        self.service = BookService(self.repository)
+        report = self.service.import_books([dict(TEXTBOOK), dict(REFERENCE_BOOK),
+                                            dict(TEXTBOOK, book_code='SGK002', book_name='Văn 10')])
+        self.assertEqual(report['inserted'], 3)
+        self.ids = [self.repository.find_by_code(code).book_id for code in ('SGK001', 'STK001', 'SGK002')]
+
+
+class FindByIdsTest(BulkTestCase):
+    def test_request_order_without_duplicates_or_missing(self):
+        textbook, reference, other = self.ids
+        books = self.service.get_books_by_ids([other, textbook, 999999, reference, textbook])
+        self.assertEqual([book.book_id for book in books], [other, textbook, reference])
+        self.assertEqual(self.repository.find_by_ids([]), [])
+
+    def test_chunks(self):
+        with mock.patch.object(SQLiteBookRepository, 'IN_CHUNK_SIZE', 2):
+            self.assertEqual([book.book_id for book in self.repository.find_by_ids(self.ids[::-1])], self.ids[::-1])
+
+
+class UpdateManyTest(BulkTestCase):
+    def test_per_item_results(self):
+        textbook, reference, other = self.ids
+        results = self.service.update_many([
+            {'book_id': textbook, 'price': 30000},
+            {'book_id': reference, 'quantity': 7, 'tax': 1000},
+            {'book_id': 999999, 'price': 1},
+            {'book_id': textbook, 'price': 40000},
+            {'book_id': other, 'price': -1},
+            {'book_id': other, 'book_code': 'X'},
+            {'book_id': other},
+        ])
+        self.assertEqual([result['success'] for result in results], [True, True, False, False, False, False, False])
+        self.assertEqual(results[2]['message'], "Không tìm thấy sách")
+        self.assertEqual(results[3]['message'], "book_id bị lặp trong yêu cầu")
+        self.assertIn('book_code', results[5]['message'])
+        self.assertEqual(self.repository.find_by_id(textbook).price, 30000)
+        updated = self.repository.find_by_id(reference)
+        self.assertEqual((updated.quantity, updated.tax, updated.price), (7, 1000, 120000))
+        self.assertEqual(self.repository.find_by_id(other).price, 25000)
+
+    def test_single_transaction(self):
+        textbook, reference, _ = self.ids
+        update_many = self.repository.update_many
+
+        def fail_after_write(changes):
+            update_many(changes)
+            raise RuntimeError('boom')
+
+        with mock.patch.object(self.repository, 'update_many', fail_after_write), self.assertRaises(RuntimeError):
+            self.service.update_many([{'book_id': textbook, 'price': 1}, {'book_id': reference, 'price': 2}])
+        self.assertEqual([book.price for book in self.repository.find_by_ids([textbook, reference])], [25000, 120000])
+
+
+class BulkApiTest(BulkTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = create_app().test_client()
+
+    def test_multi_get(self):
+        textbook, reference, _ = self.ids
+        with self.client.get(f'/api/books?ids={reference},999999,{textbook}') as response:
+            payload = response.get_json()
+        self.assertEqual(payload['missing'], [999999])
+        self.assertEqual(len(payload['data']), 2)
+        for query in ('ids=a,b', 'ids='):
+            with self.client.get(f'/api/books?{query}') as response:
+                self.assertEqual(response.status_code, 400)
+
+    def test_batch_patch(self):
+        textbook, reference, _ = self.ids
+        with self.client.patch('/api/books', json=[{'book_id': textbook, 'quantity': 1},
+                                                   {'book_id': reference, 'condition_status': 'Cũ'}]) as response:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([result['success'] for result in response.get_json()['data']], [True, False])
+        self.assertEqual(self.repository.find_by_id(textbook).quantity, 1)
+        for body in ({'book_id': textbook}, []):
+            with self.client.patch('/api/books', json=body) as response:
+                self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
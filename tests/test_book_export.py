@@ -0,0 +1,82 @@
+"""Export dạng stream (BookRepository.iter_books + /api/books/export) trên SQLite tạm: NDJSON/CSV, lọc, ngắt giữa chừng"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config.db_config import get_pool
+from app.config.migrations import migrate
+from app.main import create_app
+from app.presenters.book_presenter import BookPresenter
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.services.book_service import BookService
+from app.tests.test_book_service import REFERENCE_BOOK, TEXTBOOK, clear_books
+import csv
+import io
+import json
+import unittest
+
+
+def setUpModule():
+    migrate()
+
+
+class ExportTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        clear_books()
+        rows = [dict(TEXTBOOK, book_code=f'SGK{i:03d}', publisher='NXB A' if i % 2 else 'NXB B') for i in range(30)]
+        rows += [dict(REFERENCE_BOOK, book_code=f'STK{i:03d}') for i in range(12)]
+        report = BookService(SQLiteBookRepository()).import_books(rows)
+        assert report['inserted'] == 42, report
+        cls.repository = SQLiteBookRepository()
+
+    def setUp(self):
+        self.client = create_app().test_client()
+
+    def test_iter_books_in_batches_with_filters(self):
+        self.assertEqual([book.book_id for book in self.repository.iter_books(batch_size=7)],
+                         [book.book_id for book in sorted(self.repository.find_all(), key=lambda b: b.book_id)])
+        self.assertEqual({book.book_code for book in self.repository.iter_books('Sách giáo khoa', 'NXB A', batch_size=4)},
+                         {book.book_code for book in self.repository.find_by_publisher('NXB A')})
+        self.assertEqual(len(list(self.repository.iter_books('Sách tham khảo', batch_size=5))), 12)
+        self.assertEqual(get_pool().stats()['in_use'], 0)
+
+    def test_ndjson(self):
+        with self.client.get('/api/books/export') as response:
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            self.assertIn('attachment', response.headers['Content-Disposition'])
+            books = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(len(books), 42)
+        self.assertEqual(books[0]['book_code'], 'SGK000')
+
+    def test_csv_with_filters(self):
+        with self.client.get('/api/books/export', query_string={
+                'format': 'csv', 'type': 'Sách giáo khoa', 'publisher': 'NXB B'}) as response:
+            self.assertEqual(response.mimetype, 'text/csv')
+            rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual(len(rows), 15)
+        self.assertEqual(list(rows[0]), BookPresenter.EXPORT_FIELDS)
+        self.assertEqual({row['publisher'] for row in rows}, {'NXB B'})
+
+    def test_invalid_format(self):
+        with self.client.get('/api/books/export?format=xml') as response:
+            self.assertEqual(response.status_code, 400)
+
+    def test_presenter_chunks(self):
+        books = list(self.repository.iter_books('Sách tham khảo'))
+        self.assertEqual([chunk.count('\n') for chunk in BookPresenter.stream_ndjson(books, chunk_size=5)], [5, 5, 2])
+        self.assertEqual(len(list(BookPresenter.stream_csv(books, chunk_size=5))), 3)
+
+    def test_abandoned_stream_returns_connection(self):
+        # Client ngắt kết nối: Flask đóng generator giữa chừng
+        books = self.repository.iter_books(batch_size=5)
+        next(books)
+        self.assertEqual(get_pool().stats()['in_use'], 1)
+        books.close()
+        self.assertEqual(get_pool().stats()['in_use'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
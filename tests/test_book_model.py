@@ -0,0 +1,47 @@
+"""Model sách: __slots__ và hydrate dòng tuple (book_row_loader) cho cùng kết quả với from_dict"""
+from app.models.book_model import ReferenceBook, TextBook, book_row_loader
+from datetime import date
+from decimal import Decimal
+import unittest
+
+COLUMNS = ('book_id', 'book_code', 'book_name', 'book_type', 'price', 'quantity', 'publisher',
+           'import_date', 'condition_status', 'tax', 'image', 'description')
+TEXTBOOK_ROW = (1, 'SGK001', 'Toán 10', 'Sách giáo khoa', Decimal('25000.00'), 10, 'NXB Giáo dục',
+                date(2024, 1, 15), 'Cũ', Decimal('0.00'), 'toan.jpg', 'Sách lớp 10')
+REFERENCE_ROW = (2, 'STK001', 'Lập trình Python', 'Sách tham khảo', Decimal('120000.00'), 3, 'NXB Trẻ',
+                 '2024-02-01', None, Decimal('6000.00'), '', '')
+
+
+class SlotsTest(unittest.TestCase):
+    def test_no_instance_dict(self):
+        book = TextBook(1, 'SGK001', 'Toán 10')
+        self.assertFalse(hasattr(book, '__dict__'))
+        with self.assertRaises(AttributeError):
+            book.unknown = 1
+
+
+class BookRowLoaderTest(unittest.TestCase):
+    def test_matches_from_dict(self):
+        load = book_row_loader(COLUMNS)
+        for row, cls in ((TEXTBOOK_ROW, TextBook), (REFERENCE_ROW, ReferenceBook)):
+            book = load(row)
+            self.assertIsInstance(book, cls)
+            self.assertEqual(book, cls.from_dict(dict(zip(COLUMNS, row))))
+            self.assertIsNone(book.loaded_fields)
+        self.assertEqual(load(REFERENCE_ROW).calculate_total_amount(), 366000)
+        self.assertEqual(load(TEXTBOOK_ROW).calculate_total_amount(), 125000)
+
+    def test_column_order_from_cursor(self):
+        columns = tuple(reversed(COLUMNS))
+        self.assertEqual(book_row_loader(columns)(tuple(reversed(TEXTBOOK_ROW))), book_row_loader(COLUMNS)(TEXTBOOK_ROW))
+
+    def test_unknown_type_skipped(self):
+        self.assertIsNone(book_row_loader(COLUMNS)(TEXTBOOK_ROW[:3] + ('Truyện',) + TEXTBOOK_ROW[4:]))
+
+    def test_requires_id_and_type(self):
+        with self.assertRaises(ValueError):
+            book_row_loader(('book_code', 'book_name'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""Phân trang keyset (BookRepository.find_page) trên SQLite tạm: đi tới/lui bằng cursor không trùng, không sót"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config.migrations import migrate
+from app.models.page_model import encode_cursor
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.services.book_service import BookService
+from app.tests.test_book_service import TEXTBOOK, clear_books
+import unittest
+
+
+def setUpModule():
+    migrate()
+
+
+class FindPageTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        clear_books()
+        # Tên lặp lại (tie-break theo book_id) và hai NXB xen kẽ
+        rows = [dict(TEXTBOOK, book_code=f'P{i:03d}', book_name=f'Sách {i % 7}',
+                     publisher='NXB A' if i % 2 else 'NXB B') for i in range(53)]
+        report = BookService(SQLiteBookRepository()).import_books(rows)
+        assert report['inserted'] == 53, report
+        cls.repository = SQLiteBookRepository()
+        cls.books = cls.repository.find_all()
+
+    def walk(self, **filters):
+        pages = [self.repository.find_page(limit=10, include_total=True, **filters)]
+        while pages[-1].next_cursor:
+            pages.append(self.repository.find_page(limit=10, cursor=pages[-1].next_cursor, **filters))
+        forward = [book.book_id for page in pages for book in page.items]
+        backward, page = [], pages[-1]
+        while page.prev_cursor:
+            page = self.repository.find_page(limit=10, cursor=page.prev_cursor, **filters)
+            backward = [book.book_id for book in page.items] + backward
+        return pages, forward, backward
+
+    def test_newest_round_trip(self):
+        pages, forward, backward = self.walk(sort='newest')
+        self.assertEqual(forward, sorted((book.book_id for book in self.books), reverse=True))
+        self.assertEqual(backward, forward[:len(backward)])
+        self.assertEqual(len(backward), 50)
+        self.assertEqual(pages[0].total, 53)
+        self.assertIsNone(pages[0].prev_cursor)
+
+    def test_name_sort_breaks_ties_by_id(self):
+        _, forward, backward = self.walk(sort='name')
+        expected = [book.book_id for book in sorted(self.books, key=lambda book: (book.book_name, book.book_id))]
+        self.assertEqual(forward, expected)
+        self.assertEqual(backward, forward[:len(backward)])
+
+    def test_filtered_round_trip(self):
+        pages, forward, backward = self.walk(sort='name', publisher='NXB A')
+        expected = [book.book_id for book in sorted(self.books, key=lambda book: (book.book_name, book.book_id))
+                    if book.publisher == 'NXB A']
+        self.assertEqual(forward, expected)
+        self.assertEqual(backward, forward[:len(backward)])
+        self.assertEqual(pages[0].total, 26)
+
+    def test_invalid_cursor_rejected(self):
+        with self.assertRaises(ValueError):
+            self.repository.find_page(sort='name', cursor=encode_cursor([1], 'next'))
+        with self.assertRaises(ValueError):
+            self.repository.find_page(sort='price')
+
+    def test_service_default_sort(self):
+        service = BookService(self.repository)
+        newest = service.get_books_page(limit=3)
+        self.assertEqual([book.book_id for book in newest.items],
+                         sorted((book.book_id for book in self.books), reverse=True)[:3])
+        by_publisher = service.get_books_page(limit=3, publisher='NXB B')
+        self.assertEqual([book.book_name for book in by_publisher.items], ['Sách 0', 'Sách 0', 'Sách 0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
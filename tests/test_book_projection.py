@@ -0,0 +1,81 @@
+"""Projection (summary/detail/danh sách cột) trên SQLite tạm: không đọc description, to_dict/presenter bỏ field chưa đọc"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config.migrations import migrate
+from app.main import create_app
+from app.presenters.book_presenter import BookPresenter
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.services.book_service import BookService
+from app.tests.test_book_service import REFERENCE_BOOK, TEXTBOOK, clear_books
+import unittest
+
+DESCRIPTION = 'Mô tả rất dài của sách'
+
+
+def setUpModule():
+    migrate()
+
+
+class ProjectionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        clear_books()
+        report = BookService(SQLiteBookRepository()).import_books([
+            dict(TEXTBOOK, description=DESCRIPTION, image='toan.jpg'),
+            dict(REFERENCE_BOOK, description=DESCRIPTION),
+        ])
+        assert report['inserted'] == 2, report
+        cls.repository = SQLiteBookRepository()
+
+    def test_summary_skips_text_columns(self):
+        books = self.repository.find_all('summary')
+        self.assertEqual([book.book_id for book in books], [book.book_id for book in self.repository.find_all()])
+        data = books[0].to_dict()
+        self.assertNotIn('description', data)
+        self.assertNotIn('image', data)
+        self.assertEqual(data['total_amount'], 366000)
+        self.assertFalse(books[0].is_loaded('description'))
+
+    def test_detail_loads_everything(self):
+        book = self.repository.find_by_code('SGK001')
+        self.assertIsNone(book.loaded_fields)
+        self.assertEqual(self.repository.find_by_type('Sách giáo khoa', 'detail'), [book])
+        self.assertEqual(book.to_dict()['description'], DESCRIPTION)
+
+    def test_explicit_columns(self):
+        book = self.repository.find_by_type('Sách giáo khoa', ['book_code'])[0]
+        self.assertEqual(book.to_dict(), {'book_id': book.book_id, 'book_code': 'SGK001', 'book_type': 'Sách giáo khoa'})
+        # Chưa đọc price/quantity: presenter không tính thành tiền
+        data = BookPresenter._transform_book_for_list(book)
+        self.assertNotIn('total_amount', data)
+        self.assertNotIn('formatted_price', data)
+
+    def test_invalid_projection(self):
+        for fields in ('nope', ['description; DROP TABLE books']):
+            with self.assertRaises(ValueError):
+                self.repository.find_all(fields)
+
+    def test_page_projection_keeps_order_and_cursor(self):
+        full = self.repository.find_page('name', 1)
+        summary = self.repository.find_page('name', 1, fields='summary')
+        self.assertEqual([book.book_id for book in summary.items], [book.book_id for book in full.items])
+        self.assertEqual(summary.next_cursor, full.next_cursor)
+
+    def test_api_listing_defaults_to_summary(self):
+        client = create_app().test_client()
+        with client.get('/api/books') as response:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('"description"', response.get_data(as_text=True))
+        with client.get('/api/books?fields=detail') as response:
+            self.assertIn('"description"', response.get_data(as_text=True))
+        with client.get('/api/books?fields=nope') as response:
+            self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
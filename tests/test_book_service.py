@@ -0,0 +1,250 @@
+"""BookService trên SQLite tạm (DB_BACKEND=sqlite): tạo sách, nhập hàng loạt, thống kê, search index"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ['DB_SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db')
+
+from app.config.db_config import get_pool
+from app.config.migrations import migrate
+from app.config.unit_of_work import unit_of_work
+from app.models.book_model import ReferenceBook, TextBook
+from app.repositories.cached_book_repository import CachedBookRepository
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.services import book_service
+from app.services.book_service import BookService
+from unittest import mock
+import threading
+import time
+import unittest
+
+TEXTBOOK = {
+    'book_code': 'SGK001', 'book_name': 'Toán 10', 'book_type': 'Sách giáo khoa', 'price': '25000',
+    'quantity': '10', 'publisher': 'NXB Giáo dục', 'import_date': '2024-01-15', 'condition_status': 'Mới',
+}
+REFERENCE_BOOK = {
+    'book_code': 'STK001', 'book_name': 'Lập trình Python', 'book_type': 'Sách tham khảo', 'price': '120000',
+    'quantity': '3', 'publisher': 'NXB Trẻ', 'import_date': '2024-02-01', 'tax': '6000',
+}
+
+
+def setUpModule():
+    # init_db.sql + các migration (vd: bảng catalog_meta), như khi triển khai
+    migrate()
+
+
+def clear_books():
+    with get_pool().acquire() as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM books")
+        conn.commit()
+
+
+class CreateBookTest(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+        self.repository = SQLiteBookRepository()
+        self.service = BookService(self.repository)
+
+    def test_create_textbook(self):
+        success, message, book_id = self.service.create_book(dict(TEXTBOOK))
+        self.assertTrue(success, message)
+        book = self.repository.find_by_id(book_id)
+        self.assertIsInstance(book, TextBook)
+        self.assertEqual(book.book_code, 'SGK001')
+        self.assertEqual(book.quantity, 10)
+
+    def test_create_reference_book(self):
+        success, message, book_id = self.service.create_book(dict(REFERENCE_BOOK))
+        self.assertTrue(success, message)
+        self.assertIsInstance(self.repository.find_by_id(book_id), ReferenceBook)
+
+    def test_create_through_cached_repository(self):
+        service = BookService(CachedBookRepository(self.repository))
+        success, message, book_id = service.create_book(dict(TEXTBOOK))
+        self.assertTrue(success, message)
+        self.assertEqual(service.get_book_by_id(book_id).book_name, 'Toán 10')
+
+    def test_duplicate_code_rejected(self):
+        self.assertTrue(self.service.create_book(dict(TEXTBOOK))[0])
+        success, message, book_id = self.service.create_book(dict(TEXTBOOK))
+        self.assertFalse(success)
+        self.assertEqual(message, "Mã sách đã tồn tại")
+        self.assertIsNone(book_id)
+
+    def test_invalid_type_rejected(self):
+        success, message, _ = self.service.create_book(dict(TEXTBOOK, book_type='Truyện'))
+        self.assertFalse(success)
+        self.assertIn("Loại sách không hợp lệ", message)
+
+
+class ImportBooksTest(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+        self.repository = SQLiteBookRepository()
+        self.service = BookService(self.repository)
+
+    def test_import_uses_same_construction_as_create(self):
+        report = self.service.import_books([dict(TEXTBOOK), dict(REFERENCE_BOOK), dict(TEXTBOOK)])
+        self.assertEqual(report['inserted'], 2)
+        self.assertEqual([error['row'] for error in report['errors']], [3])
+        self.assertIsInstance(self.repository.find_by_code('STK001'), ReferenceBook)
+
+    def test_concurrent_create_of_same_code_waits_for_import(self):
+        other = {}
+        writer = threading.Thread(target=lambda: other.update(
+            result=BookService(SQLiteBookRepository()).create_book(dict(TEXTBOOK))))
+        find_existing_codes = self.repository.find_existing_codes
+
+        def find_then_race(book_codes, for_update=False):
+            existing = find_existing_codes(book_codes, for_update)
+            # Request khác thêm đúng mã đó giữa lúc kiểm tra và lúc insert
+            writer.start()
+            time.sleep(0.2)
+            return existing
+
+        with mock.patch.object(self.repository, 'find_existing_codes', find_then_race):
+            report = self.service.import_books([dict(TEXTBOOK), dict(REFERENCE_BOOK)])
+        writer.join()
+        self.assertEqual(report['inserted'], 2)
+        self.assertEqual(report['errors'], [])
+        self.assertFalse(other['result'][0])
+
+    def test_existing_codes_reported_per_row_and_lock_released(self):
+        self.assertTrue(self.service.create_book(dict(TEXTBOOK))[0])
+        report = self.service.import_books([dict(TEXTBOOK)])
+        self.assertEqual((report['inserted'], [error['row'] for error in report['errors']]), (0, [1]))
+        # Không ghi gì: khóa lấy khi kiểm tra phải được trả khi unit of work kết thúc
+        self.assertTrue(BookService(SQLiteBookRepository()).create_book(dict(REFERENCE_BOOK))[0])
+
+
+class SyncBooksTest(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+        self.repository = SQLiteBookRepository()
+        self.service = BookService(self.repository)
+
+    def test_hashes_read_in_write_transaction(self):
+        self.service.import_books([dict(TEXTBOOK), dict(REFERENCE_BOOK)])
+        content_hashes = self.repository.content_hashes
+        calls = []
+
+        def locked_hashes(for_update=False):
+            calls.append(for_update)
+            return content_hashes(for_update)
+
+        changed = dict(TEXTBOOK, book_name='Toán 11')
+        with mock.patch.object(self.repository, 'content_hashes', locked_hashes):
+            report = self.service.sync_books([changed], delete_missing=True)
+        self.assertEqual(calls, [True])
+        self.assertEqual((report['updated'], report['unchanged'], report['deleted']), (1, 0, 1))
+        self.assertEqual(self.repository.find_by_code('SGK001').book_name, 'Toán 11')
+        self.assertIsNone(self.repository.find_by_code('STK001'))
+        self.assertEqual(self.service.sync_books([changed], delete_missing=True)['unchanged'], 1)
+
+
+class StatisticsTest(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+        self.repository = SQLiteBookRepository()
+        self.service = BookService(self.repository)
+        report = self.service.import_books([
+            dict(TEXTBOOK),
+            dict(TEXTBOOK, book_code='SGK002', condition_status='Cũ', price='30000', quantity='4'),
+            dict(REFERENCE_BOOK),
+            dict(REFERENCE_BOOK, book_code='STK002', price='80000', quantity='2', tax='0'),
+        ])
+        self.assertEqual(report['inserted'], 4)
+
+    def test_aggregate_matches_model_totals(self):
+        books = self.repository.find_all()
+        stats = self.service.get_statistics()
+        expected = {
+            book_type: sum(book.calculate_total_amount() for book in books if book.get_book_type() == book_type)
+            for book_type in ('Sách giáo khoa', 'Sách tham khảo')
+        }
+        self.assertEqual(stats['total_amount_textbooks'], expected['Sách giáo khoa'])
+        self.assertEqual(stats['total_amount_reference_books'], expected['Sách tham khảo'])
+        self.assertEqual(stats['total_amount_all'], sum(expected.values()))
+        self.assertEqual((stats['total_books'], stats['total_textbooks'], stats['total_reference_books']), (4, 2, 2))
+        self.assertEqual(stats['average_price_reference_books'], 100000)
+        # Cùng kết quả với cách tính vector hóa trên các sách đã đọc
+        self.assertEqual(self.service.summarize_books(books), stats)
+
+    def test_single_query(self):
+        with mock.patch.object(self.repository, 'find_all') as find_all:
+            self.service.get_statistics()
+        find_all.assert_not_called()
+
+    def test_empty_catalog(self):
+        clear_books()
+        stats = self.service.get_statistics()
+        self.assertEqual((stats['total_books'], stats['total_amount_all'], stats['average_price_reference_books']),
+                         (0, 0.0, 0.0))
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+        self.repository = SQLiteBookRepository()
+        self.service = BookService(self.repository)
+        self.assertTrue(self.service.create_book(dict(TEXTBOOK))[0])
+
+    @mock.patch.object(book_service, 'SEARCH_INDEX_REFRESH_SECONDS', 60)
+    def test_expired_index_rebuilt_once(self):
+        self.service.suggest_books('to')
+        self.service._indexes_built_at -= 120
+        builds = []
+        iter_books = self.repository.iter_books
+
+        def slow_iter_books(*args, **kwargs):
+            builds.append(1)
+            time.sleep(0.05)
+            return iter_books(*args, **kwargs)
+
+        self.repository.iter_books = slow_iter_books
+        barrier = threading.Barrier(8)
+
+        def suggest():
+            barrier.wait()
+            self.service.suggest_books('to')
+
+        threads = [threading.Thread(target=suggest) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(builds), 1)
+
+    def _search_codes(self, query):
+        return [book.book_code for book in self.service.search_books(query).items]
+
+    def test_rolled_back_create_not_indexed(self):
+        self.assertEqual(self._search_codes('python'), [])
+        with self.assertRaises(RuntimeError):
+            with unit_of_work():
+                self.assertTrue(self.service.create_book(dict(REFERENCE_BOOK))[0])
+                raise RuntimeError('rollback')
+        self.assertEqual(self._search_codes('python'), [])
+        self.assertEqual(self.service.suggest_books('lập')['books'], [])
+
+    def test_rolled_back_delete_keeps_book_indexed(self):
+        book_id = self.repository.find_by_code('SGK001').book_id
+        self.assertEqual(self._search_codes('toan'), ['SGK001'])
+        with self.assertRaises(RuntimeError):
+            with unit_of_work():
+                self.assertTrue(self.service.delete_book(book_id)[0])
+                raise RuntimeError('rollback')
+        self.assertEqual(self._search_codes('toan'), ['SGK001'])
+
+    def test_committed_create_indexed(self):
+        self.assertEqual(self._search_codes('python'), [])
+        with unit_of_work():
+            self.assertTrue(self.service.create_book(dict(REFERENCE_BOOK))[0])
+            # Chưa commit: index dùng chung chưa đổi
+            self.assertEqual(self._search_codes('python'), [])
+        self.assertEqual(self._search_codes('python'), ['STK001'])
+
+
+if __name__ == '__main__':
+    unittest.main()
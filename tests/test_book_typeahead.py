@@ -0,0 +1,88 @@
+"""Gợi ý theo tiền tố: BookTypeahead (bỏ dấu, ưu tiên, cập nhật từng sách) và /api/books/suggest trên SQLite tạm"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config.migrations import migrate
+from app.main import create_app
+from app.models.book_model import TextBook
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.services.book_service import BookService
+from app.services.book_typeahead import BookTypeahead
+from app.tests.test_book_service import TEXTBOOK, clear_books
+import unittest
+
+
+def setUpModule():
+    migrate()
+
+
+def _codes(result):
+    return [book['book_code'] for book in result['books']]
+
+
+class BookTypeaheadTest(unittest.TestCase):
+    def setUp(self):
+        self.typeahead = BookTypeahead()
+        self.typeahead.build([
+            TextBook(1, 'TK-01', 'Sách giáo khoa Toán 10', publisher='NXB Giáo dục'),
+            TextBook(2, 'TK-02', 'Sách bài tập Toán 10', publisher='NXB Trẻ'),
+            TextBook(3, 'GK-9', 'Tiếng Việt 1', publisher='NXB Giáo dục'),
+            TextBook(4, 'TOAN', 'Toán cao cấp', publisher='NXB Đại học'),
+        ])
+
+    def test_folds_diacritics_and_prefers_code_then_name_start(self):
+        self.assertEqual(_codes(self.typeahead.suggest('toa')), ['TOAN', 'TK-01', 'TK-02'])
+        self.assertEqual(_codes(self.typeahead.suggest('Toán c')), ['TOAN'])
+        self.assertEqual(_codes(self.typeahead.suggest('giao')), ['TK-01'])
+        self.assertEqual(self.typeahead.suggest('nxb gi')['publishers'], [{'publisher': 'NXB Giáo dục'}])
+        self.assertEqual(self.typeahead.suggest('  '), {'books': [], 'publishers': []})
+
+    def test_limit(self):
+        self.assertEqual(len(self.typeahead.suggest('nxb', 2)['publishers']), 2)
+        self.assertEqual(len(self.typeahead.suggest('sach', 1)['books']), 1)
+
+    def test_incremental_update(self):
+        self.typeahead.remove(3)
+        self.assertEqual(_codes(self.typeahead.suggest('tieng')), [])
+        # Còn sách 1 cùng NXB
+        self.assertEqual(len(self.typeahead.suggest('nxb giao')['publishers']), 1)
+        self.typeahead.add(TextBook(4, 'TOAN', 'Hình học', publisher='NXB Mới'))
+        self.assertEqual(_codes(self.typeahead.suggest('toan c')), [])
+        self.assertEqual(_codes(self.typeahead.suggest('hinh')), ['TOAN'])
+        self.assertEqual(self.typeahead.suggest('nxb d')['publishers'], [])
+        before = len(self.typeahead)
+        self.typeahead.add(TextBook(4, 'TOAN', 'Hình học', publisher='NXB Mới'))
+        self.assertEqual(len(self.typeahead), before)
+
+
+class SuggestApiTest(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+        self.repository = SQLiteBookRepository()
+        self.service = BookService(self.repository)
+        self.assertTrue(self.service.create_book(dict(TEXTBOOK))[0])
+
+    def test_service_writes_update_suggestions(self):
+        self.assertEqual(_codes(self.service.suggest_books('toan')), ['SGK001'])
+        book_id = self.repository.find_by_code('SGK001').book_id
+        self.assertTrue(self.service.update_book(book_id, dict(TEXTBOOK, book_name='Vật lý 10'))[0])
+        self.assertEqual(_codes(self.service.suggest_books('toan')), [])
+        self.assertEqual(_codes(self.service.suggest_books('vat ly')), ['SGK001'])
+        self.assertTrue(self.service.delete_book(book_id)[0])
+        self.assertEqual(self.service.suggest_books('vat'), {'books': [], 'publishers': []})
+
+    def test_endpoint(self):
+        client = create_app().test_client()
+        with client.get('/api/books/suggest', query_string={'q': 'toa', 'limit': 5}) as response:
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('SGK001', response.get_data(as_text=True))
+        with client.get('/api/books/suggest?q=toa&limit=x') as response:
+            self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""CachedBookRepository trên SQLite tạm: negative cache và invalidate khi books bị ghi"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config.db_config import get_pool
+from app.config.migrations import migrate
+from app.config.unit_of_work import unit_of_work
+from app.models.inventory_model import InventoryModel
+from app.repositories.cached_book_repository import CachedBookRepository
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.services.book_service import BookService
+from app.tests.test_book_service import REFERENCE_BOOK, TEXTBOOK, clear_books
+import threading
+import unittest
+
+
+def setUpModule():
+    migrate()
+
+
+class CachedBookRepositoryTest(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+        self.inner = SQLiteBookRepository()
+        self.repository = CachedBookRepository(self.inner, ttl=600)
+        self.service = BookService(self.repository)
+
+    @staticmethod
+    def _next_id() -> int:
+        """ID mà lần INSERT kế tiếp sẽ nhận (AUTOINCREMENT không dùng lại ID đã xóa)"""
+        with get_pool().acquire() as conn, conn.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'books'")
+            row = cursor.fetchone()
+        return (row['seq'] if row else 0) + 1
+
+    def test_create_clears_negative_id_entry(self):
+        next_id = self._next_id()
+        self.assertIsNone(self.repository.find_by_id(next_id))
+        success, message, book_id = self.service.create_book(dict(TEXTBOOK))
+        self.assertTrue(success, message)
+        self.assertEqual(book_id, next_id)
+        self.assertIsNotNone(self.repository.find_by_id(book_id))
+
+    def test_import_clears_negative_id_entries(self):
+        next_id = self._next_id()
+        self.assertIsNone(self.repository.find_by_id(next_id))
+        report = self.service.import_books([dict(TEXTBOOK)])
+        self.assertEqual(report['inserted'], 1)
+        self.assertIsNotNone(self.repository.find_by_id(next_id))
+
+    def test_reserve_invalidates_quantity(self):
+        _, _, book_id = self.service.create_book(dict(REFERENCE_BOOK))
+        self.assertEqual(self.repository.find_by_id(book_id).quantity, 3)
+        InventoryModel.reserve([(book_id, 2)])
+        self.assertEqual(self.repository.find_by_id(book_id).quantity, 1)
+        self.assertEqual(self.repository.find_by_code('STK001').quantity, 1)
+
+    def test_read_before_commit_does_not_keep_stale_entry(self):
+        _, _, book_id = self.service.create_book(dict(REFERENCE_BOOK))
+        with unit_of_work():
+            InventoryModel.reserve([(book_id, 1)])
+            # Request khác (connection khác) đọc dòng cũ trước khi commit và điền lại vào cache
+            reader = threading.Thread(target=self.repository.find_by_id, args=(book_id,))
+            reader.start()
+            reader.join()
+            self.assertEqual(self.repository.cache.peek(('id', book_id)).quantity, 3)
+        self.assertEqual(self.repository.find_by_id(book_id).quantity, 2)
+
+    def test_read_after_uncommitted_write_not_cached(self):
+        with self.assertRaises(RuntimeError):
+            with unit_of_work():
+                self.assertTrue(self.service.create_book(dict(TEXTBOOK))[0])
+                book = self.repository.find_by_code('SGK001')
+                self.assertIsNotNone(book)
+                self.repository.find_by_ids([book.book_id])
+                raise RuntimeError('rollback')
+        self.assertIsNone(self.repository.find_by_code('SGK001'))
+        self.assertEqual(self.repository.find_by_ids([book.book_id]), [])
+
+    def test_rolled_back_update_not_cached(self):
+        _, _, book_id = self.service.create_book(dict(REFERENCE_BOOK))
+        with self.assertRaises(RuntimeError):
+            with unit_of_work():
+                self.repository.update_many([(book_id, {'book_name': 'Tên chưa commit'})])
+                self.assertEqual(self.repository.find_by_id(book_id).book_name, 'Tên chưa commit')
+                raise RuntimeError('rollback')
+        self.assertEqual(self.repository.find_by_id(book_id).book_name, 'Lập trình Python')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""ConnectionPool với connection giả: giới hạn pool_size + max_overflow, timeout, trả về pool, recycle, ping"""
+from app.config.db_config import ConnectionPool, PoolTimeoutError
+import threading
+import time
+import unittest
+
+
+class FakeConnection:
+    def __init__(self):
+        self.in_transaction = False
+        self.rollbacks = 0
+        self.closed = False
+        self.alive = True
+        self.cursors = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise OSError('gone')
+
+    def close(self):
+        self.closed = True
+
+    def cursor(self, *args, **kwargs):
+        self.cursors += 1
+        return 'cursor'
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+
+        def connect():
+            self.created.append(FakeConnection())
+            return self.created[-1]
+
+        self.pool = ConnectionPool(connect, pool_size=2, max_overflow=1, timeout=0.1)
+
+    def test_overflow_then_timeout(self):
+        connections = [self.pool.acquire() for _ in range(3)]
+        with self.assertRaises(PoolTimeoutError):
+            self.pool.acquire()
+        stats = self.pool.stats()
+        self.assertEqual((stats['open'], stats['in_use'], stats['timeouts']), (3, 3, 1))
+        for conn in connections:
+            conn.close()
+        # Chỉ giữ lại pool_size connection, connection overflow bị đóng
+        stats = self.pool.stats()
+        self.assertEqual((stats['open'], stats['idle'], stats['in_use']), (2, 2, 0))
+        self.assertEqual([conn.closed for conn in self.created], [False, False, True])
+
+    def test_waiter_gets_released_connection(self):
+        connections = [self.pool.acquire() for _ in range(3)]
+        self.pool.timeout = 2
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(self.pool.acquire()))
+        waiter.start()
+        time.sleep(0.05)
+        connections[0].close()
+        waiter.join()
+        self.assertIs(got[0]._raw, self.created[0])
+        self.assertEqual(self.pool.stats()['waits'], 1)
+        self.assertEqual(len(self.created), 3)
+
+    def test_close_returns_once_and_rolls_back(self):
+        conn = self.pool.acquire()
+        raw = conn._raw
+        raw.in_transaction = True
+        # Cursor có thể được bọc bởi observer (metrics, query_inspector) nếu app đã được tạo trước đó
+        conn.cursor()
+        self.assertEqual(raw.cursors, 1)
+        conn.close()
+        conn.close()
+        self.assertEqual(raw.rollbacks, 1)
+        self.assertEqual(self.pool.stats()['in_use'], 0)
+        with self.assertRaises(AttributeError):
+            conn.cursor()
+        # LIFO: connection vừa trả được dùng lại
+        self.assertIs(self.pool.acquire()._raw, raw)
+
+    def test_recycle_and_failed_ping_replace_connection(self):
+        self.pool.recycle = 0
+        conn = self.pool.acquire()
+        conn.close()
+        self.assertIsNot(self.pool.acquire()._raw, self.created[0])
+        self.assertTrue(self.created[0].closed)
+        self.assertEqual(self.pool.stats()['recycled'], 1)
+
+        self.pool.recycle, self.pool.ping_after = 1800, 0
+        conn = self.pool.acquire()
+        conn._raw.alive = False
+        conn.close()
+        time.sleep(0.01)
+        self.assertTrue(self.pool.acquire()._raw.alive)
+        self.assertEqual(self.pool.stats()['ping_failures'], 1)
+
+    def test_invalidate_frees_slot(self):
+        connections = [self.pool.acquire() for _ in range(3)]
+        connections[0].invalidate()
+        self.assertTrue(self.created[0].closed)
+        self.pool.acquire()
+        self.assertEqual(self.pool.stats()['open'], 3)
+
+    def test_failed_connect_frees_slot(self):
+        pool = ConnectionPool(lambda: 1 / 0, pool_size=1, max_overflow=0, timeout=0.05)
+        for _ in range(2):
+            with self.assertRaises(ZeroDivisionError):
+                pool.acquire()
+        self.assertEqual(pool.stats()['open'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""InMemoryBookRepository trên SQLite tạm: phát hiện thay đổi qua catalog_version, ghi cục bộ không nạp lại"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config import migrations
+from app.config.migrations import migrate
+from app.config.unit_of_work import unit_of_work
+from app.models.inventory_model import InventoryModel
+from app.repositories.in_memory_book_repository import InMemoryBookRepository
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.services.book_service import BookService
+from app.tests.test_book_service import REFERENCE_BOOK, TEXTBOOK, clear_books
+from unittest import mock
+import shutil
+import unittest
+
+
+def setUpModule():
+    migrate()
+
+
+class InMemoryBookRepositoryTest(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+        self.inner = SQLiteBookRepository()
+        BookService(self.inner).import_books([dict(TEXTBOOK), dict(REFERENCE_BOOK)])
+        self.repository = InMemoryBookRepository(self.inner, refresh_interval=60, reload_interval=0)
+        self.book_id = self.repository.find_by_code('SGK001').book_id
+
+    def _check_version(self):
+        # Coi như đã tới hạn refresh_interval
+        self.repository._checked_at = 0.0
+
+    def test_rename_from_other_node_detected(self):
+        book = self.inner.find_by_id(self.book_id)
+        book.book_name = 'Toán 11'
+        self.inner.update(self.book_id, book)
+        self._check_version()
+        self.assertEqual(self.repository.find_by_id(self.book_id).book_name, 'Toán 11')
+
+    def test_partial_update_from_other_node_detected(self):
+        self.inner.update_many([(self.book_id, {'publisher': 'NXB Kim Đồng'})])
+        self._check_version()
+        self.assertEqual(self.repository.find_by_id(self.book_id).publisher, 'NXB Kim Đồng')
+
+    def test_reserve_detected(self):
+        InventoryModel.reserve([(self.book_id, 4)])
+        self._check_version()
+        self.assertEqual(self.repository.find_by_id(self.book_id).quantity, 6)
+
+    def test_local_write_does_not_reload(self):
+        book = self.repository.find_by_id(self.book_id)
+        book.book_name = 'Toán 11'
+        self.repository.update(self.book_id, book)
+        self.repository.delete_by_codes(['STK001'])
+        self._check_version()
+        self.assertEqual(self.repository.find_by_id(self.book_id).book_name, 'Toán 11')
+        self.assertIsNone(self.repository.find_by_code('STK001'))
+        self.assertEqual(self.repository.stats()['loads'], 1)
+
+    def test_local_write_after_remote_change_reloads(self):
+        self.inner.update_many([(self.book_id, {'publisher': 'NXB Kim Đồng'})])
+        self.repository.delete_by_codes(['STK001'])
+        self._check_version()
+        self.assertEqual(self.repository.find_by_id(self.book_id).publisher, 'NXB Kim Đồng')
+        self.assertEqual(self.repository.stats()['loads'], 2)
+
+    def test_local_write_reads_version_once(self):
+        book = self.repository.find_by_id(self.book_id)
+        book.book_name = 'Toán 11'
+        with mock.patch.object(self.inner, 'catalog_version', wraps=self.inner.catalog_version) as version:
+            self.repository.update(self.book_id, book)
+        self.assertEqual(version.call_count, 1)
+
+    def test_rolled_back_local_write_reloads(self):
+        book = self.repository.find_by_id(self.book_id)
+        book.book_name = 'Toán 11'
+        with self.assertRaises(RuntimeError), unit_of_work():
+            self.repository.update(self.book_id, book)
+            raise RuntimeError('rollback')
+        self._check_version()
+        self.assertEqual(self.repository.find_by_id(self.book_id).book_name, TEXTBOOK['book_name'])
+        self.assertEqual(self.repository.stats()['loads'], 2)
+
+
+class CatalogVersionTest(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+        self.repository = SQLiteBookRepository()
+        BookService(self.repository).import_books([dict(TEXTBOOK), dict(REFERENCE_BOOK)])
+        self.book_id = self.repository.find_by_code('SGK001').book_id
+
+    def assertBumpsOnce(self, write):
+        before = self.repository.catalog_version()
+        write()
+        self.assertEqual(self.repository.catalog_version(), before + 1)
+
+    def test_each_write_bumps_once(self):
+        book = self.repository.find_by_id(self.book_id)
+        self.assertBumpsOnce(lambda: self.repository.update(self.book_id, book))
+        # Hai nhóm cột khác nhau vẫn là một transaction, một lần tăng
+        other_id = self.repository.find_by_code('STK001').book_id
+        self.assertBumpsOnce(lambda: self.repository.update_many([(self.book_id, {'price': 1}),
+                                                                  (other_id, {'publisher': 'NXB Kim Đồng'})]))
+        self.assertBumpsOnce(lambda: InventoryModel.reserve([(self.book_id, 1)]))
+        self.assertBumpsOnce(lambda: self.repository.delete_by_codes(['STK001']))
+        self.assertBumpsOnce(lambda: self.repository.delete(self.book_id))
+
+    def test_rollback_restores_version(self):
+        before = self.repository.catalog_version()
+        with self.assertRaises(RuntimeError), unit_of_work():
+            self.repository.delete(self.book_id)
+            raise RuntimeError('rollback')
+        self.assertEqual(self.repository.catalog_version(), before)
+
+
+class EnsureCurrentTest(unittest.TestCase):
+    def test_pending_migration_fails_fast(self):
+        directory = tempfile.mkdtemp(prefix='libraryx_migrations_')
+        self.addCleanup(shutil.rmtree, directory)
+        for migration in migrations.discover():
+            shutil.copy(migration.path, directory)
+        migrations.ensure_current(directory)
+        with open(os.path.join(directory, '9999_future.sql'), 'w', encoding='utf-8') as f:
+            f.write('CREATE INDEX idx_future ON books (price)')
+        with self.assertRaises(RuntimeError) as raised:
+            migrations.ensure_current(directory)
+        self.assertIn('9999_future', str(raised.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
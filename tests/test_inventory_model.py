@@ -0,0 +1,70 @@
+"""InventoryModel.reserve trên SQLite tạm: trừ tồn kho nguyên tử, thiếu hàng chỉ hoàn tác câu UPDATE của nó"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config.migrations import migrate
+from app.config.unit_of_work import unit_of_work
+from app.models.inventory_model import InsufficientStockError, InventoryModel
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.services.book_service import BookService
+from app.tests.test_book_service import REFERENCE_BOOK, TEXTBOOK, clear_books
+import unittest
+
+
+def setUpModule():
+    migrate()
+
+
+class ReserveTest(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+        self.repository = SQLiteBookRepository()
+        BookService(self.repository).import_books([dict(TEXTBOOK), dict(REFERENCE_BOOK)])
+        self.textbook_id = self.repository.find_by_code('SGK001').book_id          # quantity 10
+        self.reference_id = self.repository.find_by_code('STK001').book_id         # quantity 3
+
+    def _quantity(self, book_id):
+        return self.repository.find_by_id(book_id).quantity
+
+    def test_reserve_decrements_and_merges_duplicate_lines(self):
+        InventoryModel.reserve([(self.textbook_id, 2), (self.reference_id, 1), (self.textbook_id, 3)])
+        self.assertEqual(self._quantity(self.textbook_id), 5)
+        self.assertEqual(self._quantity(self.reference_id), 2)
+
+    def test_shortage_reports_books_and_keeps_stock(self):
+        with self.assertRaises(InsufficientStockError) as raised:
+            InventoryModel.reserve([(self.textbook_id, 2), (self.reference_id, 5)])
+        self.assertEqual(raised.exception.shortages, {self.reference_id: (5, 3)})
+        # Sách đủ hàng trong cùng lô cũng không bị trừ
+        self.assertEqual(self._quantity(self.textbook_id), 10)
+        self.assertEqual(self._quantity(self.reference_id), 3)
+
+    def test_shortage_keeps_earlier_writes_of_unit_of_work(self):
+        with unit_of_work():
+            self.repository.update_many([(self.textbook_id, {'book_name': 'Toán 11'})])
+            InventoryModel.reserve([(self.textbook_id, 1)])
+            with self.assertRaises(InsufficientStockError):
+                InventoryModel.reserve([(self.reference_id, 4)])
+        self.assertEqual(self.repository.find_by_id(self.textbook_id).book_name, 'Toán 11')
+        self.assertEqual(self._quantity(self.textbook_id), 9)
+        self.assertEqual(self._quantity(self.reference_id), 3)
+
+    def test_uncaught_shortage_rolls_back_unit_of_work(self):
+        with self.assertRaises(InsufficientStockError):
+            with unit_of_work():
+                InventoryModel.reserve([(self.textbook_id, 1)])
+                InventoryModel.reserve([(self.reference_id, 4)])
+        self.assertEqual(self._quantity(self.textbook_id), 10)
+
+    def test_unknown_book_is_a_shortage(self):
+        with self.assertRaises(InsufficientStockError) as raised:
+            InventoryModel.reserve([(999999, 1)])
+        self.assertEqual(raised.exception.shortages, {999999: (1, 0)})
+
+
+if __name__ == '__main__':
+    unittest.main()
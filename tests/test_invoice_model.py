@@ -0,0 +1,78 @@
+"""InvoiceModel.create_with_details trên SQLite tạm: đơn giá tính ở server, trừ tồn kho cùng transaction"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config.db_config import get_pool
+from app.config.migrations import migrate
+from app.models.inventory_model import InsufficientStockError
+from app.models.invoice_model import InvoiceModel
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.services.book_service import BookService
+from app.tests.test_book_service import REFERENCE_BOOK, TEXTBOOK, clear_books
+from decimal import Decimal
+import unittest
+
+
+def setUpModule():
+    migrate()
+
+
+def _rows(query, params=()):
+    with get_pool().acquire() as conn, conn.cursor(dictionary=True) as cursor:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+
+class CreateWithDetailsTest(unittest.TestCase):
+    def setUp(self):
+        with get_pool().acquire() as conn, conn.cursor() as cursor:
+            cursor.execute("DELETE FROM invoices")
+            conn.commit()
+        clear_books()
+        self.repository = SQLiteBookRepository()
+        BookService(self.repository).import_books([dict(TEXTBOOK), dict(REFERENCE_BOOK)])
+        self.textbook = self.repository.find_by_code('SGK001').book_id
+        self.reference = self.repository.find_by_code('STK001').book_id
+
+    def test_prices_from_db_and_stock_reserved(self):
+        invoice_id, total = InvoiceModel.create_with_details(
+            {'invoice_code': 'HD001', 'total_amount': 1},
+            [{'book_id': self.textbook, 'quantity': 2, 'unit_price': 1},
+             {'book_id': self.reference, 'quantity': '1'},
+             {'book_id': self.textbook, 'quantity': 1}])
+        self.assertEqual(total, Decimal('195000'))
+        invoice = _rows("SELECT total_amount FROM invoices WHERE invoice_id = %s", (invoice_id,))[0]
+        self.assertEqual(Decimal(str(invoice['total_amount'])), Decimal('195000'))
+        details = _rows("SELECT book_id, quantity, unit_price FROM invoice_details WHERE invoice_id = %s "
+                        "ORDER BY detail_id", (invoice_id,))
+        self.assertEqual([(row['book_id'], row['quantity'], Decimal(str(row['unit_price']))) for row in details],
+                         [(self.textbook, 2, Decimal('25000')), (self.reference, 1, Decimal('120000')),
+                          (self.textbook, 1, Decimal('25000'))])
+        self.assertEqual(self.repository.find_by_id(self.textbook).quantity, 7)
+        self.assertEqual(self.repository.find_by_id(self.reference).quantity, 2)
+
+    def test_shortage_writes_nothing(self):
+        with self.assertRaises(InsufficientStockError) as raised:
+            InvoiceModel.create_with_details({'invoice_code': 'HD002'},
+                                             [{'book_id': self.textbook, 'quantity': 1},
+                                              {'book_id': self.reference, 'quantity': 4}])
+        self.assertEqual(raised.exception.shortages, {self.reference: (4, 3)})
+        self.assertEqual(_rows("SELECT * FROM invoices"), [])
+        self.assertEqual(self.repository.find_by_id(self.textbook).quantity, 10)
+
+    def test_invalid_lines_rejected(self):
+        for details in ([{'book_id': self.textbook, 'quantity': 0}],
+                        [{'book_id': 'x', 'quantity': 1}],
+                        [{'book_id': 999999, 'quantity': 1}]):
+            with self.assertRaises(ValueError):
+                InvoiceModel.create_with_details({'invoice_code': 'HD003'}, details)
+        self.assertEqual(_rows("SELECT * FROM invoices"), [])
+        self.assertEqual(self.repository.find_by_id(self.textbook).quantity, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+"""Load test (benchmarks/load_test.py) chạy ngắn trên SQLite tạm của test, qua app thật (main.create_app)"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.benchmarks import load_test
+import unittest
+
+
+class LoadTestTest(unittest.TestCase):
+    def test_import_does_not_switch_database(self):
+        self.assertNotEqual(os.environ['DB_SQLITE_PATH'], os.getenv('LOAD_SQLITE_PATH', 'libraryx_load.db'))
+        self.assertFalse(os.environ['DB_SQLITE_PATH'].endswith('libraryx_load.db'))
+
+    def test_parse_mix(self):
+        self.assertEqual(load_test.parse_mix('browse=3, detail'), {'browse': 3.0, 'detail': 1.0})
+        with self.assertRaises(ValueError):
+            load_test.parse_mix('unknown=1')
+
+    def test_short_run_without_errors(self):
+        load_test.seed(books=50, users=3, seed_value=1)
+        ctx = load_test.load_context()
+        app = load_test.create_app()
+        stats = load_test.run_level(lambda: load_test.InProcessClient(app),
+                                    load_test.parse_mix(load_test.DEFAULT_MIX), ctx, 2, 0.3, 1)
+        self.assertGreater(stats['total']['requests'], 0)
+        failing = {name: item['error_rate'] for name, item in stats.items() if item['error_rate']}
+        self.assertEqual(failing, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
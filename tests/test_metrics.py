@@ -0,0 +1,92 @@
+"""Metrics qua app thật (main.create_app) trên SQLite tạm: histogram theo endpoint, đếm SQL, /metrics"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config import db_config
+from app.config.metrics import Histogram, MetricsRegistry
+from app.config.migrations import migrate
+from app.main import create_app
+import unittest
+
+
+def setUpModule():
+    migrate()
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative_in_render(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.observe_request('book_api', 'book_api.get_book', 200, 0.05, 2, 0.01)
+        registry.observe_request('book_api', 'book_api.get_book', 404, 0.5, 1, 0.02)
+        text = registry.render()
+        labels = 'blueprint="book_api",endpoint="book_api.get_book"'
+        self.assertIn(f'libraryx_http_request_duration_seconds_bucket{{{labels},le="0.1"}} 1', text)
+        self.assertIn(f'libraryx_http_request_duration_seconds_bucket{{{labels},le="1.0"}} 2', text)
+        self.assertIn(f'libraryx_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', text)
+        self.assertIn(f'libraryx_http_request_duration_seconds_count{{{labels}}} 2', text)
+        self.assertIn(f'libraryx_http_responses_total{{{labels},status="404"}} 1', text)
+        self.assertIn(f'libraryx_sql_statements_total{{{labels}}} 3', text)
+
+    def test_stats_sources_exported_as_gauges(self):
+        registry = MetricsRegistry()
+        registry.register_stats('book_cache', lambda: {'hits': 3, 'hit_ratio': 0.75, 'ttl_label': 'x'})
+        text = registry.render()
+        self.assertIn('libraryx_book_cache_hits 3', text)
+        self.assertIn('libraryx_book_cache_hit_ratio 0.75', text)
+        self.assertNotIn('ttl_label', text)
+
+    def test_histogram_observe(self):
+        histogram = Histogram((1.0,))
+        histogram.observe(0.5)
+        histogram.observe(2.0)
+        self.assertEqual(histogram.counts, [1, 1])
+        self.assertEqual(histogram.count, 2)
+
+
+class AppMetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.client = create_app().test_client()
+
+    def test_request_and_sql_recorded_per_endpoint(self):
+        response = self.client.get('/api/books?limit=5')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        with self.client.get('/metrics') as response:
+            text = response.get_data(as_text=True)
+        labels = 'blueprint="book_api",endpoint="book_api.get_books_api"'
+        self.assertIn(f'libraryx_http_request_duration_seconds_count{{{labels}}}', text)
+        self.assertIn(f'libraryx_http_responses_total{{{labels},status="200"}}', text)
+        statements = [line for line in text.splitlines()
+                      if line.startswith(f'libraryx_sql_statements_total{{{labels}}}')]
+        self.assertEqual(len(statements), 1)
+        self.assertGreater(float(statements[0].rsplit(' ', 1)[1]), 0)
+        self.assertIn('libraryx_db_pool_', text)
+
+
+class SqlObserverTest(unittest.TestCase):
+    def test_add_is_idempotent_and_remove_swaps_tuple(self):
+        seen = []
+
+        def observer(query, elapsed):
+            seen.append(query)
+
+        before = db_config._sql_observers
+        db_config.add_sql_observer(observer)
+        db_config.add_sql_observer(observer)
+        try:
+            self.assertEqual(db_config._sql_observers.count(observer), 1)
+            with db_config.get_db_connection() as conn, conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            self.assertIn("SELECT 1", seen)
+        finally:
+            db_config.remove_sql_observer(observer)
+        self.assertEqual(db_config._sql_observers, before)
+
+
+if __name__ == '__main__':
+    unittest.main()
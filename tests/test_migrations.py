@@ -0,0 +1,82 @@
+"""Migration runner và kiểm tra plan truy vấn nóng trên SQLite tạm"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config import migrations
+from app.config.query_plans import HotQuery, check_query_plans
+import shutil
+import unittest
+
+
+def setUpModule():
+    migrations.migrate()
+
+
+class DiscoverTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='libraryx_migrations_')
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def _write(self, filename, sql):
+        with open(os.path.join(self.directory, filename), 'w', encoding='utf-8') as f:
+            f.write(sql)
+
+    def test_sorted_by_numeric_version(self):
+        self._write('10_later.sql', 'SELECT 1')
+        self._write('0002_second.sql', '-- comment; bỏ qua\nCREATE INDEX a ON books (price);\n\nSELECT 1;')
+        self._write('README.md', '')
+        found = migrations.discover(self.directory)
+        self.assertEqual([(migration.version, migration.name) for migration in found], [('0002', 'second'), ('10', 'later')])
+        self.assertEqual(found[0].statements(), ['CREATE INDEX a ON books (price)', 'SELECT 1'])
+
+    def test_duplicate_version(self):
+        self._write('0001_a.sql', '')
+        self._write('0001_b.sql', '')
+        with self.assertRaises(ValueError):
+            migrations.discover(self.directory)
+
+
+class MigrateTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='libraryx_migrations_')
+        self.addCleanup(shutil.rmtree, self.directory)
+        for migration in migrations.discover():
+            shutil.copy(migration.path, self.directory)
+
+    def test_idempotent(self):
+        self.assertEqual(migrations.migrate(directory=self.directory), [])
+        self.assertTrue(all(item['applied_at'] is not None for item in migrations.status(self.directory)))
+
+    def test_applies_new_migrations_up_to_target(self):
+        for version in ('9001', '9002'):
+            with open(os.path.join(self.directory, f'{version}_test.sql'), 'w', encoding='utf-8') as f:
+                f.write(f'CREATE INDEX idx_test_{version} ON books (price, quantity)')
+        self.assertEqual([migration.version for migration in migrations.pending(self.directory)], ['9001', '9002'])
+        self.assertEqual([migration.version for migration in migrations.migrate('9001', self.directory)], ['9001'])
+        self.assertEqual([migration.version for migration in migrations.migrate(directory=self.directory)], ['9002'])
+        self.assertEqual(migrations.pending(self.directory), [])
+
+    def test_failed_migration_not_recorded(self):
+        with open(os.path.join(self.directory, '9100_broken.sql'), 'w', encoding='utf-8') as f:
+            f.write('CREATE INDEX idx_broken ON no_such_table (x)')
+        with self.assertRaises(Exception):
+            migrations.migrate(directory=self.directory)
+        self.assertEqual([migration.version for migration in migrations.pending(self.directory)], ['9100'])
+
+
+class QueryPlanTest(unittest.TestCase):
+    def test_hot_queries_use_indexes(self):
+        self.assertEqual(check_query_plans(), {})
+        self.assertEqual(migrations.main(['check']), 0)
+
+    def test_full_scan_reported(self):
+        query = HotQuery('books by description', "SELECT * FROM books WHERE description = %s", ('x',))
+        self.assertIn('books by description', check_query_plans([query]))
+
+
+if __name__ == '__main__':
+    unittest.main()
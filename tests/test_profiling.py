@@ -0,0 +1,105 @@
+"""ProfileStore (cộng dồn trong bộ nhớ, ghi file khi flush) và profile theo yêu cầu qua app thật (main.create_app)"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config import profiling
+from app.config.migrations import migrate
+from app.main import create_app
+from collections import Counter
+from unittest import mock
+import cProfile
+import pstats
+import unittest
+
+
+def setUpModule():
+    migrate()
+
+
+def _profile() -> cProfile.Profile:
+    profile = cProfile.Profile()
+    profile.enable()
+    sorted(range(100))
+    profile.disable()
+    return profile
+
+
+def _calls(path: str) -> int:
+    return sum(calls for calls, *_ in pstats.Stats(path).stats.values())
+
+
+class ProfileStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='libraryx_profiles_')
+        self.store = profiling.ProfileStore(self.directory, flush_interval=0)
+
+    def test_add_does_not_touch_disk_until_flush(self):
+        self.store.add('book_api.get_book', _profile(), Counter({'a;b': 2}))
+        self.assertEqual(os.listdir(self.directory), [])
+        self.store.flush()
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ['book_api.get_book.collapsed', 'book_api.get_book.pstats'])
+
+    def test_results_accumulate_across_flushes(self):
+        self.store.add('book_api.get_book', _profile(), Counter({'a;b': 2}))
+        self.store.flush()
+        path = os.path.join(self.directory, 'book_api.get_book.pstats')
+        once = _calls(path)
+        self.store.add('book_api.get_book', _profile(), Counter({'a;b': 1, 'a;c': 1}))
+        self.store.add('book_api.get_book', _profile(), None)
+        self.store.flush()
+        self.assertEqual(_calls(path), 3 * once)
+        with open(os.path.join(self.directory, 'book_api.get_book.collapsed'), encoding='utf-8') as f:
+            self.assertEqual(f.read().splitlines(), ['a;b 3', 'a;c 1'])
+
+    def test_new_store_continues_existing_files(self):
+        self.store.add('book_api.get_book', _profile(), Counter({'a;b': 2}))
+        self.store.flush()
+        path = os.path.join(self.directory, 'book_api.get_book.pstats')
+        once = _calls(path)
+        restarted = profiling.ProfileStore(self.directory, flush_interval=0)
+        restarted.add('book_api.get_book', _profile(), Counter({'a;b': 1}))
+        restarted.flush()
+        self.assertEqual(_calls(path), 2 * once)
+        with open(os.path.join(self.directory, 'book_api.get_book.collapsed'), encoding='utf-8') as f:
+            self.assertEqual(f.read().splitlines(), ['a;b 3'])
+
+
+class AppProfilingTest(unittest.TestCase):
+    def setUp(self):
+        self.store = profiling.ProfileStore(tempfile.mkdtemp(prefix='libraryx_profiles_'), flush_interval=0)
+        patches = [mock.patch.object(profiling, 'store', self.store),
+                   mock.patch.object(profiling, 'ADMIN_TOKEN', 'secret'),
+                   mock.patch.object(profiling, 'MODE', 'cprofile')]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.client = create_app().test_client()
+
+    def test_admin_profiles_request_and_downloads_result(self):
+        with self.client.get('/api/books?limit=1', headers={'X-Profile': 'secret'}) as response:
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(os.listdir(self.store.directory), [])
+        with self.client.get('/admin/profiles', headers={'X-Profile': 'secret'}) as response:
+            names = [item['name'] for item in response.get_json()['data']]
+        self.assertEqual(names, ['book_api.get_books_api.pstats'])
+        with self.client.get('/admin/profiles/book_api.get_books_api.pstats',
+                             headers={'X-Profile': 'secret'}) as response:
+            self.assertEqual(response.status_code, 200)
+            self.assertGreater(len(response.data), 0)
+
+    def test_not_admin_is_not_profiled(self):
+        with self.client.get('/api/books?limit=1', headers={'X-Profile': '1'}) as response:
+            self.assertEqual(response.status_code, 200)
+        with self.client.get('/admin/profiles') as response:
+            self.assertEqual(response.status_code, 403)
+        self.store.flush()
+        self.assertEqual(os.listdir(self.store.directory), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""Slow query log, phát hiện N+1 và assert_max_queries trên SQLite tạm"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config import query_inspector
+from app.config.db_config import get_db_connection
+from app.config.migrations import migrate
+from app.main import create_app
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.services.book_service import BookService
+from app.tests.test_book_service import TEXTBOOK, clear_books
+from unittest import mock
+import unittest
+
+
+def setUpModule():
+    migrate()
+
+
+def _run(query, params=()):
+    with get_db_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(query, params)
+        cursor.fetchall()
+
+
+class FingerprintTest(unittest.TestCase):
+    def test_literals_and_lists_collapse(self):
+        self.assertEqual(
+            query_inspector.fingerprint("SELECT * FROM books WHERE book_id IN (1, 2, 3) AND book_code = 'X'"),
+            "SELECT * FROM books WHERE book_id IN (...) AND book_code = ?")
+        self.assertEqual(
+            query_inspector.fingerprint("SELECT *  FROM books\n WHERE book_id = %s"),
+            query_inspector.fingerprint("SELECT * FROM books WHERE book_id = 42"))
+
+    def test_multi_row_values_collapse(self):
+        self.assertEqual(
+            query_inspector.fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)"),
+            "INSERT INTO t (a, b) VALUES (...)")
+
+
+class InspectorTest(unittest.TestCase):
+    def test_n_plus_one_warned_once_per_scope(self):
+        with mock.patch.object(query_inspector, 'N_PLUS_ONE_THRESHOLD', 2), \
+                self.assertLogs(query_inspector.logger, 'WARNING') as logs:
+            with query_inspector.query_scope('book_api.get_book') as scope:
+                for book_id in range(5):
+                    _run("SELECT * FROM books WHERE book_id = %s", (book_id,))
+        warnings = [line for line in logs.output if 'N+1' in line and 'book_api.get_book' in line]
+        self.assertEqual(len(warnings), 1)
+        self.assertIn('book_api.get_book', warnings[0])
+        self.assertEqual(scope.repeated(2), {"SELECT * FROM books WHERE book_id = ?": 5})
+
+    def test_slow_query_logged_with_call_site(self):
+        query_inspector.install()
+        with mock.patch.object(query_inspector, 'SLOW_QUERY_SECONDS', 0), \
+                self.assertLogs(query_inspector.logger, 'WARNING') as logs:
+            _run("SELECT COUNT(*) FROM books")
+        self.assertTrue(any('Slow query' in line and 'SELECT COUNT(*) FROM books' in line for line in logs.output))
+
+    def test_assert_max_queries_lists_statements(self):
+        with self.assertRaises(AssertionError) as raised:
+            with query_inspector.assert_max_queries(1):
+                _run("SELECT 1")
+                _run("SELECT 2")
+        self.assertIn("2 câu SQL, tối đa 1", str(raised.exception))
+        with query_inspector.assert_max_queries(2) as scope:
+            _run("SELECT 1")
+        self.assertEqual(scope.count, 1)
+
+
+class AppQueryCountTest(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+        self.assertTrue(BookService(SQLiteBookRepository()).create_book(dict(TEXTBOOK))[0])
+        self.book_id = SQLiteBookRepository().find_by_code('SGK001').book_id
+        self.client = create_app().test_client()
+
+    def test_get_book_is_one_query(self):
+        with query_inspector.assert_max_queries(1), self.client.get(f'/api/books/{self.book_id}') as response:
+            self.assertEqual(response.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
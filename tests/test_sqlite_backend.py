@@ -0,0 +1,107 @@
+"""Backend SQLite: schema chuyển từ init_db.sql, cursor giống mysql-connector, các model chạy qua DB_BACKEND=sqlite"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config.db_config import get_pool
+from app.config.migrations import migrate
+from app.config.sqlite_backend import SQLiteConnection, connect_sqlite, sqlite_schema
+from app.models.account_model import AccountModel
+from app.models.borrow_model import BorrowModel
+from app.models.user_model import UserModel
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.services.book_service import BookService
+from app.tests.test_book_service import TEXTBOOK, clear_books
+from datetime import date
+from decimal import Decimal
+import sqlite3
+import unittest
+
+
+def setUpModule():
+    migrate()
+
+
+class SchemaTest(unittest.TestCase):
+    def test_translated_from_init_db(self):
+        ddl = sqlite_schema()
+        self.assertNotIn('AUTO_INCREMENT', ddl)
+        self.assertNotIn('ENUM', ddl)
+        self.assertNotIn('CREATE DATABASE', ddl)
+        self.assertIn('book_id INTEGER PRIMARY KEY AUTOINCREMENT', ddl)
+        self.assertIn("book_type TEXT COLLATE NOCASE CHECK (book_type IN ('Sách giáo khoa','Sách tham khảo'))", ddl)
+
+
+class ConnectionTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = connect_sqlite(os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'own.db'))
+        self.addCleanup(self.conn.close)
+
+    def _insert_book(self, cursor, book_type='Sách giáo khoa', condition_status='Mới'):
+        cursor.execute("""INSERT INTO books (book_code, book_name, book_type, price, quantity, import_date, condition_status)
+                          VALUES (%s, %s, %s, %s, %s, %s, %s)""",
+                       ('A1', 'Toán', book_type, Decimal('12.50'), 3, date(2024, 1, 15), condition_status))
+
+    def test_pragmas(self):
+        with self.conn.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA foreign_keys')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_mysql_style_cursor(self):
+        with self.conn.cursor(dictionary=True) as cursor:
+            self._insert_book(cursor)
+            self.assertTrue(self.conn.in_transaction)
+            self.assertEqual(cursor.lastrowid, 1)
+            self.conn.commit()
+            cursor.execute("SELECT book_code, price, import_date FROM books WHERE book_code = %s", ('A1',))
+            row = cursor.fetchone()
+        self.assertEqual(row, {'book_code': 'A1', 'price': Decimal('12.50'), 'import_date': date(2024, 1, 15)})
+        with self.conn.cursor() as cursor:
+            cursor.execute("SELECT book_code FROM books")
+            self.assertEqual(cursor.fetchmany(10), [('A1',)])
+
+    def test_enum_check_case_insensitive(self):
+        with self.conn.cursor() as cursor:
+            # ENUM của MySQL không phân biệt hoa thường
+            self._insert_book(cursor, condition_status='cũ')
+            with self.assertRaises(sqlite3.IntegrityError):
+                cursor.execute("INSERT INTO books (book_code, book_name, book_type, price, quantity) "
+                               "VALUES (%s, %s, %s, %s, %s)", ('A2', 'Toán', 'Truyện', 1, 1))
+        self.conn.rollback()
+        self.assertFalse(self.conn.in_transaction)
+
+
+class ModelsTest(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+        with get_pool().acquire() as conn, conn.cursor() as cursor:
+            for table in ('borrow_books', 'users', 'accounts'):
+                cursor.execute(f"DELETE FROM {table}")
+            conn.commit()
+
+    def test_pool_uses_sqlite(self):
+        with get_pool().acquire() as conn:
+            self.assertIsInstance(conn._raw, SQLiteConnection)
+
+    def test_account_user_borrow(self):
+        account_id = AccountModel.create_account('reader', 'secret')
+        self.assertEqual(AccountModel.get_by_username('reader')['role'], 'user')
+        user_id = UserModel.add({'account_id': account_id, 'full_name': 'Nguyễn Văn A', 'gender': 'Nam'})
+        self.assertEqual(UserModel.get_by_id(user_id)['full_name'], 'Nguyễn Văn A')
+
+        BookService(SQLiteBookRepository()).create_book(dict(TEXTBOOK))
+        book_id = SQLiteBookRepository().find_by_code('SGK001').book_id
+        BorrowModel.borrow({'book_id': book_id, 'quantity': 2, 'user_id': user_id, 'borrow_date': '2024-05-01'})
+        borrowed = BorrowModel.find_by_user(user_id)
+        self.assertEqual([(row['book_id'], row['quantity'], row['borrow_date']) for row in borrowed],
+                         [(book_id, 2, date(2024, 5, 1))])
+        self.assertEqual(SQLiteBookRepository().find_by_id(book_id).quantity, 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
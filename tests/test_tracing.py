@@ -0,0 +1,73 @@
+"""Request id và trace theo tầng qua app thật (main.create_app) trên SQLite tạm"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config import tracing
+from app.config.migrations import migrate
+from app.main import create_app
+from app.repositories.sqlite_book_repository import SQLiteBookRepository
+from app.services.book_service import BookService
+from app.tests.test_book_service import TEXTBOOK, clear_books
+from unittest import mock
+import unittest
+
+
+def setUpModule():
+    migrate()
+
+
+class ListExporter:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, trace):
+        self.traces.append(trace)
+
+
+class TracingTest(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+        self.assertTrue(BookService(SQLiteBookRepository()).create_book(dict(TEXTBOOK))[0])
+        self.book_id = SQLiteBookRepository().find_by_code('SGK001').book_id
+        self.exporter = ListExporter()
+        with mock.patch.object(tracing, 'make_exporter', return_value=self.exporter):
+            app = create_app()
+        app.testing = True
+        self.client = app.test_client()
+
+    def test_request_id_echoed_or_generated(self):
+        with self.client.get('/api/books?limit=1', headers={'X-Request-ID': 'abc-123'}) as response:
+            self.assertEqual(response.headers['X-Request-ID'], 'abc-123')
+        with self.client.get('/api/books?limit=1', headers={'X-Request-ID': 'bad id!'}) as response:
+            generated = response.headers['X-Request-ID']
+        self.assertRegex(generated, r'^[0-9a-f]{32}$')
+        self.assertEqual(self.exporter.traces, [])
+
+    def test_forced_trace_has_nested_layers(self):
+        with self.client.get(f'/api/books/{self.book_id}', headers={'X-Trace': '1', 'X-Request-ID': 'r1'}) as response:
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.exporter.traces), 1)
+        trace = self.exporter.traces[0]
+        self.assertEqual(trace.request_id, 'r1')
+        spans = [event for event in trace.events if event['ph'] == 'X']
+        layers = {event['cat'] for event in spans}
+        self.assertLessEqual({'view', 'controller', 'service', 'repository', 'sql'}, layers)
+        view = next(event for event in spans if event['cat'] == 'view')
+        self.assertEqual(view['name'], 'GET /api/books/<int:book_id>')
+        self.assertEqual(view['args']['status'], 200)
+        for event in spans:
+            # Mọi span nằm trong span của request
+            self.assertGreaterEqual(event['ts'], view['ts'])
+            self.assertLessEqual(event['ts'] + event['dur'], view['ts'] + view['dur'] + 1)
+
+    def test_span_outside_trace_is_noop(self):
+        with tracing.span('noop'):
+            self.assertIsNone(tracing.current_trace())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""Unit of work trên SQLite tạm: một connection/transaction, lồng nhau, rollback, callback, gắn vào request Flask"""
+import os
+import tempfile
+
+# Phải đặt trước khi import app.config.db_config
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='libraryx_test_'), 'test.db'))
+
+from app.config import unit_of_work as uow_module
+from app.config.db_config import get_db_connection, get_pool
+from app.config.migrations import migrate
+from app.config.unit_of_work import after_commit, after_rollback, has_pending_writes, unit_of_work
+from app.tests.test_book_service import clear_books
+from flask import Flask
+import unittest
+
+
+def setUpModule():
+    migrate()
+
+
+def _insert(code: str):
+    with get_db_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("INSERT INTO books (book_code, book_name, book_type, price, quantity) VALUES (%s, %s, %s, %s, %s)",
+                       (code, code, 'Sách tham khảo', 1, 1))
+        conn.commit()
+
+
+def _codes():
+    with get_pool().acquire() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT book_code FROM books ORDER BY book_code")
+        return [row[0] for row in cursor.fetchall()]
+
+
+class UnitOfWorkTest(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+
+    def test_one_connection_and_one_commit(self):
+        before = get_pool().stats()['checkouts']
+        with unit_of_work():
+            _insert('A')
+            self.assertTrue(has_pending_writes())
+            _insert('B')
+            # Connection khác chưa thấy dòng chưa commit
+            self.assertEqual(_codes(), [])
+        self.assertEqual(_codes(), ['A', 'B'])
+        # Một connection cho unit of work + một cho mỗi lần _codes()
+        self.assertEqual(get_pool().stats()['checkouts'] - before, 3)
+
+    def test_no_sql_borrows_no_connection(self):
+        before = get_pool().stats()['checkouts']
+        with unit_of_work():
+            pass
+        self.assertEqual(get_pool().stats()['checkouts'], before)
+
+    def test_exception_rolls_back(self):
+        with self.assertRaises(RuntimeError), unit_of_work():
+            _insert('A')
+            raise RuntimeError('boom')
+        self.assertEqual(_codes(), [])
+
+    def test_nested_joins_outer_and_failure_rolls_back_all(self):
+        with unit_of_work() as outer:
+            _insert('A')
+            with unit_of_work() as inner:
+                self.assertIs(inner, outer)
+                _insert('B')
+            self.assertEqual(_codes(), [])
+            try:
+                with unit_of_work():
+                    _insert('C')
+                    raise ValueError('inner')
+            except ValueError:
+                pass
+            self.assertTrue(outer.rollback_only)
+        self.assertEqual(_codes(), [])
+
+    def test_callbacks_follow_outcome(self):
+        events = []
+        with unit_of_work():
+            _insert('A')
+            after_commit(lambda: events.append('commit'))
+            after_rollback(lambda: events.append('rollback'))
+            self.assertEqual(events, [])
+        with self.assertRaises(RuntimeError), unit_of_work():
+            _insert('B')
+            after_commit(lambda: events.append('commit 2'))
+            after_rollback(lambda: events.append('rollback 2'))
+            raise RuntimeError('boom')
+        self.assertEqual(events, ['commit', 'rollback 2'])
+        # Ngoài unit of work: after_commit chạy ngay, after_rollback bỏ qua
+        after_commit(lambda: events.append('now'))
+        after_rollback(lambda: events.append('never'))
+        self.assertEqual(events[-1], 'now')
+
+
+class RequestUnitOfWorkTest(unittest.TestCase):
+    def setUp(self):
+        clear_books()
+        app = Flask(__name__)
+        uow_module.init_app(app)
+
+        @app.route('/write/<code>/<int:status>')
+        def write(code, status):
+            _insert(code)
+            _insert(code + '2')
+            if status == 0:
+                raise RuntimeError('boom')
+            return 'ok', status
+
+        app.config['PROPAGATE_EXCEPTIONS'] = False
+        self.client = app.test_client()
+
+    def test_success_commits(self):
+        with self.client.get('/write/A/200') as response:
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(_codes(), ['A', 'A2'])
+
+    def test_error_status_and_exception_roll_back(self):
+        with self.client.get('/write/B/409') as response:
+            self.assertEqual(response.status_code, 409)
+        with self.client.get('/write/C/0') as response:
+            self.assertEqual(response.status_code, 500)
+        self.assertEqual(_codes(), [])
+        self.assertEqual(get_pool().stats()['in_use'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,33 +13,23 @@ def register():
         full_name = request.form["full_name"]
         email = request.form["email"]
 
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        with get_db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            # kiểm tra username tồn tại
+            cursor.execute("SELECT * FROM accounts WHERE username=%s", (username,))
+            existing = cursor.fetchone()
 
-        # kiểm tra username tồn tại
-        cursor.execute("SELECT * FROM accounts WHERE username=%s", (username,))
-        existing = cursor.fetchone()
+            if existing:
+                flash("Tên đăng nhập đã tồn tại!", "danger")
+                return render_template("register.html")
 
-        if existing:
-            flash("Tên đăng nhập đã tồn tại!", "danger")
-            cursor.close()
-            conn.close()
-            return render_template("register.html")
+            hashed_pw = generate_password_hash(password)
+            cursor.execute("INSERT INTO accounts (username, password, role) VALUES (%s, %s, %s)",
+                           (username, hashed_pw, 'user'))
 
-        hashed_pw = generate_password_hash(password)
-        cursor.execute("INSERT INTO accounts (username, password, role) VALUES (%s, %s, %s)",
-                       (username, hashed_pw, 'user'))
-        conn.commit()
-
-        # Tạo user info
-        cursor.execute("SELECT account_id FROM accounts WHERE username=%s", (username,))
-        acc = cursor.fetchone()
-        cursor.execute("INSERT INTO users (account_id, full_name, email) VALUES (%s, %s, %s)",
-                       (acc["account_id"], full_name, email))
-        conn.commit()
-
-        cursor.close()
-        conn.close()
+            # Tạo user info (cùng transaction với account)
+            cursor.execute("INSERT INTO users (account_id, full_name, email) VALUES (%s, %s, %s)",
+                           (cursor.lastrowid, full_name, email))
+            conn.commit()
 
         flash("Đăng ký thành công! Hãy đăng nhập.", "success")
         return redirect(url_for("auth.login"))
@@ -53,26 +43,19 @@ def login():
         username = request.form["username"]
         password = request.form["password"]
 
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute("SELECT * FROM accounts WHERE username=%s", (username,))
-        account = cursor.fetchone()
+        with get_db_connection() as conn, conn.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT * FROM accounts WHERE username=%s", (username,))
+            account = cursor.fetchone()
 
         if account and check_password_hash(account["password"], password):
             session["user_id"] = account["account_id"]
             session["role"] = account["role"]
             session["username"] = account["username"]
 
-            cursor.close()
-            conn.close()
-
             flash("Đăng nhập thành công!", "success")
             return redirect(url_for("index"))  # Chuyển hướng đến trang chủ
         else:
             flash("Sai tên đăng nhập hoặc mật khẩu!", "danger")
-            cursor.close()
-            conn.close()
             return render_template("login.html")
 
     return render_template("login.html")
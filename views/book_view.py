@@ -1,7 +1,10 @@
-from flask import Blueprint, jsonify, request, render_template, redirect, url_for, flash
+from flask import Blueprint, jsonify, request, render_template, redirect, url_for, flash, Response, stream_with_context
 from app.controllers.book_controller import BookController
 from app.presenters.book_presenter import BookPresenter
+from app.models.page_model import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.utils.helpers import success, error
+import csv
+import io
 
 # Blueprint cho Web UI
 book_web_bp = Blueprint('book_web', __name__)
@@ -12,20 +15,85 @@ book_api_bp = Blueprint('book_api', __name__)
 ctrl = BookController()
 presenter = BookPresenter()
 
+
+def _page_args() -> dict:
+    """
+    Đọc tham số phân trang cursor từ query string (?limit=&cursor=&sort=&with_total=&fields=)
+    fields: 'summary' (mặc định, không đọc description/image), 'detail', hoặc danh sách cột cách nhau bởi dấu phẩy
+    """
+    try:
+        limit = int(request.args.get('limit') or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        raise ValueError("limit phải là số nguyên")
+    return {
+        'limit': limit,
+        'cursor': request.args.get('cursor') or None,
+        'sort': request.args.get('sort') or None,
+        'include_total': request.args.get('with_total', '').lower() in ('1', 'true', 'yes'),
+        'fields': _fields_arg()
+    }
+
+
+def _fields_arg():
+    fields = (request.args.get('fields') or 'summary').strip()
+    if ',' in fields:
+        return [name.strip() for name in fields.split(',') if name.strip()]
+    return fields
+
+
+def _ids_arg() -> list:
+    """?ids=1,2,3 -> [1, 2, 3] (tối đa MAX_PAGE_SIZE ID)"""
+    try:
+        book_ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+    except ValueError:
+        raise ValueError("ids phải là danh sách số nguyên cách nhau bởi dấu phẩy")
+    if not book_ids:
+        raise ValueError("ids không được để trống")
+    if len(book_ids) > MAX_PAGE_SIZE:
+        raise ValueError(f"Tối đa {MAX_PAGE_SIZE} ID mỗi lần")
+    return book_ids
+
+
+def _flag_arg(name: str) -> bool:
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+def _import_rows() -> list:
+    """
+    Đọc dữ liệu nhập sách: mảng JSON, file CSV (multipart, field 'file') hoặc body text/csv
+    CSV dùng cùng tên cột với API JSON; ô trống được bỏ qua (dùng giá trị mặc định)
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        text = io.TextIOWrapper(upload.stream, encoding='utf-8-sig')
+    elif request.mimetype == 'text/csv':
+        text = io.StringIO(request.get_data().decode('utf-8-sig'))
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("Dữ liệu phải là mảng JSON các sách hoặc file CSV")
+        return rows
+    return [
+        {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        for row in csv.DictReader(text)
+    ]
+
+
+def _paginated(items: list, page) -> dict:
+    """Response API kèm thông tin phân trang"""
+    payload = success(items)
+    payload['pagination'] = page.pagination_dict()
+    return payload
+
 # ===== WEB UI ROUTES =====
 
 @book_web_bp.route('', methods=['GET'])
 def books_page():
-    """Trang danh sách tất cả sách"""
+    """Trang danh sách tất cả sách (phân trang cursor)"""
     try:
         search_query = request.args.get('q', '')
-        
-        if search_query:
-            books_data = ctrl.search_books(search_query)
-        else:
-            books_data = ctrl.get_all_books()
-            
-        template_data = presenter.present_books_list(books_data, search_query=search_query)
+        page = ctrl.get_books_page(query=search_query or None, **_page_args())
+        template_data = presenter.present_books_list(page.items, search_query=search_query, page=page)
         return render_template('books.html', **template_data)
         
     except Exception as e:
@@ -36,8 +104,9 @@ def books_page():
 def books_by_type_page(book_type):
     """In danh sách sách theo loại (Giáo khoa / Tham khảo)"""
     try:
-        books_data = ctrl.get_books_by_type(book_type)
-        template_data = presenter.present_books_by_type(books_data, book_type)
+        page = ctrl.get_books_page(book_type=book_type, **_page_args())
+        total_amount = ctrl.calculate_total_amount_by_type(book_type)
+        template_data = presenter.present_books_by_type(page.items, book_type, total_amount, page=page)
         return render_template('books_by_type.html', **template_data)
     except Exception as e:
         flash(f"Lỗi: {str(e)}", 'error')
@@ -48,8 +117,8 @@ def books_by_publisher_page(publisher):
     """Xuất ra các sách của nhà xuất bản"""
     try:
         book_type = request.args.get('type')  # Optional filter
-        books_data = ctrl.get_books_by_publisher(publisher, book_type)
-        template_data = presenter.present_books_by_publisher(books_data, publisher, book_type)
+        page = ctrl.get_books_page(publisher=publisher, book_type=book_type, **_page_args())
+        template_data = presenter.present_books_by_publisher(page.items, publisher, book_type, page=page)
         return render_template('books_by_publisher.html', **template_data)
     except Exception as e:
         flash(f"Lỗi: {str(e)}", 'error')
@@ -147,23 +216,119 @@ def delete_book(book_id):
 
 @book_api_bp.route('', methods=['GET'])
 def get_books_api():
-    """API: Lấy danh sách sách (có thể tìm kiếm)"""
+    """
+    API: Lấy danh sách sách (có thể tìm kiếm/lọc), phân trang cursor
+    ?ids=1,2,3: lấy nhiều sách theo ID trong một truy vấn, ID không tồn tại trả về trong 'missing'
+    """
     try:
-        q = request.args.get('q')
-        book_type = request.args.get('type')
-        
-        if q:
-            books = ctrl.search_books(q)
-        elif book_type:
-            books = ctrl.get_books_by_type(book_type)
-        else:
-            books = ctrl.get_all_books()
-        
-        books_data = [book.to_dict() for book in books]
-        return jsonify(success(books_data))
+        if 'ids' in request.args:
+            book_ids = _ids_arg()
+            fields = _fields_arg() if request.args.get('fields') else None
+            books = ctrl.get_books_by_ids(book_ids, fields)
+            found = {book.book_id for book in books}
+            payload = success([book.to_dict() for book in books])
+            payload['missing'] = [book_id for book_id in dict.fromkeys(book_ids) if book_id not in found]
+            return jsonify(payload)
+        page = ctrl.get_books_page(
+            query=request.args.get('q'),
+            book_type=request.args.get('type'),
+            publisher=request.args.get('publisher'),
+            **_page_args()
+        )
+        books_data = [book.to_dict() for book in page.items]
+        return jsonify(_paginated(books_data, page))
+    except ValueError as e:
+        return jsonify(error(str(e))), 400
     except Exception as e:
         return jsonify(error(f"Lỗi: {str(e)}")), 500
 
+@book_api_bp.route('/suggest', methods=['GET'])
+def suggest_books_api():
+    """API: Gợi ý tên sách, mã sách, nhà xuất bản theo tiền tố (?q=&limit=)"""
+    try:
+        limit = int(request.args.get('limit') or 10)
+    except ValueError:
+        return jsonify(error("limit phải là số nguyên")), 400
+    try:
+        return jsonify(success(ctrl.suggest_books(request.args.get('q', ''), limit)))
+    except Exception as e:
+        return jsonify(error(f"Lỗi: {str(e)}")), 500
+
+@book_api_bp.route('/export', methods=['GET'])
+def export_books_api():
+    """API: Export sách dạng stream (?format=ndjson|csv, lọc ?type=&publisher=), bộ nhớ không đổi"""
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify(error("format phải là 'ndjson' hoặc 'csv'")), 400
+    
+    books = ctrl.export_books(request.args.get('type'), request.args.get('publisher'))
+    if export_format == 'csv':
+        body, mimetype = presenter.stream_csv(books), 'text/csv; charset=utf-8'
+    else:
+        body, mimetype = presenter.stream_ndjson(books), 'application/x-ndjson; charset=utf-8'
+    
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=books.{export_format}'
+    return response
+
+@book_api_bp.route('/import', methods=['POST'])
+def import_books_api():
+    """
+    API: Nhập sách hàng loạt (mảng JSON hoặc CSV), trả về lỗi theo từng dòng
+    ?dry_run=1 chỉ validate; ?async=1 chạy nền, trả 202 + job_id để hỏi tiến độ
+    """
+    try:
+        rows = _import_rows()
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify(error(f"Dữ liệu không hợp lệ: {str(e)}")), 400
+    if not rows:
+        return jsonify(error("Không có dòng nào để nhập")), 400
+    
+    dry_run = _flag_arg('dry_run')
+    try:
+        if _flag_arg('async'):
+            job = ctrl.start_import_job(rows, dry_run)
+            return jsonify(success(job.to_dict(), "Đã nhận yêu cầu nhập sách")), 202
+        result = ctrl.import_books(rows, dry_run)
+        message = f"Đã nhập {result['inserted']}/{result['total']} sách"
+        return jsonify(success(result, message)), 200 if dry_run or not result['inserted'] else 201
+    except Exception as e:
+        return jsonify(error(f"Lỗi: {str(e)}")), 500
+
+@book_api_bp.route('/sync', methods=['POST'])
+def sync_books_api():
+    """
+    API: Đồng bộ catalog với feed của NXB (mảng JSON hoặc CSV như /import), khóa là book_code
+    Chỉ ghi sách mới/đã đổi; ?delete_missing=1 xóa sách không có trong feed; ?dry_run=1 chỉ tính chênh lệch;
+    ?async=1 chạy nền, hỏi tiến độ qua /import/<job_id>
+    """
+    try:
+        rows = _import_rows()
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify(error(f"Dữ liệu không hợp lệ: {str(e)}")), 400
+    if not rows:
+        return jsonify(error("Feed không có dòng nào")), 400
+    
+    delete_missing, dry_run = _flag_arg('delete_missing'), _flag_arg('dry_run')
+    try:
+        if _flag_arg('async'):
+            job = ctrl.start_sync_job(rows, delete_missing, dry_run)
+            return jsonify(success(job.to_dict(), "Đã nhận yêu cầu đồng bộ")), 202
+        result = ctrl.sync_books(rows, delete_missing, dry_run)
+        message = (f"Thêm {result['inserted']}, cập nhật {result['updated']}, "
+                   f"không đổi {result['unchanged']}, xóa {result['deleted']}")
+        return jsonify(success(result, message))
+    except Exception as e:
+        return jsonify(error(f"Lỗi: {str(e)}")), 500
+
+@book_api_bp.route('/import/<job_id>', methods=['GET'])
+def get_import_job_api(job_id):
+    """API: Tiến độ/kết quả job nhập sách chạy nền"""
+    job = ctrl.get_import_job(job_id)
+    if job is None:
+        return jsonify(error('Không tìm thấy job nhập sách')), 404
+    return jsonify(success(job.to_dict()))
+
 @book_api_bp.route('/<int:book_id>', methods=['GET'])
 def get_book_api(book_id):
     """API: Lấy thông tin chi tiết sách"""
@@ -197,6 +362,27 @@ def add_book_api():
     except Exception as e:
         return jsonify(error(f"Lỗi: {str(e)}")), 500
 
+@book_api_bp.route('', methods=['PATCH'])
+def update_books_api():
+    """
+    API: Cập nhật một phần nhiều sách trong một transaction
+    Body: [{"book_id": 1, "price": 12000}, {"book_id": 2, "quantity": 5}, ...]
+    Trả về kết quả từng phần tử {book_id, success, message}; phần tử lỗi không chặn các phần tử khác
+    """
+    updates = request.get_json(silent=True)
+    if not isinstance(updates, list) or not all(isinstance(item, dict) for item in updates):
+        return jsonify(error("Dữ liệu phải là mảng JSON [{book_id, ...}]")), 400
+    if not updates:
+        return jsonify(error("Không có sách nào để cập nhật")), 400
+    if len(updates) > MAX_PAGE_SIZE:
+        return jsonify(error(f"Tối đa {MAX_PAGE_SIZE} sách mỗi lần")), 400
+    try:
+        results = ctrl.update_books(updates)
+        updated = sum(1 for result in results if result['success'])
+        return jsonify(success(results, f"Đã cập nhật {updated}/{len(results)} sách"))
+    except Exception as e:
+        return jsonify(error(f"Lỗi: {str(e)}")), 500
+
 @book_api_bp.route('/<int:book_id>', methods=['PUT'])
 def update_book_api(book_id):
     """API: Cập nhật sách"""
@@ -237,11 +423,13 @@ def get_statistics_api():
 
 @book_api_bp.route('/publisher/<publisher>', methods=['GET'])
 def get_books_by_publisher_api(publisher):
-    """API: Lấy sách theo nhà xuất bản"""
+    """API: Lấy sách theo nhà xuất bản (phân trang cursor)"""
     try:
         book_type = request.args.get('type')
-        books = ctrl.get_books_by_publisher(publisher, book_type)
-        books_data = [book.to_dict() for book in books]
-        return jsonify(success(books_data))
+        page = ctrl.get_books_page(publisher=publisher, book_type=book_type, **_page_args())
+        books_data = [book.to_dict() for book in page.items]
+        return jsonify(_paginated(books_data, page))
+    except ValueError as e:
+        return jsonify(error(str(e))), 400
     except Exception as e:
         return jsonify(error(f"Lỗi: {str(e)}")), 500
\ No newline at end of file
@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 from app.controllers.borrow_controller import BorrowController
+from app.models.inventory_model import InsufficientStockError
 from app.utils.helpers import success, error
 
 bp = Blueprint('borrow', __name__, url_prefix='/api/borrow')
@@ -8,9 +9,21 @@ ctrl = BorrowController()
 @bp.route('', methods=['POST'])
 def borrow_book():
     data = request.json or {}
-    borrow_id = ctrl.borrow(data)
+    try:
+        borrow_id = ctrl.borrow(data)
+    except InsufficientStockError as e:
+        return jsonify(error(str(e))), 409
+    except ValueError as e:
+        return jsonify(error(str(e))), 400
     return jsonify(success({'borrow_id': borrow_id}, 'Borrow recorded'))
 
 @bp.route('', methods=['GET'])
 def list_borrows():
+    # ?user_id= or ?book_id= filters by user or book (newest first)
+    user_id = request.args.get('user_id', type=int)
+    book_id = request.args.get('book_id', type=int)
+    if user_id is not None:
+        return jsonify(success(ctrl.get_by_user(user_id)))
+    if book_id is not None:
+        return jsonify(success(ctrl.get_by_book(book_id)))
     return jsonify(success(ctrl.get_all()))
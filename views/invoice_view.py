@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify, request
+from datetime import date, timedelta
 from app.controllers.invoice_controller import InvoiceController
+from app.models.inventory_model import InsufficientStockError
 from app.utils.helpers import success, error
 
 bp = Blueprint('invoices', __name__, url_prefix='/api/invoices')
@@ -12,9 +14,25 @@ def create_invoice():
     details = data.get('details', [])
     if not invoice or not details:
         return jsonify(error('invoice and details required')), 400
-    inv_id = ctrl.create_invoice(invoice, details)
-    return jsonify(success({'invoice_id': inv_id}, 'Invoice created'))
+    try:
+        inv_id, total_amount = ctrl.create_invoice(invoice, details)
+    except InsufficientStockError as e:
+        return jsonify(error(str(e))), 409
+    except ValueError as e:
+        return jsonify(error(str(e))), 400
+    return jsonify(success({'invoice_id': inv_id, 'total_amount': float(total_amount)}, 'Invoice created'))
 
 @bp.route('', methods=['GET'])
 def get_invoices():
+    # ?user_id= filters by user; ?from=YYYY-MM-DD&to=YYYY-MM-DD (inclusive) filters by invoice date
+    user_id = request.args.get('user_id', type=int)
+    if user_id is not None:
+        return jsonify(success(ctrl.get_by_user(user_id)))
+    if request.args.get('from') or request.args.get('to'):
+        try:
+            start = date.fromisoformat(request.args.get('from') or '1970-01-01')
+            end = date.fromisoformat(request.args['to']) if request.args.get('to') else date.today()
+        except ValueError:
+            return jsonify(error('from/to must be YYYY-MM-DD')), 400
+        return jsonify(success(ctrl.get_by_date_range(start, end + timedelta(days=1))))
     return jsonify(success(ctrl.get_all()))
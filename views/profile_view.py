@@ -0,0 +1,24 @@
+from flask import Blueprint, jsonify, request, send_from_directory, session
+from app.config import profiling
+from app.utils.helpers import success, error
+import os
+
+# Xem/tải kết quả profile (config/profiling.py) - chỉ admin
+bp = Blueprint('profiles', __name__, url_prefix='/admin/profiles')
+
+@bp.before_request
+def require_admin():
+    if not profiling.is_admin(request, session):
+        return jsonify(error('admin only')), 403
+
+@bp.route('', methods=['GET'])
+def list_profiles():
+    profiling.store.flush()
+    return jsonify(success(profiling.store.files()))
+
+@bp.route('/<path:filename>', methods=['GET'])
+def download_profile(filename):
+    if not filename.endswith(('.pstats', '.collapsed')):
+        return jsonify(error('not a profile file')), 404
+    profiling.store.flush()
+    return send_from_directory(os.path.abspath(profiling.store.directory), filename, as_attachment=True)